@@ -0,0 +1,79 @@
+"""add_monthly_agent_summary
+
+Revision ID: 3c5e8f1a2b47
+Revises: 1b99152571a4
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c5e8f1a2b47'
+down_revision: Union[str, Sequence[str], None] = '1b99152571a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'monthly_agent_summary',
+        sa.Column('agent_id', sa.Integer(), sa.ForeignKey('agents.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Integer(), nullable=False),
+        sa.Column('payments_total', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('paid_total', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('debt_total', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('payment_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('pending_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('completed_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('failed_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('cancelled_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('debt_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('agent_id', 'year', 'month'),
+    )
+
+    # Backfill from existing history (same buckets as app.summary.rebuild)
+    op.execute("""
+        INSERT INTO monthly_agent_summary (
+            agent_id, year, month, payments_total, paid_total, payment_count,
+            pending_count, completed_count, failed_count, cancelled_count
+        )
+        SELECT
+            agent_id,
+            EXTRACT(YEAR FROM payment_date)::int,
+            EXTRACT(MONTH FROM payment_date)::int,
+            COALESCE(SUM(amount), 0),
+            COALESCE(SUM(amount) FILTER (WHERE status = 'Completed'), 0),
+            COUNT(*),
+            COUNT(*) FILTER (WHERE lower(status) = 'pending'),
+            COUNT(*) FILTER (WHERE lower(status) = 'completed'),
+            COUNT(*) FILTER (WHERE lower(status) = 'failed'),
+            COUNT(*) FILTER (WHERE lower(status) = 'cancelled')
+        FROM payments
+        WHERE agent_id IS NOT NULL AND payment_date IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+    op.execute("""
+        INSERT INTO monthly_agent_summary (agent_id, year, month, debt_total, debt_count)
+        SELECT
+            agent_id,
+            EXTRACT(YEAR FROM debt_date)::int,
+            EXTRACT(MONTH FROM debt_date)::int,
+            COALESCE(SUM(amount), 0),
+            COUNT(*)
+        FROM debts
+        WHERE agent_id IS NOT NULL AND debt_date IS NOT NULL
+        GROUP BY 1, 2, 3
+        ON CONFLICT (agent_id, year, month) DO UPDATE
+        SET debt_total = EXCLUDED.debt_total, debt_count = EXCLUDED.debt_count
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('monthly_agent_summary')
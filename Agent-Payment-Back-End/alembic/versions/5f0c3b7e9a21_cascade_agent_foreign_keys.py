@@ -0,0 +1,43 @@
+"""cascade_agent_foreign_keys
+
+Revision ID: 5f0c3b7e9a21
+Revises: e4a07c2d9b13
+Create Date: 2026-10-18 14:02:36.418902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f0c3b7e9a21'
+down_revision: Union[str, Sequence[str], None] = 'e4a07c2d9b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# payments.agent_id is already the leading column of ix_payments_agent_id_payment_date
+TABLES = ('payments', 'debts')
+
+
+def _replace_agent_fk(table: str, ondelete: Union[str, None]) -> None:
+    # The tables were first created by create_all, so look the constraint up rather than guess its name
+    for fk in sa.inspect(op.get_bind()).get_foreign_keys(table):
+        if fk['referred_table'] == 'agents' and fk['constrained_columns'] == ['agent_id']:
+            op.drop_constraint(fk['name'], table, type_='foreignkey')
+    op.create_foreign_key(f'{table}_agent_id_fkey', table, 'agents', ['agent_id'], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_debts_agent_id', 'debts', ['agent_id'])
+    for table in TABLES:
+        _replace_agent_fk(table, 'CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        _replace_agent_fk(table, None)
+    op.drop_index('ix_debts_agent_id', table_name='debts')
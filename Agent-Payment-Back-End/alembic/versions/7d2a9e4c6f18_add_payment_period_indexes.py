@@ -0,0 +1,60 @@
+"""add_payment_period_indexes
+
+Revision ID: 7d2a9e4c6f18
+Revises: 3c5e8f1a2b47
+Create Date: 2026-10-18 10:04:51.530771
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2a9e4c6f18'
+down_revision: Union[str, Sequence[str], None] = '3c5e8f1a2b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Composite index for the per-agent, per-month range lookups
+    op.create_index('ix_payments_agent_id_payment_date', 'payments', ['agent_id', 'payment_date'])
+
+    # Stored month bucket (first day of the month), maintained by the Payment model
+    op.add_column('payments', sa.Column('period', sa.Date(), nullable=True))
+    op.execute("""
+        UPDATE payments
+        SET period = date_trunc('month', payment_date)::date
+        WHERE payment_date IS NOT NULL
+    """)
+
+    # Rows that already break "one live payment per agent per month" keep their
+    # status and amount; only the lowest id keeps its period so the unique
+    # index can be built. NULL periods are never considered equal.
+    op.execute("""
+        UPDATE payments
+        SET period = NULL
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (PARTITION BY agent_id, period ORDER BY id) AS rn
+                FROM payments
+                WHERE period IS NOT NULL AND status <> 'Cancelled'
+            ) ranked
+            WHERE rn > 1
+        )
+    """)
+
+    op.create_index(
+        'uq_payments_agent_period_active', 'payments', ['agent_id', 'period'],
+        unique=True, postgresql_where=sa.text("status <> 'Cancelled'")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_payments_agent_period_active', table_name='payments')
+    op.drop_column('payments', 'period')
+    op.drop_index('ix_payments_agent_id_payment_date', table_name='payments')
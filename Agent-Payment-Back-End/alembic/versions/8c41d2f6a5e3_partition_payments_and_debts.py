@@ -0,0 +1,126 @@
+"""partition_payments_and_debts
+
+Revision ID: 8c41d2f6a5e3
+Revises: 5f0c3b7e9a21
+Create Date: 2026-10-18 15:27:09.614383
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c41d2f6a5e3'
+down_revision: Union[str, Sequence[str], None] = '5f0c3b7e9a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The SQL below is frozen as of this revision rather than borrowed from
+# app.partitions, so later changes to the app cannot change what it does.
+
+# table -> partition key
+PARTITIONED_TABLES = {
+    'payments': 'payment_date',
+    'debts': 'debt_date',
+}
+
+# Indexes rebuilt on the partitioned tables: name -> (table, columns).
+# The primary key on id cannot exist on a partitioned table (it would have to
+# include the nullable date column); a plain partitioned index on id keeps
+# lookups by id fast, and the sequence still hands out unique ids.
+INDEXES = {
+    'payments': {
+        'ix_payments_id': ['id'],
+        'ix_payments_agent_id_payment_date': ['agent_id', 'payment_date'],
+    },
+    'debts': {
+        'ix_debts_id': ['id'],
+        'ix_debts_agent_id': ['agent_id'],
+    },
+}
+OLD_INDEXES = {
+    'payments': ['ix_payments_agent_id_payment_date', 'uq_payments_agent_period_active'],
+    'debts': ['ix_debts_agent_id'],
+}
+# Indexes each partition gets of its own: name prefix -> definition. A unique
+# index on a partitioned table would have to include the partition key, so
+# the one-live-payment-per-month index lives on every (one-month) partition.
+LOCAL_INDEXES = {
+    'payments': {
+        'uq_payments_agent_period_active': "UNIQUE INDEX {name} ON {partition} (agent_id, period) WHERE status <> 'Cancelled'",
+    },
+    'debts': {},
+}
+
+
+def _create_partition(table: str, suffix: str, bounds: str) -> None:
+    partition = f'{table}{suffix}'
+    op.execute(f'CREATE TABLE {partition} PARTITION OF {table} {bounds}')
+    for prefix, definition in LOCAL_INDEXES[table].items():
+        op.execute('CREATE ' + definition.format(name=f'{prefix}{suffix}', partition=partition))
+
+
+def _partition(table: str) -> None:
+    bind = op.get_bind()
+    column = PARTITIONED_TABLES[table]
+    old = f'{table}_unpartitioned'
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {'table': table}).scalar()
+
+    op.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    for index in OLD_INDEXES[table]:
+        op.execute(f'DROP INDEX IF EXISTS {index}')
+    op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE ({column})')
+    op.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id')
+    op.execute(f'ALTER TABLE {old} DROP CONSTRAINT IF EXISTS {table}_agent_id_fkey')
+    op.create_foreign_key(f'{table}_agent_id_fkey', table, 'agents', ['agent_id'], ['id'], ondelete='CASCADE')
+    for name, columns in INDEXES[table].items():
+        op.create_index(name, table, columns)
+
+    # One partition per month already in the data; the app creates the
+    # coming months at startup (app.partitions.ensure_partitions)
+    _create_partition(table, '_default', 'DEFAULT')
+    months = bind.execute(sa.text(f"""
+        SELECT DISTINCT to_char(month, 'YYYY_MM'), month::date, (month + interval '1 month')::date
+        FROM (SELECT date_trunc('month', {column}) AS month FROM {old} WHERE {column} IS NOT NULL) AS m
+    """)).all()
+    for suffix, start, end in months:
+        _create_partition(table, f'_{suffix}', f"FOR VALUES FROM ('{start}') TO ('{end}')")
+
+    op.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    op.execute(f'DROP TABLE {old}')
+
+
+def _unpartition(table: str) -> None:
+    bind = op.get_bind()
+    old = f'{table}_partitioned'
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {'table': table}).scalar()
+
+    op.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    for name in INDEXES[table]:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+    op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS)')
+    op.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    op.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id')
+    op.execute(f'DROP TABLE {old} CASCADE')
+    op.create_primary_key(f'{table}_pkey', table, ['id'])
+    op.create_foreign_key(f'{table}_agent_id_fkey', table, 'agents', ['agent_id'], ['id'], ondelete='CASCADE')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in PARTITIONED_TABLES:
+        _partition(table)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in PARTITIONED_TABLES:
+        _unpartition(table)
+    op.create_index('ix_payments_agent_id_payment_date', 'payments', ['agent_id', 'payment_date'])
+    op.create_index(
+        'uq_payments_agent_period_active', 'payments', ['agent_id', 'period'],
+        unique=True, postgresql_where=sa.text("status <> 'Cancelled'")
+    )
+    op.create_index('ix_debts_agent_id', 'debts', ['agent_id'])
@@ -0,0 +1,71 @@
+"""add_agent_ledger
+
+Revision ID: a6e9c0b4d217
+Revises: 8c41d2f6a5e3
+Create Date: 2026-10-18 16:08:44.902157
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6e9c0b4d217'
+down_revision: Union[str, Sequence[str], None] = '8c41d2f6a5e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'ledger_entries',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('agent_id', sa.Integer(), sa.ForeignKey('agents.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('source_id', sa.Integer(), nullable=True),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('entry_date', sa.Date(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_ledger_entries_agent_id', 'ledger_entries', ['agent_id'])
+    op.create_table(
+        'agent_balances',
+        sa.Column('agent_id', sa.Integer(), sa.ForeignKey('agents.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('paid_total', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('debt_total', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('entry_count', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+    # Opening entries: one per completed payment and per debt as they stand today
+    op.execute("""
+        INSERT INTO ledger_entries (agent_id, kind, source_id, amount, entry_date, created_at)
+        SELECT agent_id, 'payment', id, COALESCE(amount, 0), payment_date, now()
+        FROM payments
+        WHERE agent_id IS NOT NULL AND status = 'Completed'
+    """)
+    op.execute("""
+        INSERT INTO ledger_entries (agent_id, kind, source_id, amount, entry_date, created_at)
+        SELECT agent_id, 'debt', id, COALESCE(amount, 0), debt_date, now()
+        FROM debts
+        WHERE agent_id IS NOT NULL
+    """)
+    op.execute("""
+        INSERT INTO agent_balances (agent_id, paid_total, debt_total, entry_count)
+        SELECT
+            agent_id,
+            COALESCE(SUM(amount) FILTER (WHERE kind = 'payment'), 0),
+            COALESCE(SUM(amount) FILTER (WHERE kind = 'debt'), 0),
+            COUNT(*)
+        FROM ledger_entries
+        GROUP BY agent_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('agent_balances')
+    op.drop_index('ix_ledger_entries_agent_id', table_name='ledger_entries')
+    op.drop_table('ledger_entries')
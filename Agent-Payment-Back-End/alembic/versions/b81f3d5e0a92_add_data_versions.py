@@ -0,0 +1,37 @@
+"""add_data_versions
+
+Revision ID: b81f3d5e0a92
+Revises: 7d2a9e4c6f18
+Create Date: 2026-10-18 11:26:03.402917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81f3d5e0a92'
+down_revision: Union[str, Sequence[str], None] = '7d2a9e4c6f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    data_versions = op.create_table(
+        'data_versions',
+        sa.Column('name', sa.String(), primary_key=True),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.bulk_insert(data_versions, [
+        {'name': 'agents', 'version': 1},
+        {'name': 'payments', 'version': 1},
+        {'name': 'debts', 'version': 1},
+    ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('data_versions')
@@ -0,0 +1,30 @@
+"""add_report_job_leases
+
+Revision ID: c3d8e5f1a7b2
+Revises: a6e9c0b4d217
+Create Date: 2026-10-18 18:02:51.337104
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d8e5f1a7b2'
+down_revision: Union[str, Sequence[str], None] = 'a6e9c0b4d217'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('report_jobs', sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+    # Jobs claimed before leases existed get one now, so the sweep can requeue them
+    op.execute("UPDATE report_jobs SET lease_expires_at = started_at WHERE status = 'running'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('report_jobs', 'lease_expires_at')
@@ -0,0 +1,43 @@
+"""add_report_jobs
+
+Revision ID: e4a07c2d9b13
+Revises: b81f3d5e0a92
+Create Date: 2026-10-18 12:41:17.275530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a07c2d9b13'
+down_revision: Union[str, Sequence[str], None] = 'b81f3d5e0a92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'report_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('params', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('media_type', sa.String(), nullable=True),
+        sa.Column('filename', sa.String(), nullable=True),
+        sa.Column('result', sa.LargeBinary(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_report_jobs_status', 'report_jobs', ['status'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_report_jobs_status', table_name='report_jobs')
+    op.drop_table('report_jobs')
@@ -0,0 +1,40 @@
+"""summary_totals_numeric
+
+Revision ID: f1b6c2d8e4a9
+Revises: c3d8e5f1a7b2
+Create Date: 2026-10-18 18:40:12.508219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b6c2d8e4a9'
+down_revision: Union[str, Sequence[str], None] = 'c3d8e5f1a7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONEY_COLUMNS = ['payments_total', 'paid_total', 'debt_total']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Exact cents: the rollup is incremented and decremented on every edit
+    for column in MONEY_COLUMNS:
+        op.alter_column(
+            'monthly_agent_summary', column,
+            type_=sa.Numeric(14, 2), existing_type=sa.Float(), existing_nullable=False,
+            postgresql_using=f'round({column}::numeric, 2)',
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in MONEY_COLUMNS:
+        op.alter_column(
+            'monthly_agent_summary', column,
+            type_=sa.Float(), existing_type=sa.Numeric(14, 2), existing_nullable=False,
+        )
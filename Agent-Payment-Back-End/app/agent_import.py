@@ -0,0 +1,169 @@
+"""Bulk agent import from CSV.
+
+The file is read one batch of ``IMPORT_BATCH_SIZE`` rows at a time. Each row is
+validated with ``AgentCreate``; emails and phone numbers are checked against
+the rest of the file with in-memory sets and against the ``agents`` table with
+one query per batch, instead of two lookups per agent. Accepted rows are
+written per batch: with ``COPY`` on Postgres (ids reserved up front from the
+sequence, so the report can name them), with one executemany elsewhere.
+Everything happens in the caller's transaction, so an import that fails
+halfway leaves no agents behind.
+"""
+import csv
+import io
+from typing import IO, Dict, Iterable, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import func, insert, or_, text
+from sqlalchemy.orm import Session
+from app.models import Agent
+from app.schemas import AgentCreate
+
+IMPORT_BATCH_SIZE = 1000
+
+FIELDS = list(AgentCreate.model_fields)  # name, role, salary, date_of_birth, email_address, phone_number
+
+
+def _clean(record: Dict[str, Optional[str]]) -> dict:
+    """CSV cells for the ``AgentCreate`` fields; blank cells count as missing."""
+    values = {}
+    for field in FIELDS:
+        value = record.get(field)
+        if value is not None and value.strip():
+            values[field] = value.strip()
+    return values
+
+
+def _error_detail(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors())
+
+
+def _existing(db: Session, emails: set, phones: set) -> Tuple[set, set]:
+    """Which of ``emails`` / ``phones`` already belong to an agent, in one query."""
+    if not emails and not phones:
+        return set(), set()
+    conditions = []
+    if emails:
+        conditions.append(Agent.email_address.in_(emails))
+    if phones:
+        conditions.append(Agent.phone_number.in_(phones))
+    taken_emails, taken_phones = set(), set()
+    for email, phone in db.query(Agent.email_address, Agent.phone_number).filter(or_(*conditions)):
+        taken_emails.add(email)
+        taken_phones.add(phone)
+    return taken_emails & emails, taken_phones & phones
+
+
+def _insert_copy(db: Session, agents: List[AgentCreate]) -> List[int]:
+    ids = sorted(db.execute(
+        text("SELECT nextval(pg_get_serial_sequence('agents', 'id')) FROM generate_series(1, :n)"),
+        {"n": len(agents)},
+    ).scalars())
+    columns = ["id", *FIELDS]
+    cursor = db.connection().connection.cursor()
+    try:
+        with cursor.copy(f"COPY agents ({', '.join(columns)}) FROM STDIN") as copy:
+            for agent_id, agent in zip(ids, agents):
+                copy.write_row([agent_id, *(getattr(agent, field) for field in FIELDS)])
+    finally:
+        cursor.close()
+    return ids
+
+
+def _insert_executemany(db: Session, agents: List[AgentCreate]) -> List[int]:
+    # Ids are assigned here rather than returned: SQLite can only report them
+    # in parameter order by inserting one row per statement. A concurrent
+    # insert taking the same ids fails the import with an IntegrityError.
+    first_id = db.query(func.coalesce(func.max(Agent.id), 0)).scalar() + 1
+    ids = list(range(first_id, first_id + len(agents)))
+    db.execute(insert(Agent), [{"id": agent_id, **agent.model_dump()} for agent_id, agent in zip(ids, agents)])
+    return ids
+
+
+def insert_agents(db: Session, agents: List[AgentCreate]) -> List[int]:
+    """Insert ``agents`` with a fixed number of statements and return their ids, in order."""
+    if not agents:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        return _insert_copy(db, agents)
+    return _insert_executemany(db, agents)
+
+
+def _batches(records: Iterable, size: int):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_agents(db: Session, file: IO[bytes]) -> dict:
+    """Import the agents in the CSV ``file``; returns the per-row report.
+
+    Line numbers in the report count the header as line 1. Nothing is
+    committed here.
+    """
+    text_file = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        return _import_rows(db, csv.DictReader(text_file))
+    finally:
+        # Leave closing ``file`` to its owner
+        text_file.detach()
+
+
+def _import_rows(db: Session, reader: csv.DictReader) -> dict:
+    missing = [field for field in ("name", "role") if field not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"CSV header must include: {', '.join(missing)}")
+
+    seen_emails, seen_phones = set(), set()
+    results = []
+    counts = {"created": 0, "duplicate": 0, "invalid": 0}
+
+    def report(line, result, agent_id=None, detail=None):
+        counts[result] += 1
+        results.append({"row": line, "result": result, "agent_id": agent_id, "detail": detail})
+
+    numbered = ((reader.line_num, record) for record in reader)
+    for batch in _batches(numbered, IMPORT_BATCH_SIZE):
+        candidates = []  # (line, AgentCreate)
+        for line, record in batch:
+            try:
+                agent = AgentCreate(**_clean(record))
+            except ValidationError as e:
+                report(line, "invalid", detail=_error_detail(e))
+                continue
+            if agent.email_address and agent.email_address in seen_emails:
+                report(line, "duplicate", detail="Email address appears earlier in the file.")
+                continue
+            if agent.phone_number and agent.phone_number in seen_phones:
+                report(line, "duplicate", detail="Phone number appears earlier in the file.")
+                continue
+            if agent.email_address:
+                seen_emails.add(agent.email_address)
+            if agent.phone_number:
+                seen_phones.add(agent.phone_number)
+            candidates.append((line, agent))
+
+        taken_emails, taken_phones = _existing(
+            db,
+            {a.email_address for _, a in candidates if a.email_address},
+            {a.phone_number for _, a in candidates if a.phone_number},
+        )
+        accepted = []
+        for line, agent in candidates:
+            if agent.email_address in taken_emails:
+                report(line, "duplicate", detail="An agent with this email address already exists.")
+            elif agent.phone_number in taken_phones:
+                report(line, "duplicate", detail="An agent with this phone number already exists.")
+            else:
+                accepted.append((line, agent))
+
+        ids = insert_agents(db, [agent for _, agent in accepted])
+        for (line, _), agent_id in zip(accepted, ids):
+            report(line, "created", agent_id=agent_id)
+
+    results.sort(key=lambda r: r["row"])
+    return {**counts, "rows": results}
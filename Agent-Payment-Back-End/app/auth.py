@@ -1,18 +1,77 @@
+import asyncio
+import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from jose import jwt
-from passlib.context import CryptContext
+from functools import lru_cache
+from typing import Optional
+import bcrypt
+from jose import jwt, JWTError
+from sqlalchemy.orm import Session
+from app.models import User
 
 SECRET_KEY = os.getenv("SECRET_KEY", "SUPER_SECRET_KEY")
 ALGORITHM = "HS256"
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+# "jose" (python-jose) or "pyjwt" (PyJWT, faster, optional dependency)
+JWT_BACKEND = os.getenv("JWT_BACKEND", "jose").lower()
+
+# bcrypt cost factor: each +1 doubles the time to hash or verify a password
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Threads reserved for bcrypt, so a burst of logins queues here instead of
+# occupying the threads every other request runs on
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "2"))
+
+_hash_pool = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+
+
+def _secret(password: str) -> bytes:
+    # bcrypt only reads the first 72 bytes; bcrypt 5 refuses longer input instead of ignoring it
+    return password.encode("utf-8")[:72]
+
 
 def hash_password(password: str):
-    return pwd_context.hash(password)
+    return bcrypt.hashpw(_secret(password), bcrypt.gensalt(BCRYPT_ROUNDS)).decode()
 
 def verify_password(password, hashed):
-    return pwd_context.verify(password, hashed)
+    try:
+        return bcrypt.checkpw(_secret(password), hashed.encode())
+    except (ValueError, AttributeError):
+        # Not a bcrypt hash (e.g. an empty or legacy plaintext password)
+        return False
+
+
+def needs_rehash(hashed: str) -> bool:
+    """True when ``hashed`` was made with a different cost than ``BCRYPT_ROUNDS``."""
+    try:
+        return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+async def verify_password_async(password: str, hashed: Optional[str]) -> bool:
+    """``verify_password`` on the bcrypt pool. A missing hash (unknown user) still
+    costs one full verification, so response times don't reveal which emails exist."""
+    if not hashed:
+        await asyncio.get_running_loop().run_in_executor(_hash_pool, _verify_unknown_user, password)
+        return False
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, verify_password, password, hashed)
+
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, hash_password, password)
+
+
+@lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    return hash_password("not-a-real-password")
+
+
+def _verify_unknown_user(password: str) -> bool:
+    # On the pool: the first call also hashes the dummy password, which must not block the event loop
+    return verify_password(password, _dummy_hash())
 
 def create_token(data: dict):
     to_encode = data.copy()
@@ -23,3 +82,45 @@ def create_token(data: dict):
     })
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+
+def ensure_admin(db: Session):
+    """Create the ADMIN_EMAIL account from the environment if it does not exist yet."""
+    email = os.getenv("ADMIN_EMAIL", "admin@school.com")
+    password = os.getenv("ADMIN_PASSWORD", "123456")
+    if not email or not password:
+        return
+    if db.query(User.id).filter(User.email == email).first():
+        return
+    db.add(User(email=email, password=hash_password(password), role="admin"))
+    db.commit()
+    logger.info("Created admin user %s", email)
+
+
+def _jose_decode(token: str) -> dict:
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+
+def _pyjwt_decoder():
+    import jwt as pyjwt
+
+    def decode(token: str) -> dict:
+        try:
+            return pyjwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except pyjwt.PyJWTError as e:
+            # Callers only know about python-jose's error type
+            raise JWTError(str(e)) from e
+
+    return decode
+
+
+def _select_decoder(backend: str):
+    if backend == "pyjwt":
+        try:
+            return "pyjwt", _pyjwt_decoder()
+        except ImportError:
+            logger.warning("JWT_BACKEND=pyjwt but PyJWT is not installed, using python-jose")
+    return "jose", _jose_decode
+
+
+# Verify a token's signature and expiry; raises JWTError when it is invalid
+JWT_BACKEND, decode_token = _select_decoder(JWT_BACKEND)
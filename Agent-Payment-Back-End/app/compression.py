@@ -0,0 +1,138 @@
+"""gzip compression of text responses, negotiated with ``Accept-Encoding``.
+
+Only the content types in ``COMPRESSION_TYPES`` are compressed (JSON, CSV,
+NDJSON, plain text...), so PDFs, zip archives and event streams pass through
+untouched, as do responses that already carry a ``Content-Encoding``.
+Bodies sent in one message are compressed when they reach
+``COMPRESSION_MIN_SIZE`` bytes. Streamed bodies are compressed chunk by chunk
+with a sync flush after each one, so an export keeps arriving as it is
+produced instead of sitting in the compressor.
+
+The ETag of a compressible response is downgraded to a weak one whenever the
+client accepts gzip, compressed or not: one strong validator must not label
+two byte representations, and the 304 for that client (which carries no body
+to decide by) has to repeat the same ETag. ``report_cache.etag_matches``
+compares weakly, so revalidation still yields a 304. Endpoints mark their 304s
+with ``Vary: Accept-Encoding`` (see ``conditional.list_response``) so the
+middleware knows to treat them the same way; PDFs keep their strong ETags.
+"""
+import os
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "6"))  # 1 (fast) .. 9 (small)
+COMPRESSION_TYPES = tuple(
+    t.strip() for t in os.getenv(
+        "COMPRESSION_TYPES",
+        "application/json,application/x-ndjson,text/csv,text/plain,text/html,application/javascript",
+    ).split(",") if t.strip()
+)
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an ``Accept-Encoding`` header allows gzip (``gzip;q=0`` does not)."""
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        q = params.strip()
+        try:
+            weights[coding.strip().lower()] = float(q[2:]) if q.startswith("q=") else 1.0
+        except ValueError:
+            weights[coding.strip().lower()] = 0.0
+    # An explicit gzip entry wins over the wildcard
+    return weights.get("gzip", weights.get("*", 0.0)) > 0
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware, so streamed bodies are compressed as they are sent."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE, level: int = COMPRESSION_LEVEL,
+                 content_types=COMPRESSION_TYPES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.content_types = tuple(content_types)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        gzip_ok = accepts_gzip(Headers(scope=scope).get("accept-encoding", ""))
+        await self.app(scope, receive, _Responder(self, send, gzip_ok).send)
+
+    def compressible(self, message) -> bool:
+        if message["status"] < 200 or message["status"] in (204, 304):
+            return False
+        headers = Headers(raw=message.get("headers", []))
+        if "content-encoding" in headers or "content-range" in headers:
+            return False
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return content_type in self.content_types
+
+
+class _Responder:
+    """Holds back ``http.response.start`` until the first body chunk decides the encoding."""
+
+    def __init__(self, middleware: CompressionMiddleware, send, gzip_ok: bool):
+        self.middleware = middleware
+        self._send = send
+        self.gzip_ok = gzip_ok
+        self.start = None  # the held start message, until the first body chunk
+        self.compressor = None
+        self.passthrough = False
+
+    async def send(self, message):
+        kind = message["type"]
+        if kind == "http.response.start":
+            if message["status"] == 304 and self.gzip_ok:
+                headers = MutableHeaders(raw=message["headers"])
+                if "accept-encoding" in headers.get("vary", "").lower():
+                    _weaken_etag(headers)
+            if self.middleware.compressible(message):
+                self.start = message
+                return
+            self.passthrough = True
+        elif kind == "http.response.body" and not self.passthrough:
+            if self.start is not None:
+                message = await self._first_body(message)
+            elif self.compressor is not None:
+                message = {**message, "body": self._compress(message.get("body", b""), message.get("more_body", False))}
+        elif self.start is not None:
+            # e.g. http.response.pathsend: send the file as it is
+            await self._send(self.start)
+            self.start = None
+        await self._send(message)
+
+    async def _first_body(self, message):
+        start, self.start = self.start, None
+        headers = MutableHeaders(raw=start["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        if self.gzip_ok:
+            _weaken_etag(headers)
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not self.gzip_ok or (not more_body and len(body) < self.middleware.minimum_size):
+            self.passthrough = True
+            await self._send(start)
+            return message
+
+        self.compressor = zlib.compressobj(self.middleware.level, zlib.DEFLATED, 31)  # 31: gzip container
+        body = self._compress(body, more_body)
+        headers["Content-Encoding"] = "gzip"
+        if more_body:
+            if "content-length" in headers:
+                del headers["content-length"]
+        else:
+            headers["Content-Length"] = str(len(body))
+        await self._send(start)
+        return {**message, "body": body}
+
+    def _compress(self, body: bytes, more_body: bool) -> bytes:
+        data = self.compressor.compress(body)
+        return data + self.compressor.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+
+
+def _weaken_etag(headers: MutableHeaders):
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = f"W/{etag}"
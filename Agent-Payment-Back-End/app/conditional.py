@@ -0,0 +1,42 @@
+"""Conditional GET for the list endpoints.
+
+A list's ETag is a digest of the request path, its query parameters and the
+``data_versions`` of the tables it reads, so it changes exactly when a write
+route bumps one of those versions. ``load_list`` reads the versions first and
+only runs the list query when the client's ``If-None-Match`` does not match;
+an unchanged list costs one small indexed lookup and a 304.
+"""
+from typing import Iterable, Optional, Tuple
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+from app import fastjson, versions
+from app.report_cache import cache_key, etag_matches
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def list_etag(request: Request, data_versions: dict, *extra) -> str:
+    params = sorted(request.query_params.multi_items())
+    return f'"{cache_key(request.url.path, [params, *extra], data_versions)[:32]}"'
+
+
+def load_list(db: Session, request: Request, tables: Iterable[str], extra: tuple, list_rows, *args) -> Tuple[str, Optional[object]]:
+    """``(etag, list_rows(db, *args))``, or ``(etag, None)`` when the client already has this version.
+
+    ``extra`` holds anything besides the tables that changes the response.
+    """
+    etag = list_etag(request, versions.current(db, *tables), *extra)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return etag, None
+    return etag, list_rows(db, *args)
+
+
+def list_response(etag: str, result, schema) -> Response:
+    """304 when ``load_list`` skipped the query, otherwise the encoded rows."""
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if result is None:
+        # The 200 varies by encoding (app.compression); its 304 has to say so too
+        return Response(status_code=304, headers={**headers, "Vary": "Accept-Encoding"})
+    response = fastjson.rows_response(result, schema)
+    response.headers.update(headers)
+    return response
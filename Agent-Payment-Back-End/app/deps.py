@@ -1,19 +1,83 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
 from fastapi import Depends, HTTPException
-from jose import jwt, JWTError
+from jose import JWTError
 from fastapi.security import OAuth2PasswordBearer
-from app.auth import SECRET_KEY, ALGORITHM
+from app import auth
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+# Verified tokens kept, and how long a verification is trusted before the
+# signature is checked again (never past the token's own exp)
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "1024"))
+JWT_CACHE_TTL = float(os.getenv("JWT_CACHE_TTL", "300"))
+
+
+class TokenCache:
+    """LRU of verified token claims, keyed by a digest of the token."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # digest -> (claims, valid until)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str):
+        key = self.key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[0])
+
+    def put(self, token: str, claims: dict):
+        if self.max_entries <= 0:
+            return
+        valid_until = time.time() + self.ttl
+        if isinstance(claims.get("exp"), (int, float)):
+            valid_until = min(valid_until, claims["exp"])
+        key = self.key(token)
+        with self._lock:
+            self._entries[key] = (dict(claims), valid_until)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(JWT_CACHE_SIZE, JWT_CACHE_TTL)
+
+
 def get_current_user(token: str = Depends(oauth2_scheme)):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    payload = token_cache.get(token)
+    if payload is not None:
         return payload
+    try:
+        payload = auth.decode_token(token)
     except JWTError as e:
         raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
+    token_cache.put(token, payload)
+    return payload
 
 def admin_only(user=Depends(get_current_user)):
     if user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Admins only")
     return user
-
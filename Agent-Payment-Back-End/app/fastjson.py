@@ -0,0 +1,61 @@
+"""JSON responses for large lists without a Pydantic model per row.
+
+List endpoints select plain column tuples (``columns``) and hand them to
+``rows_response``, which zips them into dicts and encodes them in one call
+with orjson (or the standard library when orjson is not installed). Routes
+keep their ``response_model``, so the OpenAPI schema does not change; FastAPI
+skips response validation because the route returns a ``Response``.
+"""
+import json
+from datetime import date, datetime
+from typing import Iterable, List, Sequence
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def columns(model, schema, **overrides) -> List:
+    """``model``'s columns for every field of ``schema``, in the schema's field order.
+
+    ``overrides`` replace a field's column with another SQL expression.
+    """
+    return [
+        overrides[field].label(field) if field in overrides else getattr(model, field)
+        for field in schema.model_fields
+    ]
+
+
+def rows_to_dicts(fields: Sequence[str], rows: Iterable) -> List[dict]:
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def rows_response(result, schema) -> FastJSONResponse:
+    """Encode what ``pagination.paginate`` returned for a ``columns(..., schema)`` query."""
+    fields = list(schema.model_fields)
+    if isinstance(result, dict):
+        content = {"items": rows_to_dicts(fields, result["items"]), "next_cursor": result["next_cursor"]}
+    else:
+        content = rows_to_dicts(fields, result)
+    return FastJSONResponse(content)
@@ -0,0 +1,292 @@
+"""Background report generation.
+
+A job is a row in ``report_jobs``. The API inserts it as ``queued`` and hands
+its id to a bounded process pool; a worker claims it (``queued`` -> ``running``
+with a conditional UPDATE, so a job runs once even if it is dispatched twice),
+renders the report with its own database session and stores the bytes on the
+row.
+
+A claim is a lease: it expires ``REPORT_JOB_LEASE_SECONDS`` after the last
+heartbeat, and the worker renews it while it renders. A job whose worker was
+cut off (a restart, a crash) stops heartbeating, so its lease runs out and
+the sweep that ``start_sweeper`` runs in the background puts it back in the
+queue. A pool future that fails outright (the worker process died) marks its
+job ``failed``. At startup ``resume_pending`` also dispatches everything that
+was still queued.
+"""
+import json
+import multiprocessing
+import os
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from app import report_data, report_pdf
+from app.database import SessionLocal
+from app.models import ReportJob
+
+logger = logging.getLogger(__name__)
+
+REPORT_JOB_WORKERS = int(os.getenv("REPORT_JOB_WORKERS", "2"))
+# A running job whose worker has not renewed its claim for this long is requeued
+REPORT_JOB_LEASE_SECONDS = int(os.getenv("REPORT_JOB_LEASE_SECONDS", "60"))
+# How often the server looks for expired leases
+REPORT_JOB_SWEEP_SECONDS = int(os.getenv("REPORT_JOB_SWEEP_SECONDS", "30"))
+# Finished jobs (and their PDFs) are deleted after this long
+REPORT_JOB_RETENTION_HOURS = int(os.getenv("REPORT_JOB_RETENTION_HOURS", "24"))
+
+
+def _agents_pdf(db, params):
+    return b"".join(report_pdf.render_agents(db)), "agents_list.pdf", "application/pdf"
+
+
+def _debts_pdf(db, params):
+    return b"".join(report_pdf.render_debts(db)), "debts_list.pdf", "application/pdf"
+
+
+def _payslip_pdf(db, params):
+    type = params["type"]
+    data = report_data.load_payslip(db, params["agent_id"], type, params.get("month"), params.get("year"))
+    if not data:
+        raise ValueError("Agent not found")
+    return b"".join(report_pdf.render_payslip(data, type)), f"payslip_{data.agent.name}_{type}.pdf", "application/pdf"
+
+
+def _payslips_batch(db, params):
+    type = params["type"]
+    period = params.get("month") or params.get("year")
+    payslips = report_data.load_payslips(
+        db, type, params.get("month"), params.get("year"), params.get("agent_ids"), params.get("role")
+    )
+    if params.get("format") == "pdf":
+        return b"".join(report_pdf.render_payslips_merged(payslips, type)), f"payslips_{type}_{period}.pdf", "application/pdf"
+    # Already inside a pool worker: render this batch in-process
+    data = b"".join(report_pdf.render_payslips_zip(payslips, type, workers=0))
+    return data, f"payslips_{type}_{period}.zip", "application/zip"
+
+
+RENDERERS = {
+    "agents_pdf": _agents_pdf,
+    "debts_pdf": _debts_pdf,
+    "payslip_pdf": _payslip_pdf,
+    "payslips_batch": _payslips_batch,
+}
+
+
+def _check_payslip(params):
+    # The same parameters GET /reports/payslip/pdf requires
+    if not isinstance(params.get("agent_id"), int) or not params.get("type"):
+        raise ValueError("payslip_pdf jobs need an integer agent_id and a type")
+    if params["type"] == "monthly" and params.get("month"):
+        report_data.check_month(params["month"])
+
+
+def _check_batch(params):
+    report_data.check_batch_params(params.get("type"), params.get("month"), params.get("year"), params.get("format", "zip"))
+
+
+# Checked when the job is created, so bad parameters are a 400 rather than a failed job
+PARAM_CHECKS = {
+    "payslip_pdf": _check_payslip,
+    "payslips_batch": _check_batch,
+}
+
+
+def create_job(db: Session, kind: str, params: dict) -> ReportJob:
+    if kind not in RENDERERS:
+        raise ValueError(f"Unknown report kind: {kind}")
+    if kind in PARAM_CHECKS:
+        PARAM_CHECKS[kind](params)
+    purge_expired(db)
+    job = ReportJob(kind=kind, params=json.dumps(params), status="queued", created_at=datetime.utcnow())
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _lease_expiry() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=REPORT_JOB_LEASE_SECONDS)
+
+
+def _claim(db: Session, job_id: int) -> bool:
+    now = datetime.utcnow()
+    claimed = db.query(ReportJob).filter(ReportJob.id == job_id, ReportJob.status == "queued").update(
+        {"status": "running", "started_at": now, "lease_expires_at": _lease_expiry()}, synchronize_session=False
+    )
+    db.commit()
+    return claimed == 1
+
+
+def _renew_lease(job_id: int, stop: threading.Event):
+    """Heartbeat: keep the claim on ``job_id`` alive until ``stop`` is set."""
+    while not stop.wait(REPORT_JOB_LEASE_SECONDS / 3):
+        db = SessionLocal()
+        try:
+            db.query(ReportJob).filter(ReportJob.id == job_id, ReportJob.status == "running").update(
+                {"lease_expires_at": _lease_expiry()}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+
+def run_job(job_id: int):
+    """Render one job. Runs in a pool worker; safe to call more than once per job."""
+    db = SessionLocal()
+    stop = threading.Event()
+    try:
+        if not _claim(db, job_id):
+            return
+        threading.Thread(target=_renew_lease, args=(job_id, stop), daemon=True).start()
+        job = db.get(ReportJob, job_id)
+        try:
+            data, filename, media_type = RENDERERS[job.kind](db, json.loads(job.params))
+        except Exception as e:
+            db.rollback()
+            job = db.get(ReportJob, job_id)
+            job.status = "failed"
+            job.error = str(e) or e.__class__.__name__
+        else:
+            job.status = "done"
+            job.result = data
+            job.filename = filename
+            job.media_type = media_type
+        job.finished_at = datetime.utcnow()
+        job.lease_expires_at = None
+        db.commit()
+    finally:
+        stop.set()
+        db.close()
+
+
+def fail_job(job_id: int, error: str):
+    """Mark a job that never got to finish as failed."""
+    db = SessionLocal()
+    try:
+        db.query(ReportJob).filter(ReportJob.id == job_id, ReportJob.status.in_(["queued", "running"])).update(
+            {"status": "failed", "error": error, "finished_at": datetime.utcnow(), "lease_expires_at": None},
+            synchronize_session=False,
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def requeue_expired(db: Session, now: Optional[datetime] = None) -> List[int]:
+    """Put running jobs whose lease ran out back in the queue; returns the ones this call requeued."""
+    now = now or datetime.utcnow()
+    expired = [job_id for (job_id,) in db.query(ReportJob.id).filter(
+        ReportJob.status == "running", ReportJob.lease_expires_at < now
+    )]
+    requeued = []
+    for job_id in expired:
+        # Conditional, so when several servers sweep at once each job is requeued (and dispatched) once
+        if db.query(ReportJob).filter(
+            ReportJob.id == job_id, ReportJob.status == "running", ReportJob.lease_expires_at < now
+        ).update({"status": "queued", "started_at": None, "lease_expires_at": None}, synchronize_session=False):
+            requeued.append(job_id)
+    db.commit()
+    return requeued
+
+
+def purge_expired(db: Session):
+    cutoff = datetime.utcnow() - timedelta(hours=REPORT_JOB_RETENTION_HOURS)
+    db.query(ReportJob).filter(
+        ReportJob.status.in_(["done", "failed"]), ReportJob.finished_at < cutoff
+    ).delete(synchronize_session=False)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _job_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: workers open their own engine instead of inheriting the server's connections
+            _pool = ProcessPoolExecutor(max_workers=REPORT_JOB_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _discard_pool(broken):
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def dispatch(job_id: int):
+    pool = _job_pool()
+    future = pool.submit(run_job, job_id)
+
+    def done(future):
+        # Cancelled at shutdown: the job stays queued and is resumed at the next start
+        if future.cancelled() or future.exception() is None:
+            return
+        error = future.exception()
+        logger.error("Report job %s failed in the pool: %r", job_id, error)
+        if isinstance(error, BrokenProcessPool):
+            _discard_pool(pool)
+        fail_job(job_id, str(error) or error.__class__.__name__)
+
+    future.add_done_callback(done)
+
+
+def resume_pending():
+    """Requeue jobs whose lease ran out and dispatch everything still queued (at startup)."""
+    db = SessionLocal()
+    try:
+        requeue_expired(db)
+        job_ids = [job_id for (job_id,) in db.query(ReportJob.id).filter(ReportJob.status == "queued").order_by(ReportJob.id)]
+    finally:
+        db.close()
+    for job_id in job_ids:
+        dispatch(job_id)
+
+
+def sweep():
+    """Requeue and dispatch the jobs whose lease ran out since the last sweep."""
+    db = SessionLocal()
+    try:
+        job_ids = requeue_expired(db)
+    finally:
+        db.close()
+    for job_id in job_ids:
+        dispatch(job_id)
+
+
+_sweeper = None
+_sweeper_stop = threading.Event()
+
+
+def _sweep_forever(stop: threading.Event):
+    while not stop.wait(REPORT_JOB_SWEEP_SECONDS):
+        try:
+            sweep()
+        except Exception:
+            logger.exception("Report job sweep failed")
+
+
+def start_sweeper():
+    global _sweeper, _sweeper_stop
+    with _pool_lock:
+        if _sweeper is None:
+            _sweeper_stop = threading.Event()
+            _sweeper = threading.Thread(target=_sweep_forever, args=(_sweeper_stop,), name="report-job-sweeper", daemon=True)
+            _sweeper.start()
+
+
+def shutdown():
+    global _pool, _sweeper
+    with _pool_lock:
+        _sweeper_stop.set()
+        _sweeper = None
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
@@ -0,0 +1,130 @@
+"""Per-agent ledger: append-only entries plus a running balance row.
+
+Every write route that touches a payment or a debt calls ``record_payment``
+/ ``record_debt`` next to its ``summary.apply_*`` call, in the same
+transaction and with the same signs: ``sign=-1`` reverses the row as it
+was, ``sign=1`` records it as it is now. Each call appends to
+``ledger_entries`` and adds the same amounts to the agent's
+``agent_balances`` row with one upsert, so reading a balance is a primary key
+lookup instead of a sum over the agent's whole history.
+
+Only "Completed" payments count as paid, like on payslips; every debt
+counts, dated or not. Rows without an agent have no balance and are skipped.
+"""
+from datetime import datetime
+from typing import Iterable, List, Optional
+from sqlalchemy import case, func, insert, literal, select
+from sqlalchemy.orm import Session
+from app.database import dialect_insert
+from app.models import Agent, AgentBalance, Debt, LedgerEntry, Payment
+
+PAYMENT = "payment"
+DEBT = "debt"
+
+
+def payment_entry(payment, sign=1) -> Optional[dict]:
+    """The entry ``payment`` contributes (``None`` if it does not move the balance)."""
+    if payment.agent_id is None or payment.status != "Completed":
+        return None
+    return {"agent_id": payment.agent_id, "kind": PAYMENT, "source_id": payment.id,
+            "amount": sign * (payment.amount or 0.0), "entry_date": payment.payment_date}
+
+
+def debt_entry(debt, sign=1) -> Optional[dict]:
+    if debt.agent_id is None:
+        return None
+    return {"agent_id": debt.agent_id, "kind": DEBT, "source_id": debt.id,
+            "amount": sign * (debt.amount or 0.0), "entry_date": debt.debt_date}
+
+
+def _post(db: Session, entries: Iterable[Optional[dict]]):
+    entries = [entry for entry in entries if entry is not None]
+    if not entries:
+        return
+    now = datetime.utcnow()
+    db.execute(insert(LedgerEntry), [{**entry, "created_at": now} for entry in entries])
+
+    deltas = {}
+    for entry in entries:
+        row = deltas.setdefault(entry["agent_id"], {"agent_id": entry["agent_id"], "paid_total": 0.0,
+                                                    "debt_total": 0.0, "entry_count": 0})
+        row["paid_total" if entry["kind"] == PAYMENT else "debt_total"] += entry["amount"]
+        row["entry_count"] += 1
+    table = AgentBalance.__table__
+    stmt = dialect_insert(db, AgentBalance)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.agent_id],
+        set_={name: table.c[name] + stmt.excluded[name] for name in ("paid_total", "debt_total", "entry_count")},
+    )
+    db.execute(stmt, list(deltas.values()))
+
+
+def record_payment(db: Session, payment, sign=1):
+    """Post ``payment`` to its agent's ledger. The payment must have its id (flush first)."""
+    _post(db, [payment_entry(payment, sign)])
+
+
+def record_payments(db: Session, payments, sign=1):
+    """Post many payments with one insert and one executemany upsert."""
+    _post(db, [payment_entry(p, sign) for p in payments])
+
+
+def record_debt(db: Session, debt, sign=1):
+    _post(db, [debt_entry(debt, sign)])
+
+
+def balance_columns():
+    paid = func.coalesce(AgentBalance.paid_total, 0.0)
+    debt = func.coalesce(AgentBalance.debt_total, 0.0)
+    # Agents without a balance row yet have nothing on their ledger
+    return [
+        Agent.id.label("agent_id"),
+        paid.label("paid_total"),
+        debt.label("debt_total"),
+        (paid - debt).label("balance"),
+    ]
+
+
+def balances_query(db: Session, agent_ids: Optional[List[int]] = None):
+    query = db.query(*balance_columns()).select_from(Agent).outerjoin(AgentBalance, AgentBalance.agent_id == Agent.id)
+    if agent_ids is not None:
+        query = query.filter(Agent.id.in_(agent_ids))
+    return query
+
+
+def rebuild(db: Session):
+    """Recompute ``agent_balances`` from ``ledger_entries``. Does not commit."""
+    db.query(AgentBalance).delete()
+    rows = db.query(
+        LedgerEntry.agent_id,
+        func.sum(case((LedgerEntry.kind == PAYMENT, LedgerEntry.amount), else_=0.0)),
+        func.sum(case((LedgerEntry.kind == DEBT, LedgerEntry.amount), else_=0.0)),
+        func.count(LedgerEntry.id),
+    ).group_by(LedgerEntry.agent_id).all()
+    if rows:
+        db.execute(insert(AgentBalance), [
+            {"agent_id": agent_id, "paid_total": paid, "debt_total": debt, "entry_count": count}
+            for agent_id, paid, debt, count in rows
+        ])
+
+
+def backfill(db: Session):
+    """Replace the whole ledger with one entry per current payment and debt, then rebuild the balances.
+
+    For data loaded without going through the write routes (migrations,
+    seeds). Does not commit.
+    """
+    db.query(LedgerEntry).delete()
+    now = datetime.utcnow()
+    sources = [
+        (PAYMENT, select(Payment.agent_id, Payment.id, func.coalesce(Payment.amount, 0.0), Payment.payment_date)
+            .where(Payment.agent_id.isnot(None), Payment.status == "Completed")),
+        (DEBT, select(Debt.agent_id, Debt.id, func.coalesce(Debt.amount, 0.0), Debt.debt_date)
+            .where(Debt.agent_id.isnot(None))),
+    ]
+    for kind, source in sources:
+        db.execute(insert(LedgerEntry).from_select(
+            ["agent_id", "source_id", "amount", "entry_date", "kind", "created_at"],
+            source.add_columns(literal(kind), literal(now)),
+        ))
+    rebuild(db)
@@ -0,0 +1,145 @@
+"""Server-Sent Events for the dashboard.
+
+One ``Broadcaster`` per process watches ``data_versions`` (one small query
+every ``LIVE_POLL_SECONDS``, and only while someone is subscribed). When a
+write bumps a version it waits ``LIVE_DEBOUNCE_SECONDS`` so a burst of writes
+(a payroll run, an import) becomes a single update, computes the stats once
+per month being watched and hands the same payload to every subscriber of
+that month. Idle data costs no stats queries at all.
+
+Each event's id is the version vector it was computed from. A client that
+reconnects with ``Last-Event-ID`` (``EventSource`` does this by itself) gets
+no payload until the data moves past what it already shows. Comment lines
+every ``LIVE_HEARTBEAT_SECONDS`` keep proxies from closing an idle stream.
+"""
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LIVE_POLL_SECONDS = float(os.getenv("LIVE_POLL_SECONDS", "2"))
+LIVE_DEBOUNCE_SECONDS = float(os.getenv("LIVE_DEBOUNCE_SECONDS", "1"))
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+LIVE_RETRY_MS = int(os.getenv("LIVE_RETRY_MS", "5000"))  # client reconnect delay
+
+Event = Tuple[str, str]  # (event id, JSON payload)
+
+
+class Subscription:
+    __slots__ = ("key", "last_event_id", "queue")
+
+    def __init__(self, key: Optional[str], last_event_id: Optional[str]):
+        self.key = key
+        self.last_event_id = last_event_id
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize=1)
+
+    def offer(self, event: Event):
+        """Queue ``event`` unless the client has it already; a slow client only ever gets the newest."""
+        if event[0] == self.last_event_id:
+            return
+        self.last_event_id = event[0]
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class Broadcaster:
+    """Fans one computation per key (here: the dashboard month) out to every subscriber.
+
+    ``load_version`` returns an opaque string that changes whenever the data
+    does; ``load_payload(key)`` returns the JSON text to push.
+    """
+
+    def __init__(self, load_version: Callable[[], Awaitable[str]],
+                 load_payload: Callable[[Optional[str]], Awaitable[str]],
+                 poll_seconds: float = LIVE_POLL_SECONDS, debounce_seconds: float = LIVE_DEBOUNCE_SECONDS):
+        self.load_version = load_version
+        self.load_payload = load_payload
+        self.poll_seconds = poll_seconds
+        self.debounce_seconds = debounce_seconds
+        self._subscribers: Dict[Optional[str], set] = {}
+        self._latest: Dict[Optional[str], Event] = {}
+        self._version: Optional[str] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.computations = 0
+
+    def subscribe(self, key: Optional[str], last_event_id: Optional[str] = None) -> Subscription:
+        subscription = Subscription(key, last_event_id)
+        self._subscribers.setdefault(key, set()).add(subscription)
+        latest = self._latest.get(key)
+        if latest is not None and latest[0] == self._version:
+            subscription.offer(latest)
+        if self._task is None or self._task.done():
+            # Created on first use, in the loop that serves the streams
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        else:
+            self._wake.set()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.key)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.key]
+            self._latest.pop(subscription.key, None)
+
+    async def close(self):
+        """Stop polling (application shutdown)."""
+        task, self._task = self._task, None
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        while self._subscribers:
+            try:
+                await self._tick()
+            except Exception:
+                logger.exception("Live update failed")
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+        self._version = None
+
+    async def _tick(self):
+        version = await self.load_version()
+        if self._version is not None and version != self._version and self.debounce_seconds:
+            # Let the rest of a burst of writes land, then compute once
+            await asyncio.sleep(self.debounce_seconds)
+            version = await self.load_version()
+        self._version = version
+        for key in list(self._subscribers):
+            latest = self._latest.get(key)
+            if latest is None or latest[0] != version:
+                latest = self._latest[key] = (version, await self.load_payload(key))
+                self.computations += 1
+            for subscription in list(self._subscribers.get(key, ())):
+                subscription.offer(latest)
+
+    async def events(self, key: Optional[str], last_event_id: Optional[str] = None,
+                     heartbeat_seconds: float = LIVE_HEARTBEAT_SECONDS):
+        """The ``text/event-stream`` body for one client."""
+        subscription = self.subscribe(key, last_event_id)
+        try:
+            yield f"retry: {LIVE_RETRY_MS}\n\n"
+            while True:
+                try:
+                    event_id, payload = await asyncio.wait_for(subscription.queue.get(), heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"id: {event_id}\nevent: stats\ndata: {payload}\n\n"
+        finally:
+            self.unsubscribe(subscription)
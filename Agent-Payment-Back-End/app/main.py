@@ -1,11 +1,48 @@
+import logging
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.database import Base, engine
-from app.routers import auth, agents, payments, reports, admin, debts
+from fastapi.responses import PlainTextResponse
+from app.database import Base, SessionLocal, engine
+from app.routers import auth, agents, payments, reports, admin, debts, exports
+from app import compression, jobs, metrics, partitions, report_pdf
+from app.auth import ensure_admin
 from fastapi.middleware.cors import CORSMiddleware
 
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Login is backed by the users table; make sure the configured admin can sign in
+    db = SessionLocal()
+    try:
+        ensure_admin(db)
+        # Next months' payment and debt partitions exist before anything is dated in them
+        # (every worker runs this; an advisory lock inside makes them take turns)
+        try:
+            created = partitions.ensure_partitions(db)
+            db.commit()
+            if any(created.values()):
+                logger.info("Created partitions: %s", created)
+        except Exception:
+            db.rollback()
+            logger.exception("Could not create partitions")
+    finally:
+        db.close()
+    # Report jobs survive restarts: pick up whatever was queued or interrupted
+    jobs.resume_pending()
+    jobs.start_sweeper()
+    yield
+    await reports.dashboard_broadcaster.close()
+    jobs.shutdown()
+    report_pdf.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,10 +51,21 @@ app.add_middleware(
     allow_methods=["*"],
 )
 
+# JSON lists and exports are large and compress well; PDFs and zips are left alone
+app.add_middleware(compression.CompressionMiddleware)
+
+# Added last, so it wraps everything else and times the whole request
+app.add_middleware(metrics.MetricsMiddleware)
+
 app.include_router(auth.router)
 app.include_router(agents.router)
 app.include_router(payments.router)
 app.include_router(reports.router)
 app.include_router(admin.router)
 app.include_router(debts.router)
+app.include_router(exports.router)
+
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,217 @@
+"""Request timing and SQL instrumentation.
+
+``MetricsMiddleware`` times every HTTP request. SQLAlchemy cursor events on
+both engines count the statements a request runs and the time spent in
+them, through a per-request object held in a context variable (contextvars
+follow the request into Starlette's threadpool and into ``run_sync``).
+Each response carries the numbers in a ``Server-Timing`` header, and
+``/metrics`` serves the accumulated totals in the Prometheus text format.
+Statements slower than ``SLOW_QUERY_MS`` are logged to ``app.sql``.
+
+Headers go out before the body, so ``Server-Timing`` only covers the work
+done until then: the queries a ``StreamingResponse`` runs while it streams
+(the PDF reports' ``yield_per`` batches, the exports) are not in it. The
+registry is updated once the body has finished, so the Prometheus totals
+(and the benchmark suite, which reads them) include the streamed work.
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from app import database
+
+logger = logging.getLogger("app.sql")
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class RouteMetrics:
+    __slots__ = ("buckets", "count", "seconds", "statements", "db_seconds")
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)  # not cumulative; summed on export
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+class Registry:
+    def __init__(self):
+        self._routes = {}  # (method, route, status) -> RouteMetrics
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        index = bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            metrics = self._routes.get((method, route, status))
+            if metrics is None:
+                metrics = self._routes[(method, route, status)] = RouteMetrics()
+            if index < len(LATENCY_BUCKETS):
+                metrics.buckets[index] += 1
+            metrics.count += 1
+            metrics.seconds += seconds
+            metrics.statements += stats.statements
+            metrics.db_seconds += stats.db_seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                key: (list(m.buckets), m.count, m.seconds, m.statements, m.db_seconds)
+                for key, m in self._routes.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+
+registry = Registry()
+
+
+# -- SQL hooks -----------------------------------------------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, " ".join(statement.split())[:1000])
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+for _target in (database.engine, database.async_engine.sync_engine):
+    event.listen(_target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(_target, "after_cursor_execute", _after_cursor_execute)
+    event.listen(_target, "handle_error", _handle_error)
+
+
+# -- middleware ----------------------------------------------------------
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    # The path template keeps label cardinality bounded; unmatched paths share one label
+    return getattr(route, "path", None) or "unmatched"
+
+
+def server_timing(total_seconds: float, stats: RequestStats) -> str:
+    return (
+        f'app;dur={total_seconds * 1000:.1f}, '
+        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.statements} queries"'
+    )
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streamed bodies pass through untouched."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = server_timing(time.perf_counter() - started, stats)
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            # The app returns once the last body chunk is sent: streamed queries are counted by now
+            _current.reset(token)
+            registry.observe(scope["method"], _route_label(scope), status, time.perf_counter() - started, stats)
+
+
+# -- Prometheus export ---------------------------------------------------
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def render_prometheus() -> str:
+    lines = [
+        "# HELP http_request_duration_seconds HTTP request latency.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    snapshot = registry.snapshot()
+    for (method, route, status), (buckets, count, seconds, _, _) in sorted(snapshot.items()):
+        cumulative = 0
+        for bound, hits in zip(LATENCY_BUCKETS, buckets):
+            cumulative += hits
+            lines.append(f"http_request_duration_seconds_bucket{_labels(method=method, route=route, status=status, le=bound)} {cumulative}")
+        lines.append(f"http_request_duration_seconds_bucket{_labels(method=method, route=route, status=status, le='+Inf')} {count}")
+        lines.append(f"http_request_duration_seconds_sum{_labels(method=method, route=route, status=status)} {seconds:.6f}")
+        lines.append(f"http_request_duration_seconds_count{_labels(method=method, route=route, status=status)} {count}")
+
+    lines += [
+        "# HELP http_request_db_statements_total SQL statements executed while serving requests.",
+        "# TYPE http_request_db_statements_total counter",
+    ]
+    for (method, route, status), (_, _, _, statements, _) in sorted(snapshot.items()):
+        lines.append(f"http_request_db_statements_total{_labels(method=method, route=route, status=status)} {statements}")
+    lines += [
+        "# HELP http_request_db_seconds_total Time spent in SQL statements while serving requests.",
+        "# TYPE http_request_db_seconds_total counter",
+    ]
+    for (method, route, status), (_, _, _, _, db_seconds) in sorted(snapshot.items()):
+        lines.append(f"http_request_db_seconds_total{_labels(method=method, route=route, status=status)} {db_seconds:.6f}")
+
+    pools = database.pool_status()
+    gauges = [
+        ("db_pool_checked_out", "checked_out", "gauge", "Connections currently in use."),
+        ("db_pool_size", "size", "gauge", "Configured pool size."),
+        ("db_pool_overflow", "overflow", "gauge", "Connections open beyond the pool size."),
+        ("db_pool_checkouts_total", "checkouts", "counter", "Connections handed out by the pool."),
+        ("db_pool_timeouts_total", "timeouts", "counter", "Checkouts that gave up waiting for a connection."),
+        ("db_pool_wait_seconds_total", "wait_seconds_total", "counter", "Time spent waiting for a connection."),
+    ]
+    for metric, key, kind, help_text in gauges:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        for engine_name, status in pools.items():
+            if key in status:
+                lines.append(f"{metric}{_labels(engine=engine_name)} {status[key]}")
+    return "\n".join(lines) + "\n"
@@ -1,5 +1,11 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, DateTime, Index, LargeBinary, Numeric, Text, text
+from sqlalchemy.orm import deferred, validates
 from app.database import Base
+from app.periods import month_start
+
+# Unique over (agent_id, period) for every payment that is not cancelled:
+# at most one live payment per agent per month, enforced by the database.
+PAYMENT_PERIOD_INDEX = "uq_payments_agent_period_active"
 
 class User(Base):
     __tablename__ = "users"
@@ -20,13 +26,34 @@ class Agent(Base):
     phone_number = Column(String, unique=True, nullable=True)
 
 
+# On Postgres, payments and debts are range-partitioned by month of their date
+# column (see app.partitions); id stays the ORM identity but is no longer a
+# database primary key there.
 class Payment(Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        Index("ix_payments_agent_id_payment_date", "agent_id", "payment_date"),
+        Index(
+            PAYMENT_PERIOD_INDEX, "agent_id", "period", unique=True,
+            postgresql_where=text("status <> 'Cancelled'"),
+            sqlite_where=text("status <> 'Cancelled'"),
+        ),
+    )
     id = Column(Integer, primary_key=True)
     amount = Column(Float)
     status = Column(String)
     payment_date = Column(Date, nullable=True)
-    agent_id = Column(Integer, ForeignKey("agents.id"))
+    period = Column(Date, nullable=True)  # first day of payment_date's month
+    agent_id = Column(Integer, ForeignKey("agents.id", ondelete="CASCADE"))
+
+    @validates("payment_date")
+    def _set_period(self, key, value):
+        # Same month: keep the stored period. Legacy duplicates were left with a
+        # NULL period by migration 7d2a9e4c6f18, and recomputing it on an edit
+        # that keeps the month would trip the unique index.
+        if self.payment_date is None or month_start(value) != month_start(self.payment_date):
+            self.period = month_start(value)
+        return value
 
 
 class Debt(Base):
@@ -35,5 +62,68 @@ class Debt(Base):
     amount = Column(Float)
     reason = Column(String)
     debt_date = Column(Date, nullable=True)
-    agent_id = Column(Integer, ForeignKey("agents.id"))
+    agent_id = Column(Integer, ForeignKey("agents.id", ondelete="CASCADE"), index=True)
+
+
+
+class MonthlyAgentSummary(Base):
+    """Per-agent, per-month rollup of payments and debts, kept current by app.summary."""
+    __tablename__ = "monthly_agent_summary"
+    agent_id = Column(Integer, ForeignKey("agents.id", ondelete="CASCADE"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    # Exact (cents) on Postgres, so the +/- of every edit cannot drift; read back as float
+    payments_total = Column(Numeric(14, 2, asdecimal=False), default=0.0, nullable=False)  # every payment, any status
+    paid_total = Column(Numeric(14, 2, asdecimal=False), default=0.0, nullable=False)  # "Completed" payments only
+    debt_total = Column(Numeric(14, 2, asdecimal=False), default=0.0, nullable=False)
+    payment_count = Column(Integer, default=0, nullable=False)
+    pending_count = Column(Integer, default=0, nullable=False)
+    completed_count = Column(Integer, default=0, nullable=False)
+    failed_count = Column(Integer, default=0, nullable=False)
+    cancelled_count = Column(Integer, default=0, nullable=False)
+    debt_count = Column(Integer, default=0, nullable=False)
+
+
+class LedgerEntry(Base):
+    """Append-only record of every change to an agent's balance (see app.ledger)."""
+    __tablename__ = "ledger_entries"
+    id = Column(Integer, primary_key=True)
+    agent_id = Column(Integer, ForeignKey("agents.id", ondelete="CASCADE"), nullable=False, index=True)
+    kind = Column(String, nullable=False)  # payment / debt
+    source_id = Column(Integer, nullable=True)  # the payment or debt; not a foreign key, entries outlive it
+    amount = Column(Float, nullable=False)  # signed: reversals are negative
+    entry_date = Column(Date, nullable=True)  # payment_date / debt_date of the source
+    created_at = Column(DateTime, nullable=False)
+
+
+class AgentBalance(Base):
+    """Running totals of ``ledger_entries`` per agent, updated with every entry."""
+    __tablename__ = "agent_balances"
+    agent_id = Column(Integer, ForeignKey("agents.id", ondelete="CASCADE"), primary_key=True)
+    paid_total = Column(Float, default=0.0, nullable=False)  # "Completed" payments
+    debt_total = Column(Float, default=0.0, nullable=False)
+    entry_count = Column(Integer, default=0, nullable=False)
+
 
+class DataVersion(Base):
+    """Change counter per table, bumped by the write routes (see app.versions)."""
+    __tablename__ = "data_versions"
+    name = Column(String, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+
+
+class ReportJob(Base):
+    """A report rendered in the background by app.jobs."""
+    __tablename__ = "report_jobs"
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    params = Column(Text, nullable=False, default="{}")  # JSON
+    status = Column(String, nullable=False, default="queued", index=True)  # queued / running / done / failed
+    error = Column(Text, nullable=True)
+    media_type = Column(String, nullable=True)
+    filename = Column(String, nullable=True)
+    result = deferred(Column(LargeBinary, nullable=True))  # only loaded for downloads
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)  # while running: requeued once this passes
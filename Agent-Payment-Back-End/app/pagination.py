@@ -0,0 +1,41 @@
+"""Keyset (cursor) pagination shared by the list endpoints."""
+from typing import Optional
+from fastapi import Query
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class PageParams:
+    """Query parameters common to every paginated list endpoint."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        after: Optional[int] = Query(None, description="Cursor: return rows with an id greater than this"),
+        all_rows: bool = Query(False, alias="all", description="Return every matching row as a plain list"),
+    ):
+        self.limit = limit
+        self.after = after
+        self.all_rows = all_rows
+
+
+def paginate(query, id_column, page: PageParams, cursor: str = "id"):
+    """Apply ``page`` to ``query`` ordered by ``id_column``.
+
+    Returns the plain list of rows when ``?all=true`` was requested, otherwise
+    ``{"items": [...], "next_cursor": id or None}``. One row past the limit is
+    fetched to know whether another page exists. ``cursor`` names the
+    attribute holding ``id_column`` on each row, for queries that label it.
+    """
+    query = query.order_by(id_column)
+    if page.all_rows:
+        return query.all()
+    if page.after is not None:
+        query = query.filter(id_column > page.after)
+    rows = query.limit(page.limit + 1).all()
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        next_cursor = getattr(rows[-1], cursor)
+    return {"items": rows, "next_cursor": next_cursor}
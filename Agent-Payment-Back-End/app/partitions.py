@@ -0,0 +1,179 @@
+"""Monthly range partitions of ``payments`` and ``debts`` (Postgres only).
+
+Migration 8c41d2f6a5e3 turns both tables into ``PARTITION BY RANGE`` on
+their date column, with one partition per calendar month
+(``payments_2025_05`` holds May 2025) and a ``<table>_default`` partition
+for undated rows and months without a partition of their own. Queries that
+filter on ``payment_date`` / ``debt_date`` then only read the months they ask
+for, and vacuum and index maintenance work on one month at a time.
+
+``ensure_partitions`` creates the partitions for the coming
+``PARTITION_MONTHS_AHEAD`` months; it runs at startup and from
+``manage_partitions.py`` (cron). It also gives any month that landed in the
+default partition a partition of its own, moving its rows there.
+``detach_partitions`` detaches (and optionally drops) months older than a
+cutoff, so old history stops weighing on the live tables.
+
+Postgres cannot build a unique index on a partitioned table unless it
+includes the partition key, so the one-live-payment-per-month index is
+created on each partition instead. Each partition holds a single month, so
+the per-partition indexes enforce the same rule as the old global one.
+
+Every function takes a ``Session`` or a ``Connection`` and does not commit.
+On other databases, and on Postgres before the migration, they do nothing.
+``ensure_partitions`` and ``detach_partitions`` take a transaction-level
+advisory lock first, so the workers that all run them at startup (and a cron
+job) take turns instead of racing to create the same partition.
+"""
+import os
+import re
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import text
+from app.models import PAYMENT_PERIOD_INDEX
+from app.periods import add_months, month_start
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
+# table -> partition key
+PARTITIONED_TABLES = {
+    "payments": "payment_date",
+    "debts": "debt_date",
+}
+
+# Indexes every partition needs of its own: (name prefix, unique, definition)
+LOCAL_INDEXES = {
+    "payments": [(PAYMENT_PERIOD_INDEX, True, "(agent_id, period) WHERE status <> 'Cancelled'")],
+    "debts": [],
+}
+
+# pg_advisory_xact_lock key shared by everything that adds or removes partitions
+PARTITION_LOCK_KEY = 824_130_265
+
+_MONTH_SUFFIX = re.compile(r"_(\d{4})_(\d{2})$")
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """The month a partition named by ``partition_name`` holds; ``None`` for the default partition."""
+    match = _MONTH_SUFFIX.search(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def default_partition(table: str) -> str:
+    return f"{table}_default"
+
+
+def _is_postgres(db) -> bool:
+    bind = db.get_bind() if hasattr(db, "get_bind") else db
+    return bind.dialect.name == "postgresql"
+
+
+def _lock(db):
+    """Wait for other partition maintenance to finish; released when the transaction ends."""
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+
+
+def is_partitioned(db, table: str) -> bool:
+    if not _is_postgres(db):
+        return False
+    return db.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"), {"table": table}
+    ).scalar() is not None
+
+
+def list_partitions(db, table: str) -> List[str]:
+    """Names of the partitions currently attached to ``table``."""
+    return sorted(db.execute(text("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:table)
+    """), {"table": table}).scalars())
+
+
+def create_local_indexes(db, table: str, partition: str):
+    suffix = partition[len(table):]  # "_2025_05" or "_default"
+    for prefix, unique, definition in LOCAL_INDEXES[table]:
+        db.execute(text(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {prefix}{suffix} ON {partition} {definition}"
+        ))
+
+
+def create_partition(db, table: str, month: date) -> bool:
+    """Create ``table``'s partition for ``month``; ``False`` if it already exists.
+
+    Rows of that month already sitting in the default partition are moved
+    into the new one before it is attached.
+    """
+    month = month_start(month)
+    name = partition_name(table, month)
+    if db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+        return False
+    column = PARTITIONED_TABLES[table]
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    db.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    db.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {default_partition(table)} WHERE {column} >= :start AND {column} < :end RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), {"start": start, "end": end})
+    create_local_indexes(db, table, name)
+    # Attaching also builds the partitioned indexes and foreign keys on the new table
+    db.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"))
+    return True
+
+
+def months_in_default(db, table: str) -> List[date]:
+    column = PARTITIONED_TABLES[table]
+    return [month_start(d) for d in db.execute(text(
+        f"SELECT DISTINCT date_trunc('month', {column})::date FROM {default_partition(table)} "
+        f"WHERE {column} IS NOT NULL ORDER BY 1"
+    )).scalars()]
+
+
+def ensure_partitions(db, months_ahead: int = PARTITION_MONTHS_AHEAD, today: Optional[date] = None) -> Dict[str, List[str]]:
+    """Create missing partitions up to ``months_ahead`` months from now; returns the new ones per table."""
+    created = {}
+    if not _is_postgres(db):
+        return created
+    _lock(db)
+    current = month_start(today or date.today())
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(db, table):
+            continue
+        months = {add_months(current, n) for n in range(months_ahead + 1)}
+        months.update(months_in_default(db, table))
+        created[table] = [partition_name(table, m) for m in sorted(months) if create_partition(db, table, m)]
+    return created
+
+
+def detach_partitions(db, before: date, tables: Iterable[str] = PARTITIONED_TABLES, drop: bool = False) -> List[str]:
+    """Detach every monthly partition older than ``before``'s month; returns their names.
+
+    Detached partitions stay behind as plain tables (an archive that can be
+    dumped or re-attached) unless ``drop`` is set. They keep their foreign
+    key to ``agents``, so the admin reset empties them along with everything
+    else. ``monthly_agent_summary``
+    keeps their totals, so the dashboard still covers those months, but
+    payslips and exports no longer see their rows.
+    """
+    cutoff = month_start(before)
+    detached = []
+    if not _is_postgres(db):
+        return detached
+    _lock(db)
+    for table in tables:
+        if not is_partitioned(db, table):
+            continue
+        for name in list_partitions(db, table):
+            month = partition_month(name)
+            if month is None or month >= cutoff:
+                continue
+            db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            if drop:
+                db.execute(text(f"DROP TABLE {name}"))
+            detached.append(name)
+    return detached
@@ -0,0 +1,142 @@
+"""A minimal PDF writer that emits each page as soon as it is finished.
+
+ReportLab's ``canvas.Canvas`` keeps every page in memory until ``save()``, so a
+report's peak memory grows with its length. ``StreamingCanvas`` implements the
+part of the canvas API the reports use (fonts, strings, lines, rectangles, fill
+colour, page breaks) and writes PDF objects incrementally: after ``showPage()``
+the finished page can be collected with ``take()`` and sent to the client. Only
+the byte offsets needed for the final cross-reference table are kept.
+"""
+import zlib
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+# ReportLab's canvas starts every page with this state
+DEFAULT_FONT = ("Helvetica", 12)
+
+
+def _escape(text: str) -> bytes:
+    raw = text.encode("cp1252", errors="replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _num(value) -> str:
+    return f"{value:.4f}".rstrip("0").rstrip(".")
+
+
+class StreamingCanvas:
+    def __init__(self, pagesize=A4, compress=True):
+        self.pagesize = pagesize
+        self.compress = compress
+        self._out = []  # bytes not yet handed out by take()
+        self._offset = 0
+        self._offsets = {}  # object number -> byte offset
+        self._next_obj = 1
+        self._fonts = {}  # font name -> (resource name, object number)
+        self._kids = []  # page object numbers
+
+        self._catalog = self._alloc()
+        self._pages = self._alloc()
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._write_obj(self._catalog, f"<< /Type /Catalog /Pages {self._pages} 0 R >>".encode())
+        self._start_page()
+
+    # -- low level -------------------------------------------------------
+
+    def _alloc(self):
+        number = self._next_obj
+        self._next_obj += 1
+        return number
+
+    def _write(self, data: bytes):
+        self._out.append(data)
+        self._offset += len(data)
+
+    def _write_obj(self, number, body: bytes):
+        self._offsets[number] = self._offset
+        self._write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def _font_ref(self, name):
+        if name not in self._fonts:
+            number = self._alloc()
+            resource = f"F{len(self._fonts) + 1}"
+            self._write_obj(number, (
+                f"<< /Type /Font /Subtype /Type1 /Name /{resource} "
+                f"/BaseFont /{name} /Encoding /WinAnsiEncoding >>"
+            ).encode())
+            self._fonts[name] = (resource, number)
+        return self._fonts[name][0]
+
+    def _start_page(self):
+        self._ops = []
+        self._page_fonts = set()
+        self._font_name, self._font_size = DEFAULT_FONT
+
+    # -- canvas API ------------------------------------------------------
+
+    def setFont(self, name, size):
+        self._font_name, self._font_size = name, size
+
+    def setFillColor(self, color):
+        self._ops.append(f"{_num(color.red)} {_num(color.green)} {_num(color.blue)} rg".encode())
+
+    def drawString(self, x, y, text):
+        resource = self._font_ref(self._font_name)
+        self._page_fonts.add(self._font_name)
+        self._ops.append(
+            f"BT /{resource} {_num(self._font_size)} Tf 1 0 0 1 {_num(x)} {_num(y)} Tm (".encode()
+            + _escape(str(text)) + b") Tj ET"
+        )
+
+    def drawCentredString(self, x, y, text):
+        text = str(text)
+        self.drawString(x - stringWidth(text, self._font_name, self._font_size) / 2.0, y, text)
+
+    def line(self, x1, y1, x2, y2):
+        self._ops.append(f"{_num(x1)} {_num(y1)} m {_num(x2)} {_num(y2)} l S".encode())
+
+    def rect(self, x, y, width, height):
+        self._ops.append(f"{_num(x)} {_num(y)} {_num(width)} {_num(height)} re S".encode())
+
+    def showPage(self):
+        """Finish the current page and write it out."""
+        content = b"\n".join(self._ops)
+        content_obj = self._alloc()
+        if self.compress:
+            content = zlib.compress(content)
+            header = f"<< /Length {len(content)} /Filter /FlateDecode >>"
+        else:
+            header = f"<< /Length {len(content)} >>"
+        self._write_obj(content_obj, header.encode() + b"\nstream\n" + content + b"\nendstream")
+
+        fonts = " ".join(
+            f"/{self._fonts[name][0]} {self._fonts[name][1]} 0 R" for name in sorted(self._page_fonts)
+        )
+        width, height = self.pagesize
+        page_obj = self._alloc()
+        self._write_obj(page_obj, (
+            f"<< /Type /Page /Parent {self._pages} 0 R /MediaBox [0 0 {_num(width)} {_num(height)}] "
+            f"/Contents {content_obj} 0 R /Resources << /Font << {fonts} >> >> >>"
+        ).encode())
+        self._kids.append(page_obj)
+        self._start_page()
+
+    def save(self):
+        """Finish the last page and write the page tree, xref table and trailer."""
+        if self._ops or not self._kids:
+            self.showPage()
+        kids = " ".join(f"{n} 0 R" for n in self._kids)
+        self._write_obj(self._pages, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._kids)} >>".encode())
+
+        xref_offset = self._offset
+        size = self._next_obj
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        lines += [f"{self._offsets[n]:010d} 00000 n \n" for n in range(1, size)]
+        lines.append(f"trailer\n<< /Size {size} /Root {self._catalog} 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n")
+        self._write("".join(lines).encode())
+
+    def take(self) -> bytes:
+        """Bytes written since the last call."""
+        data = b"".join(self._out)
+        self._out = []
+        return data
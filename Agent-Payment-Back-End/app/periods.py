@@ -0,0 +1,30 @@
+"""Month arithmetic for payment periods."""
+from datetime import date
+from typing import Optional
+
+
+def month_start(d: Optional[date]) -> Optional[date]:
+    """First day of the month ``d`` falls in (``None`` stays ``None``)."""
+    if d is None:
+        return None
+    return d.replace(day=1)
+
+
+def month_range(d: date):
+    """Half-open ``[start, end)`` date range covering the month of ``d``.
+
+    Filtering ``payment_date >= start AND payment_date < end`` can use an index
+    on ``payment_date``, unlike ``extract('month', ...)``.
+    """
+    start = d.replace(day=1)
+    if start.month == 12:
+        end = date(start.year + 1, 1, 1)
+    else:
+        end = date(start.year, start.month + 1, 1)
+    return start, end
+
+
+def add_months(d: date, months: int) -> date:
+    """First day of the month ``months`` after (or before, when negative) ``d``'s month."""
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
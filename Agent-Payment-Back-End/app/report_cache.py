@@ -0,0 +1,121 @@
+"""In-memory LRU cache for rendered reports, with ETag support.
+
+Entries are addressed by a digest of the report name, its parameters and the
+current ``data_versions`` of the tables it reads. Any write to those tables
+bumps a version, which changes the key, so stale entries are never served;
+they simply age out of the LRU. The same digest is used as the ETag, so a
+client revalidating with ``If-None-Match`` gets a 304 without a render.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app import versions
+
+# Total bytes kept across all cached reports, and the largest single report kept
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+REPORT_CACHE_MAX_ENTRY_BYTES = int(os.getenv("REPORT_CACHE_MAX_ENTRY_BYTES", str(8 * 1024 * 1024)))
+
+
+class ReportCache:
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_entry_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def tee(self, key: str, chunks: Iterable[bytes]):
+        """Pass ``chunks`` through, storing the whole body once it is complete.
+
+        Bodies that grow past ``max_entry_bytes`` stop being buffered and are
+        not cached.
+        """
+        buffered, size = [], 0
+        for chunk in chunks:
+            if buffered is not None:
+                size += len(chunk)
+                if size > self.max_entry_bytes:
+                    buffered = None
+                else:
+                    buffered.append(chunk)
+            yield chunk
+        if buffered is not None:
+            self.put(key, b"".join(buffered))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+
+cache = ReportCache(REPORT_CACHE_MAX_BYTES, REPORT_CACHE_MAX_ENTRY_BYTES)
+
+
+def cache_key(report: str, params: dict, data_versions: dict) -> str:
+    payload = json.dumps([report, params, data_versions], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an ``If-None-Match`` header against ``etag``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def cached_report(request: Request, db: Session, report: str, params: dict, tables: Iterable[str],
+                  render, media_type: str, headers: dict) -> Response:
+    """Serve ``report`` from the cache, or render it with ``render()`` and cache it.
+
+    ``render`` is only called on a miss and must return an iterable of byte chunks.
+    Reports keyed on something narrower than whole tables pass no ``tables`` and
+    put that in ``params`` instead.
+    """
+    key = cache_key(report, params, versions.current(db, *tables) if tables else {})
+    etag = f'"{key[:32]}"'
+    headers = {**headers, "ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    data = cache.get(key)
+    if data is not None:
+        return Response(content=data, media_type=media_type, headers=headers)
+    return StreamingResponse(cache.tee(key, render()), media_type=media_type, headers=headers)
@@ -0,0 +1,171 @@
+"""Data access for the report endpoints.
+
+Every loader here issues a fixed number of statements however many rows the
+report covers: agent names come from a join (or one id -> name map), never
+from a lookup per row.
+"""
+from collections import defaultdict, namedtuple
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app import ledger
+from app.models import Agent, Debt, MonthlyAgentSummary, Payment
+from app.periods import month_range
+
+
+def agents_query(db: Session):
+    return db.query(Agent).order_by(Agent.id)
+
+
+def debts_with_agent_names(db: Session):
+    """``(Debt, agent name or None)`` rows in one LEFT JOIN."""
+    return db.query(Debt, Agent.name).outerjoin(Agent, Agent.id == Debt.agent_id).order_by(Debt.id)
+
+
+def agent_name_map(db: Session, agent_ids: Optional[Iterable[int]] = None) -> Dict[int, str]:
+    """``{agent id: name}`` for ``agent_ids`` (every agent when omitted), in one query."""
+    query = db.query(Agent.id, Agent.name)
+    if agent_ids is not None:
+        query = query.filter(Agent.id.in_(set(agent_ids)))
+    return dict(query.all())
+
+
+def agent_label(agent_id, name: Optional[str]) -> str:
+    """What a report prints for an agent, falling back to the id for deleted agents."""
+    return name if name else f"ID: {agent_id}"
+
+
+@dataclass
+class PayslipData:
+    agent: Agent
+    payments: List[Payment]
+    debts: List[Debt]
+    total_paid: float
+    total_debt: float
+    title_period: str
+    period: Optional[str] = None  # "YYYY-MM" or "YYYY", used in file names
+
+
+# Plain rows for batch payslips: cheap to pickle into a process pool
+AgentLine = namedtuple("AgentLine", "id name role salary")
+PaymentLine = namedtuple("PaymentLine", "payment_date amount")
+DebtLine = namedtuple("DebtLine", "debt_date reason amount")
+
+
+def check_month(month: str):
+    try:
+        datetime.strptime(month, "%Y-%m")
+    except (TypeError, ValueError):
+        raise ValueError("month must be in YYYY-MM format")
+
+
+def check_batch_params(type: str, month: Optional[str], year: Optional[int], format: str):
+    """The batch payslip rules, shared by the route and background jobs; raises ``ValueError``."""
+    if not ((type == "monthly" and month) or (type == "yearly" and isinstance(year, int) and year)):
+        raise ValueError("Batch payslips need type=monthly&month=YYYY-MM or type=yearly&year=YYYY")
+    if format not in ("zip", "pdf"):
+        raise ValueError("format must be 'zip' or 'pdf'")
+    if type == "monthly":
+        check_month(month)
+
+
+def period_bounds(type: str, month: Optional[str] = None, year: Optional[int] = None):
+    """``(start, end, title)`` for a payslip period; ``start``/``end`` are ``None`` for all time."""
+    if type == "monthly" and month:
+        start, end = month_range(datetime.strptime(month, "%Y-%m").date())
+        return start, end, f"Period: {month}"
+    if type == "yearly" and year:
+        return date(year, 1, 1), date(year + 1, 1, 1), f"Year: {year}"
+    return None, None, "All Time Record"
+
+
+def load_payslip(db: Session, agent_id: int, type: str, month: Optional[str] = None,
+                 year: Optional[int] = None) -> Optional[PayslipData]:
+    """Everything a payslip shows, or ``None`` if the agent does not exist."""
+    agent = db.get(Agent, agent_id)
+    if not agent:
+        return None
+
+    payments_query = db.query(Payment).filter(Payment.agent_id == agent_id, Payment.status == "Completed")
+    debts_query = db.query(Debt).filter(Debt.agent_id == agent_id)
+
+    start, end, title_period = period_bounds(type, month, year)
+    if start:
+        payments_query = payments_query.filter(Payment.payment_date >= start, Payment.payment_date < end)
+        debts_query = debts_query.filter(Debt.debt_date >= start, Debt.debt_date < end)
+
+    payments = payments_query.order_by(Payment.payment_date, Payment.id).all()
+    debts = debts_query.order_by(Debt.debt_date, Debt.id).all()
+
+    if start:
+        # Dated periods are covered by the monthly rollup: at most 12 rows to add up
+        summary_query = db.query(
+            func.coalesce(func.sum(MonthlyAgentSummary.paid_total), 0.0),
+            func.coalesce(func.sum(MonthlyAgentSummary.debt_total), 0.0),
+        ).filter(MonthlyAgentSummary.agent_id == agent_id, MonthlyAgentSummary.year == start.year)
+        if type == "monthly":
+            summary_query = summary_query.filter(MonthlyAgentSummary.month == start.month)
+        total_paid, total_debt = summary_query.one()
+    else:
+        # All time, undated rows included, is the agent's running ledger balance
+        totals = ledger.balances_query(db, [agent_id]).one()
+        total_paid, total_debt = totals.paid_total, totals.debt_total
+
+    period = month if type == "monthly" and month else (str(year) if type == "yearly" and year else None)
+    return PayslipData(agent, payments, debts, total_paid, total_debt, title_period, period)
+
+
+def load_payslips(db: Session, type: str, month: Optional[str] = None, year: Optional[int] = None,
+                  agent_ids: Optional[Iterable[int]] = None, role: Optional[str] = None) -> List[PayslipData]:
+    """Payslips for every matching agent over a month or a year, in four queries.
+
+    Agents, the period's completed payments, the period's debts and the rollup
+    totals are each fetched once for the whole batch and split per agent here.
+    """
+    start, end, title_period = period_bounds(type, month, year)
+    if not start:
+        raise ValueError("batch payslips need a month or a year")
+
+    agents_query = db.query(Agent.id, Agent.name, Agent.role, Agent.salary).order_by(Agent.id)
+    if agent_ids is not None:
+        agents_query = agents_query.filter(Agent.id.in_(set(agent_ids)))
+    if role:
+        agents_query = agents_query.filter(Agent.role == role)
+    agents = [AgentLine(*row) for row in agents_query.all()]
+    if not agents:
+        return []
+    ids = [a.id for a in agents]
+
+    payments = defaultdict(list)
+    for agent_id, payment_date, amount in db.query(Payment.agent_id, Payment.payment_date, Payment.amount).filter(
+        Payment.agent_id.in_(ids), Payment.status == "Completed",
+        Payment.payment_date >= start, Payment.payment_date < end,
+    ).order_by(Payment.payment_date, Payment.id):
+        payments[agent_id].append(PaymentLine(payment_date, amount))
+
+    debts = defaultdict(list)
+    for agent_id, debt_date, reason, amount in db.query(Debt.agent_id, Debt.debt_date, Debt.reason, Debt.amount).filter(
+        Debt.agent_id.in_(ids), Debt.debt_date >= start, Debt.debt_date < end,
+    ).order_by(Debt.debt_date, Debt.id):
+        debts[agent_id].append(DebtLine(debt_date, reason, amount))
+
+    totals_query = db.query(
+        MonthlyAgentSummary.agent_id,
+        func.sum(MonthlyAgentSummary.paid_total),
+        func.sum(MonthlyAgentSummary.debt_total),
+    ).filter(MonthlyAgentSummary.agent_id.in_(ids), MonthlyAgentSummary.year == start.year)
+    if type == "monthly":
+        totals_query = totals_query.filter(MonthlyAgentSummary.month == start.month)
+    totals = {agent_id: (paid, debt) for agent_id, paid, debt in totals_query.group_by(MonthlyAgentSummary.agent_id)}
+
+    period = month if type == "monthly" else str(year)
+    payslips = []
+    for agent in agents:
+        total_paid, total_debt = totals.get(agent.id, (0.0, 0.0))
+        payslips.append(PayslipData(
+            agent, payments[agent.id], debts[agent.id],
+            total_paid or 0.0, total_debt or 0.0, title_period, period,
+        ))
+    return payslips
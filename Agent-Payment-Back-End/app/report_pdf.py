@@ -0,0 +1,276 @@
+"""PDF rendering for the reports, one finished page at a time.
+
+Each ``render_*`` function is a generator of PDF byte chunks suitable for a
+``StreamingResponse``: rows are read from the database in batches with
+``yield_per`` and every page is sent as soon as it is complete, so memory and
+time-to-first-byte stay flat however long the report gets.
+"""
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from sqlalchemy.orm import Session
+from app import report_data
+from app.pdfstream import StreamingCanvas
+
+# Rows fetched from the database per round trip while rendering
+BATCH_SIZE = 500
+
+# Processes used to render batch payslips (0 or 1 renders in the request worker)
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+# Helper to generate a generic PDF table header.
+# No generation time: reports are cached per data version (app.report_cache), so
+# the same bytes are served until the data changes and a timestamp would go stale.
+def draw_header(c, title):
+    c.setFont("Helvetica-Bold", 16)
+    c.drawCentredString(300, 800, "AgentPay Management System")
+    c.setFont("Helvetica-Bold", 14)
+    c.drawCentredString(300, 770, title)
+    c.line(50, 740, 550, 740)
+
+
+def render_agents(db: Session):
+    c = StreamingCanvas(pagesize=A4)
+    draw_header(c, "List of Agents")
+
+    y = 700
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(50, y, "ID")
+    c.drawString(100, y, "Name")
+    c.drawString(250, y, "Role")
+    c.drawString(400, y, "Salary")
+
+    y -= 20
+    c.line(50, y+15, 550, y+15)
+    c.setFont("Helvetica", 10)
+    yield c.take()
+
+    for a in report_data.agents_query(db).yield_per(BATCH_SIZE):
+        c.drawString(50, y, str(a.id))
+        c.drawString(100, y, a.name)
+        c.drawString(250, y, a.role)
+        c.drawString(400, y, f"${a.salary:,.2f}")
+        y -= 20
+        if y < 50:
+            c.showPage()
+            yield c.take()
+            y = 750
+
+    c.save()
+    yield c.take()
+
+
+def render_debts(db: Session):
+    c = StreamingCanvas(pagesize=A4)
+    draw_header(c, "List of All Debts")
+
+    y = 700
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(50, y, "Agent")
+    c.drawString(200, y, "Amount")
+    c.drawString(300, y, "Reason")
+    c.drawString(450, y, "Date")
+
+    y -= 20
+    c.setFont("Helvetica", 10)
+    yield c.take()
+
+    for d, agent_name in report_data.debts_with_agent_names(db).yield_per(BATCH_SIZE):
+        c.drawString(50, y, report_data.agent_label(d.agent_id, agent_name))
+        c.drawString(200, y, f"${d.amount:,.2f}")
+        c.drawString(300, y, d.reason)
+        c.drawString(450, y, str(d.debt_date))
+        y -= 20
+        if y < 50:
+            c.showPage()
+            yield c.take()
+            y = 750
+
+    c.save()
+    yield c.take()
+
+
+def draw_payslip(c, data: report_data.PayslipData, type: str):
+    """Draw one payslip on ``c``, yielding whenever a page is finished.
+
+    The last page is left open so the caller decides whether to save or to
+    continue with another payslip.
+    """
+    agent = data.agent
+    draw_header(c, f"PAYSLIP - {type.upper()}")
+
+    # Agent Info Box
+    c.rect(50, 650, 500, 80)
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(60, 710, f"Agent Name: {agent.name}")
+    c.setFont("Helvetica", 10)
+    c.drawString(60, 690, f"Role: {agent.role}")
+    c.drawString(60, 670, f"Base Salary: ${agent.salary:,.2f}")
+    c.drawString(400, 710, data.title_period)
+
+    y = 600
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, y, "Earnings (Payments Received)")
+    y -= 20
+    c.setFont("Helvetica", 10)
+    for p in data.payments:
+        c.drawString(70, y, f"Date: {p.payment_date} | Amount: ${p.amount:,.2f}")
+        y -= 15
+
+    y -= 10
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, y, "Deductions (Debts Taken)")
+    y -= 20
+    c.setFont("Helvetica", 10)
+    for d in data.debts:
+        c.drawString(70, y, f"Date: {d.debt_date} | {d.reason}: -${d.amount:,.2f}")
+        y -= 15
+
+    y -= 30
+    c.line(50, y, 550, y)
+    y -= 20
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(50, y, "SUMMARY")
+    y -= 20
+    c.setFont("Helvetica", 12)
+    c.drawString(70, y, f"Total Earnings: ${data.total_paid:,.2f}")
+    y -= 20
+    c.drawString(70, y, f"Total Deductions: -${data.total_debt:,.2f}")
+    y -= 20
+    c.setFont("Helvetica-Bold", 13)
+    c.setFillColor(colors.blue)
+    net = data.total_paid
+    c.drawString(70, y, f"NET PAID: ${net:,.2f}")
+
+    # Signature area at the bottom
+    y -= 100
+    if y < 100:
+        c.showPage()
+        yield c.take()
+        y = 700
+
+    c.line(350, y, 550, y)
+    c.setFont("Helvetica", 10)
+    c.setFillColor(colors.black)
+    c.drawCentredString(450, y - 15, "Agent's Signature")
+    c.drawCentredString(450, y - 30, f"{agent.name}")
+
+
+def render_payslip(data: report_data.PayslipData, type: str):
+    c = StreamingCanvas(pagesize=A4)
+    yield from draw_payslip(c, data, type)
+    c.save()
+    yield c.take()
+
+
+def payslip_bytes(data: report_data.PayslipData, type: str) -> bytes:
+    """A whole payslip as bytes; top level so a process pool can run it."""
+    return b"".join(render_payslip(data, type))
+
+
+def render_payslips_merged(payslips, type: str):
+    """Every payslip in ``payslips`` as consecutive pages of one PDF."""
+    c = StreamingCanvas(pagesize=A4)
+    for data in payslips:
+        yield from draw_payslip(c, data, type)
+        c.showPage()
+        yield c.take()
+    c.save()
+    yield c.take()
+
+
+class _ZipSink:
+    """Write-only, unseekable file object: zipfile streams into it."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def render_payslips_zip(payslips, type: str, workers: int = REPORT_WORKERS):
+    """A ZIP with one PDF per payslip, rendered across ``workers`` processes.
+
+    Archive entries are streamed as each payslip finishes rendering (in input
+    order). PDFs are already compressed, so entries are stored as-is.
+    """
+    payslips = list(payslips)
+    if workers > 1 and len(payslips) > 1:
+        rendered = _render_in_pool(_payslip_pool(workers), payslips, type)
+    else:
+        rendered = (payslip_bytes(data, type) for data in payslips)
+
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        for data, pdf in zip(payslips, rendered):
+            archive.writestr(payslip_filename(data, type), pdf)
+            yield sink.take()
+    yield sink.take()
+
+
+def payslip_filename(data: report_data.PayslipData, type: str) -> str:
+    safe_name = re.sub(r"[^A-Za-z0-9_-]+", "_", data.agent.name or "").strip("_")
+    period = data.period or "all"
+    return f"payslip_{data.agent.id}_{safe_name}_{type}_{period}.pdf"
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _payslip_pool(workers: int):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None and _pool_workers != workers:
+            # Batches already submitted to the old pool still finish
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            # spawn: workers must not inherit the server's threads and DB connections
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def _render_in_pool(pool, payslips, type: str):
+    try:
+        yield from pool.map(payslip_bytes, payslips, [type] * len(payslips), chunksize=8)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory): this batch fails, the next one gets a fresh pool
+        _discard_pool(pool)
+        raise
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown():
+    """Stop the payslip rendering processes (application shutdown)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -1,34 +1,51 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from app.database import SessionLocal
+from app import database
+from app.database import get_db
 from app.deps import get_current_user
+from app import versions
+from app.models import Agent, AgentBalance, Debt, LedgerEntry, MonthlyAgentSummary, Payment
+
+logger = logging.getLogger(__name__)
+
+# Everything but users, data versions and report jobs, children first
+DATA_TABLES = (
+    Payment.__table__, Debt.__table__, MonthlyAgentSummary.__table__,
+    LedgerEntry.__table__, AgentBalance.__table__, Agent.__table__,
+)
 
 router = APIRouter(
     prefix="/admin",
     tags=["Admin"]
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.delete("/reset-database", status_code=status.HTTP_204_NO_CONTENT)
 def reset_database(
     db: Session = Depends(get_db),
     user=Depends(get_current_user)
 ):
     try:
-        # Truncate tables and restart identity (reset IDs)
-        # RESTART IDENTITY resets the serial counters
-        # CASCADE ensures dependent rows are deleted (though we are truncating both)
-        db.execute(text("TRUNCATE TABLE payments, agents RESTART IDENTITY CASCADE;"))
+        if db.get_bind().dialect.name == "postgresql":
+            # One statement for every data table; RESTART IDENTITY resets the serial counters.
+            # CASCADE also empties the partitions detached by app.partitions.detach_partitions:
+            # those archives keep their foreign key to agents, and a reset wipes them too.
+            names = ", ".join(table.name for table in DATA_TABLES)
+            db.execute(text(f"TRUNCATE TABLE {names} RESTART IDENTITY CASCADE"))
+        else:
+            for table in DATA_TABLES:
+                db.execute(table.delete())
+        versions.bump(db, *versions.ALL_TABLES)
         db.commit()
-        print("Database reset successfully")
+        logger.info("Database reset successfully")
     except Exception as e:
-        print(f"Error resetting database: {e}")
+        logger.exception("Error resetting database")
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database reset failed: {str(e)}")
+
+
+@router.get("/pool")
+def pool_status(user=Depends(get_current_user)):
+    # Connection pool occupancy and how long requests waited for a connection
+    return database.pool_status()
@@ -1,19 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
-from app.models import Agent, Payment, Debt
-from app.schemas import AgentCreate, AgentOut
-from app.deps import admin_only
+from app.database import get_async_db, get_db
+from app.models import Agent
+from app.schemas import AgentBalanceOut, AgentBalancePage, AgentCreate, AgentImportOut, AgentOut, AgentPage
+from app.deps import admin_only, get_current_user
+from app.pagination import PageParams, paginate
+from app import agent_import, conditional, fastjson, ledger, versions
 
 router = APIRouter(prefix="/agents", tags=["Agents"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/", response_model=AgentOut)
 def create_agent(agent: AgentCreate, db: Session = Depends(get_db), user=Depends(admin_only)):
     # Check for duplicate email
@@ -30,25 +29,86 @@ def create_agent(agent: AgentCreate, db: Session = Depends(get_db), user=Depends
         
     new_agent = Agent(**agent.dict())
     db.add(new_agent)
+    versions.bump(db, versions.AGENTS)
     db.commit()
     db.refresh(new_agent)
     return new_agent
 
-@router.get("/", response_model=list[AgentOut])
-def get_agents(db: Session = Depends(get_db)):
-    return db.query(Agent).all()
+@router.post("/import", response_model=AgentImportOut)
+def import_agents(file: UploadFile = File(...), db: Session = Depends(get_db), user=Depends(admin_only)):
+    # CSV columns: name, role, salary, date_of_birth, email_address, phone_number
+    try:
+        report = agent_import.import_agents(db, file.file)
+        if report["created"]:
+            versions.bump(db, versions.AGENTS)
+        db.commit()
+    except (ValueError, UnicodeDecodeError) as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Invalid CSV file: {e}")
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Another request added one of these agents during the import. Please retry.")
+    return report
+
+# Plain column tuples for the list endpoint, encoded without a model per row
+AGENT_COLUMNS = fastjson.columns(Agent, AgentOut)
+
+def list_agents(db: Session, name: Optional[str], page: PageParams):
+    query = db.query(*AGENT_COLUMNS)
+    if name:
+        # Name prefix search, case-insensitive
+        query = query.filter(Agent.name.istartswith(name, autoescape=True))
+    return paginate(query, Agent.id, page)
+
+@router.get("/", response_model=Union[AgentPage, list[AgentOut]])
+async def get_agents(
+    request: Request,
+    name: Optional[str] = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    etag, result = await db.run_sync(conditional.load_list, request, [versions.AGENTS], (), list_agents, name, page)
+    return conditional.list_response(etag, result, AgentOut)
+
+def delete_agents(db: Session, agent_ids: List[int]) -> List[int]:
+    """Delete the given agents in one statement; returns the ids that existed. Does not commit.
+
+    Their payments, debts and summary rows go with them through ON DELETE CASCADE.
+    """
+    deleted = db.execute(delete(Agent).where(Agent.id.in_(agent_ids)).returning(Agent.id)).scalars().all()
+    if deleted:
+        versions.bump(db, *versions.ALL_TABLES)
+    return sorted(deleted)
+
+@router.get("/balances", response_model=Union[AgentBalancePage, list[AgentBalanceOut]])
+def get_agent_balances(
+    ids: Optional[List[int]] = Query(None),
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    # One row per agent from agent_balances; no payment or debt is read
+    result = paginate(ledger.balances_query(db, ids), Agent.id, page, cursor="agent_id")
+    return fastjson.rows_response(result, AgentBalanceOut)
+
+@router.get("/{agent_id}/balance", response_model=AgentBalanceOut)
+def get_agent_balance(agent_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    row = ledger.balances_query(db, [agent_id]).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return row._asdict()
+
+@router.delete("/")
+def bulk_delete_agents(ids: List[int] = Query(..., min_length=1), db: Session = Depends(get_db), user=Depends(admin_only)):
+    # DELETE /agents/?ids=1&ids=2
+    deleted = delete_agents(db, ids)
+    db.commit()
+    return {"deleted": deleted, "not_found": sorted(set(ids) - set(deleted))}
 
 @router.delete("/{agent_id}")
 def delete_agent(agent_id: int, db: Session = Depends(get_db), user=Depends(admin_only)):
-    agent = db.get(Agent, agent_id)
-    if not agent:
+    if not delete_agents(db, [agent_id]):
         raise HTTPException(status_code=404, detail="Agent not found")
-    
-    # Delete related records to maintain integrity
-    db.query(Payment).filter(Payment.agent_id == agent_id).delete()
-    db.query(Debt).filter(Debt.agent_id == agent_id).delete()
-    
-    db.delete(agent)
     db.commit()
     return {"message": "Agent deleted"}
 
@@ -82,6 +142,7 @@ def update_agent(agent_id: int, agent_data: AgentCreate, db: Session = Depends(g
     agent.date_of_birth = agent_data.date_of_birth
     agent.email_address = agent_data.email_address
     agent.phone_number = agent_data.phone_number
+    versions.bump(db, versions.AGENTS)
     
     db.commit()
     db.refresh(agent)
@@ -1,34 +1,35 @@
-import os
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas import LoginSchema
-from app.database import SessionLocal
-from app.auth import create_token
+from app.database import get_async_db
+from app.models import User
+from app.auth import create_token, hash_password_async, needs_rehash, verify_password_async
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@school.com")
-ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "123456")
-
 @router.post("/login")
-def login(data: LoginSchema):
-    if data.email == ADMIN_EMAIL and data.password == ADMIN_PASSWORD:
-        token = create_token({"sub": data.email, "role": "admin"})
-        return {
-            "access_token": token,
-            "user": {
-                "email": data.email,
-                "role": "admin",
-                "name": "Admin"
-            }
-        }
+async def login(data: LoginSchema, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(User).where(User.email == data.email))
+    # End the read transaction: the connection goes back to the pool while bcrypt runs
+    await db.commit()
 
-    raise HTTPException(status_code=401, detail="Invalid credentials")
+    # bcrypt runs on its own small pool; the event loop keeps serving other requests
+    valid = await verify_password_async(data.password, user.password if user else None)
+    if not user or not valid:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    if needs_rehash(user.password):
+        # BCRYPT_ROUNDS changed since this password was stored
+        user.password = await hash_password_async(data.password)
+        await db.commit()
+
+    token = create_token({"sub": user.email, "role": user.role})
+    return {
+        "access_token": token,
+        "user": {
+            "email": user.email,
+            "role": user.role,
+            "name": (user.role or "user").capitalize()
+        }
+    }
@@ -1,23 +1,20 @@
-from fastapi import APIRouter, Depends
+from datetime import date
+from typing import Optional, Union
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from app.database import get_db
 from app.models import Debt
-from app.schemas import DebtCreate, DebtOut
+from app.schemas import DebtCreate, DebtOut, DebtPage
 from app.deps import admin_only
+from app.pagination import PageParams, paginate
+from app.periods import month_range
+from app import conditional, fastjson, ledger, summary, versions
 
 router = APIRouter(prefix="/debts", tags=["Debts"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/", response_model=DebtOut)
 def create_debt(debt: DebtCreate, db: Session = Depends(get_db), user=Depends(admin_only)):
     from app.models import Payment
-    from sqlalchemy import extract, func
     from fastapi import HTTPException
 
     # Check for existing payment in the same month/year
@@ -27,10 +24,11 @@ def create_debt(debt: DebtCreate, db: Session = Depends(get_db), user=Depends(ad
     else:
         target_date = debt.debt_date
 
+    start, end = month_range(target_date)
     existing_payment = db.query(Payment).filter(
         Payment.agent_id == debt.agent_id,
-        extract('month', Payment.payment_date) == target_date.month,
-        extract('year', Payment.payment_date) == target_date.year
+        Payment.payment_date >= start,
+        Payment.payment_date < end
     ).first()
 
     if existing_payment:
@@ -41,26 +39,65 @@ def create_debt(debt: DebtCreate, db: Session = Depends(get_db), user=Depends(ad
             )
         elif existing_payment.status.lower() == "pending":
             # Subtract debt amount from the pending payment
+            summary.apply_payment(db, existing_payment, -1)
+            ledger.record_payment(db, existing_payment, -1)
             existing_payment.amount -= debt.amount
             if existing_payment.amount < 0:
                 existing_payment.amount = 0
             db.add(existing_payment)
+            summary.apply_payment(db, existing_payment)
+            ledger.record_payment(db, existing_payment)
+            versions.bump(db, versions.PAYMENTS)
 
     new_debt = Debt(**debt.dict())
     db.add(new_debt)
+    db.flush()  # the ledger entry names the debt
+    summary.apply_debt(db, new_debt)
+    ledger.record_debt(db, new_debt)
+    versions.bump(db, versions.DEBTS)
     db.commit()
     db.refresh(new_debt)
     return new_debt
 
-@router.get("/", response_model=list[DebtOut])
-def get_debts(db: Session = Depends(get_db)):
-    return db.query(Debt).all()
+# Plain column tuples for the list endpoint, encoded without a model per row
+DEBT_COLUMNS = fastjson.columns(Debt, DebtOut)
+
+def list_debts(
+    db: Session,
+    agent_id: Optional[int],
+    date_from: Optional[date],
+    date_to: Optional[date],
+    page: PageParams,
+):
+    query = db.query(*DEBT_COLUMNS)
+    if agent_id is not None:
+        query = query.filter(Debt.agent_id == agent_id)
+    if date_from:
+        query = query.filter(Debt.debt_date >= date_from)
+    if date_to:
+        query = query.filter(Debt.debt_date <= date_to)
+    return paginate(query, Debt.id, page)
+
+@router.get("/", response_model=Union[DebtPage, list[DebtOut]])
+def get_debts(
+    request: Request,
+    agent_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    etag, result = conditional.load_list(db, request, [versions.DEBTS], (), list_debts, agent_id, date_from, date_to, page)
+    return conditional.list_response(etag, result, DebtOut)
 
 @router.delete("/{debt_id}")
 def delete_debt(debt_id: int, db: Session = Depends(get_db), user=Depends(admin_only)):
     debt = db.get(Debt, debt_id)
     if not debt:
         return {"error": "Debt not found"}
+    summary.apply_debt(db, debt, -1)
+    ledger.record_debt(db, debt, -1)
     db.delete(debt)
+    versions.bump(db, versions.DEBTS)
     db.commit()
     return {"message": "Debt deleted"}
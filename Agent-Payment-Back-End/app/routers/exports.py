@@ -0,0 +1,134 @@
+"""Streaming CSV / NDJSON exports of the agents, payments and debts tables.
+
+Rows are read through a server-side cursor in batches of ``EXPORT_BATCH_SIZE``
+and each batch is encoded and sent before the next one is fetched, so memory
+stays flat however much history is exported.
+"""
+import csv
+import io
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app import fastjson
+from app.database import get_db
+from app.deps import get_current_user
+from app.models import Agent, Debt, Payment
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def agents_export(db: Session, agent_id, date_from, date_to):
+    query = db.query(
+        Agent.id, Agent.name, Agent.role, Agent.salary,
+        Agent.date_of_birth, Agent.email_address, Agent.phone_number,
+    )
+    if agent_id is not None:
+        query = query.filter(Agent.id == agent_id)
+    # Agents have no date of their own to filter on
+    return query.order_by(Agent.id)
+
+
+def payments_export(db: Session, agent_id, date_from, date_to):
+    query = db.query(
+        Payment.id, Payment.agent_id, Agent.name.label("agent_name"),
+        Payment.amount, Payment.status, Payment.payment_date,
+    ).outerjoin(Agent, Agent.id == Payment.agent_id)
+    if agent_id is not None:
+        query = query.filter(Payment.agent_id == agent_id)
+    if date_from:
+        query = query.filter(Payment.payment_date >= date_from)
+    if date_to:
+        query = query.filter(Payment.payment_date <= date_to)
+    return query.order_by(Payment.id)
+
+
+def debts_export(db: Session, agent_id, date_from, date_to):
+    query = db.query(
+        Debt.id, Debt.agent_id, Agent.name.label("agent_name"),
+        Debt.amount, Debt.reason, Debt.debt_date,
+    ).outerjoin(Agent, Agent.id == Debt.agent_id)
+    if agent_id is not None:
+        query = query.filter(Debt.agent_id == agent_id)
+    if date_from:
+        query = query.filter(Debt.debt_date >= date_from)
+    if date_to:
+        query = query.filter(Debt.debt_date <= date_to)
+    return query.order_by(Debt.id)
+
+
+DATASETS = {
+    "agents": agents_export,
+    "payments": payments_export,
+    "debts": debts_export,
+}
+
+
+def _batches(query):
+    # yield_per streams from a server-side cursor (stream_results) on Postgres
+    batch = []
+    for row in query.yield_per(EXPORT_BATCH_SIZE):
+        batch.append(row)
+        if len(batch) == EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_csv(query):
+    fields = [column["name"] for column in query.column_descriptions]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # The BOM makes Excel read the file as UTF-8
+    buffer.write("\ufeff")
+    writer.writerow(fields)
+    for batch in _batches(query):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_ndjson(query):
+    fields = [column["name"] for column in query.column_descriptions]
+    for batch in _batches(query):
+        yield b"".join(fastjson.dumps(dict(zip(fields, row))) + b"\n" for row in batch)
+
+
+ENCODERS = {
+    "csv": stream_csv,
+    "ndjson": stream_ndjson,
+}
+
+
+@router.get("/{dataset}.{fmt}")
+def export_table(
+    dataset: str,  # "agents", "payments", "debts"
+    fmt: str,  # "csv", "ndjson"
+    agent_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    if dataset not in DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown export: {dataset}")
+    if fmt not in ENCODERS:
+        raise HTTPException(status_code=400, detail="Export format must be 'csv' or 'ndjson'")
+
+    query = DATASETS[dataset](db, agent_id, date_from, date_to)
+    filename = "_".join(str(part) for part in [dataset, date_from, date_to] if part)
+    return StreamingResponse(ENCODERS[fmt](query), media_type=MEDIA_TYPES[fmt], headers={
+        "Content-Disposition": f"attachment; filename={filename}.{fmt}"
+    })
@@ -1,24 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
-from app.models import Payment, Agent
-from app.schemas import PaymentCreate, PaymentOut, PaymentStatusUpdate
+from app.database import get_async_db, get_db
+from app.models import Payment, Agent, Debt
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+from app.models import PAYMENT_PERIOD_INDEX
+from app.periods import month_range
+from app.schemas import PaymentCreate, PaymentOut, PaymentPage, PaymentStatusUpdate, PayrollRun, PayrollRunOut
 from app.deps import get_current_user
-from typing import List
-from datetime import date
+from app.pagination import PageParams, paginate
+from app import conditional, fastjson, ledger, summary, versions
+from typing import List, Optional, Union
+from contextlib import contextmanager
+from datetime import date, datetime
 
 router = APIRouter(
     prefix="/payments",
     tags=["Payments"]
 )
 
-# DB dependency
-def get_db():
-    db = SessionLocal()
+
+DUPLICATE_PAYMENT_DETAIL = "Payment already exists for this agent in this month"
+
+
+@contextmanager
+def payment_write(db: Session):
+    """Run the block and commit, turning a hit on the one-payment-per-month index into a 400.
+
+    The block is covered as well as the commit: autoflush may send the INSERT or
+    UPDATE as soon as the rollup is touched.
+    """
     try:
-        yield db
-    finally:
-        db.close()
+        yield
+        versions.bump(db, versions.PAYMENTS)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if _violates_period_index(e):
+            raise HTTPException(status_code=400, detail=DUPLICATE_PAYMENT_DETAIL)
+        raise
+
+
+def _violates_period_index(error: IntegrityError) -> bool:
+    diag = getattr(error.orig, "diag", None)  # psycopg names the violated index
+    if diag is not None:
+        # The per-partition copies of the index carry a month suffix
+        return (diag.constraint_name or "").startswith(PAYMENT_PERIOD_INDEX)
+    # SQLite only reports the columns
+    return "UNIQUE constraint failed: payments.agent_id, payments.period" in str(error.orig)
 
 
 # ✅ CREATE payment - FIXED
@@ -34,17 +64,19 @@ def create_payment(
         raise HTTPException(status_code=404, detail="Agent not found")
 
     # Check for duplicate payment in the same month (excluding cancelled payments)
+    # The unique index on (agent_id, period) is the real guard against concurrent
+    # writers; this lookup just answers the common case without a failed INSERT.
     if payment.payment_date:
-        from sqlalchemy import extract
-        existing_payment = db.query(Payment).filter(
+        start, end = month_range(payment.payment_date)
+        existing_payment = db.query(Payment.id).filter(
             Payment.agent_id == payment.agent_id,
-            extract('month', Payment.payment_date) == payment.payment_date.month,
-            extract('year', Payment.payment_date) == payment.payment_date.year,
+            Payment.payment_date >= start,
+            Payment.payment_date < end,
             Payment.status != "Cancelled"  # Allow new payment if previous was cancelled
         ).first()
 
         if existing_payment:
-             raise HTTPException(status_code=400, detail="Payment already exists for this agent in this month")
+             raise HTTPException(status_code=400, detail=DUPLICATE_PAYMENT_DETAIL)
 
     new_payment = Payment(
         amount=payment.amount,
@@ -53,29 +85,140 @@ def create_payment(
         agent_id=payment.agent_id
     )
 
-    db.add(new_payment)
-    db.commit()
+    with payment_write(db):
+        db.add(new_payment)
+        db.flush()  # the ledger entry names the payment
+        summary.apply_payment(db, new_payment)
+        ledger.record_payment(db, new_payment)
     db.refresh(new_payment)
 
     return new_payment
 
 
-# # ✅ READ all payments - WITH VALIDATION
-@router.get("/", response_model=List[PaymentOut])
-def get_payments(
+# ✅ BULK payroll run - one month of payments in one transaction
+@router.post("/bulk", response_model=PayrollRunOut)
+def run_payroll(
+    run: PayrollRun,
     db: Session = Depends(get_db),
     user=Depends(get_current_user)
 ):
-    payments = db.query(Payment).all()
-    
-    # Debug: Check for NULL dates
-    for payment in payments:
-        if payment.payment_date is None:
-            print(f"WARNING: Payment ID {payment.id} has NULL payment_date")
-            # Optionally set a default
-            payment.payment_date = date.today()
-    
-    return payments
+    try:
+        start, end = month_range(datetime.strptime(run.month, "%Y-%m").date())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="month must be in YYYY-MM format")
+    payment_date = run.payment_date or start
+    if not start <= payment_date < end:
+        raise HTTPException(status_code=400, detail="payment_date must fall inside the payroll month")
+
+    agents_query = db.query(Agent.id, Agent.salary)
+    if run.agent_ids is not None:
+        agents_query = agents_query.filter(Agent.id.in_(run.agent_ids))
+    salaries = dict(agents_query.all())
+    agent_ids = list(salaries)
+
+    # Same rule as create_payment: cancelled payments don't block a new one
+    already_paid = {
+        agent_id for (agent_id,) in db.query(Payment.agent_id).filter(
+            Payment.agent_id.in_(agent_ids),
+            Payment.payment_date >= start,
+            Payment.payment_date < end,
+            Payment.status != "Cancelled"
+        )
+    }
+    debts = dict(
+        db.query(Debt.agent_id, func.sum(Debt.amount)).filter(
+            Debt.agent_id.in_(agent_ids),
+            Debt.debt_date >= start,
+            Debt.debt_date < end
+        ).group_by(Debt.agent_id).all()
+    )
+
+    results = {}
+    rows = []
+    for agent_id in agent_ids:
+        if agent_id in already_paid:
+            results[agent_id] = {"agent_id": agent_id, "result": "conflict", "detail": DUPLICATE_PAYMENT_DETAIL}
+            continue
+        # Same clamp as create_debt applies to a pending payment
+        amount = max((salaries[agent_id] or 0.0) - (debts.get(agent_id) or 0.0), 0.0)
+        rows.append({
+            "agent_id": agent_id,
+            "amount": amount,
+            "status": run.status,
+            "payment_date": payment_date,
+            "period": start,
+        })
+
+    if rows:
+        with payment_write(db):
+            inserted = db.execute(insert(Payment).returning(Payment.id, Payment.agent_id), rows).all()
+            payment_ids = {agent_id: payment_id for payment_id, agent_id in inserted}
+            created = [Payment(id=payment_ids[row["agent_id"]], **row) for row in rows]
+            summary.apply_payments(db, created)
+            ledger.record_payments(db, created)
+        amounts = {row["agent_id"]: row["amount"] for row in rows}
+        for payment_id, agent_id in inserted:
+            results[agent_id] = {"agent_id": agent_id, "result": "created", "payment_id": payment_id, "amount": amounts[agent_id]}
+
+    for agent_id in run.agent_ids or []:
+        if agent_id not in salaries:
+            results[agent_id] = {"agent_id": agent_id, "result": "not_found", "detail": "Agent not found"}
+
+    ordered = [results[agent_id] for agent_id in (run.agent_ids if run.agent_ids is not None else agent_ids)]
+    return {
+        "month": run.month,
+        "created": len(rows),
+        "conflicts": len(already_paid),
+        "not_found": sum(1 for r in ordered if r["result"] == "not_found"),
+        "results": ordered,
+    }
+
+
+# Plain column tuples for the list endpoint, encoded without a model per row.
+# Legacy rows with no payment_date are shown as dated today.
+PAYMENT_COLUMNS = fastjson.columns(
+    Payment, PaymentOut, payment_date=func.coalesce(Payment.payment_date, func.current_date())
+)
+
+
+def list_payments(
+    db: Session,
+    agent_id: Optional[int],
+    status: Optional[str],
+    date_from: Optional[date],
+    date_to: Optional[date],
+    page: PageParams,
+):
+    query = db.query(*PAYMENT_COLUMNS)
+    if agent_id is not None:
+        query = query.filter(Payment.agent_id == agent_id)
+    if status:
+        query = query.filter(func.lower(Payment.status) == status.lower())
+    if date_from:
+        query = query.filter(Payment.payment_date >= date_from)
+    if date_to:
+        query = query.filter(Payment.payment_date <= date_to)
+    return paginate(query, Payment.id, page)
+
+
+# # ✅ READ all payments - WITH VALIDATION
+@router.get("/", response_model=Union[PaymentPage, List[PaymentOut]])
+async def get_payments(
+    request: Request,
+    agent_id: Optional[int] = None,
+    status: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user)
+):
+    # Undated payments are listed under today's date, so the day is part of the ETag
+    etag, result = await db.run_sync(
+        conditional.load_list, request, [versions.PAYMENTS], (date.today(),),
+        list_payments, agent_id, status, date_from, date_to, page,
+    )
+    return conditional.list_response(etag, result, PaymentOut)
 
 
 # ✅ READ one payment
@@ -103,12 +246,15 @@ def update_payment(
     if not db_payment:
         raise HTTPException(status_code=404, detail="Payment not found")
 
-    db_payment.amount = payment.amount
-    db_payment.status = payment.status
-    db_payment.payment_date = payment.payment_date  # ← ADDED
-    db_payment.agent_id = payment.agent_id
-
-    db.commit()
+    with payment_write(db):
+        summary.apply_payment(db, db_payment, -1)
+        ledger.record_payment(db, db_payment, -1)
+        db_payment.amount = payment.amount
+        db_payment.status = payment.status
+        db_payment.payment_date = payment.payment_date  # ← ADDED
+        db_payment.agent_id = payment.agent_id
+        summary.apply_payment(db, db_payment)
+        ledger.record_payment(db, db_payment)
     db.refresh(db_payment)
 
     return db_payment
@@ -125,7 +271,10 @@ def delete_payment(
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
 
+    summary.apply_payment(db, payment, -1)
+    ledger.record_payment(db, payment, -1)
     db.delete(payment)
+    versions.bump(db, versions.PAYMENTS)
     db.commit()
 
     return {"message": "Payment deleted successfully"}
@@ -162,6 +311,10 @@ def update_payment_status(
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
 
-    payment.status = status_update.status
-    db.commit()
+    with payment_write(db):
+        summary.apply_payment(db, payment, -1)
+        ledger.record_payment(db, payment, -1)
+        payment.status = status_update.status
+        summary.apply_payment(db, payment)
+        ledger.record_payment(db, payment)
     return {"message": "Status updated successfully", "status": payment.status}
@@ -1,217 +1,125 @@
-from fastapi import APIRouter, Depends, HTTPException
+import logging
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from app.database import SessionLocal
-from app.models import Payment, Agent, Debt
-from fastapi.responses import StreamingResponse
+from app.database import AsyncSessionLocal, get_async_db, get_db
+from app.models import Payment, Agent, AgentBalance, MonthlyAgentSummary, ReportJob
+from app import fastjson, jobs, live, report_cache, report_data, report_pdf, versions
+from app.schemas import ReportJobCreate, ReportJobOut
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy import func
-from typing import Optional
+from typing import List, Optional
 from datetime import date, datetime
-import os
-import io
 
-router = APIRouter(prefix="/reports", tags=["Reports"])
+logger = logging.getLogger(__name__)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+router = APIRouter(prefix="/reports", tags=["Reports"])
 
-# Helper to generate a generic PDF table header
-def draw_header(c, title):
-    c.setFont("Helvetica-Bold", 16)
-    c.drawCentredString(300, 800, "AgentPay Management System")
-    c.setFont("Helvetica-Bold", 14)
-    c.drawCentredString(300, 770, title)
-    c.setFont("Helvetica", 10)
-    c.drawCentredString(300, 750, f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    c.line(50, 740, 550, 740)
 
 @router.get("/agents/pdf")
-def agents_pdf(db: Session = Depends(get_db)):
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    draw_header(c, "List of Agents")
-    
-    y = 700
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(50, y, "ID")
-    c.drawString(100, y, "Name")
-    c.drawString(250, y, "Role")
-    c.drawString(400, y, "Salary")
-    
-    y -= 20
-    c.line(50, y+15, 550, y+15)
-    c.setFont("Helvetica", 10)
-    
-    agents = db.query(Agent).all()
-    for a in agents:
-        c.drawString(50, y, str(a.id))
-        c.drawString(100, y, a.name)
-        c.drawString(250, y, a.role)
-        c.drawString(400, y, f"${a.salary:,.2f}")
-        y -= 20
-        if y < 50:
-            c.showPage()
-            y = 750
-
-    c.save()
-    buffer.seek(0)
-    return StreamingResponse(buffer, media_type='application/pdf', headers={
-        "Content-Disposition": "attachment; filename=agents_list.pdf"
-    })
+def agents_pdf(request: Request, db: Session = Depends(get_db)):
+    return report_cache.cached_report(
+        request, db, "agents_pdf", {}, [versions.AGENTS],
+        lambda: report_pdf.render_agents(db),
+        media_type='application/pdf',
+        headers={"Content-Disposition": "attachment; filename=agents_list.pdf"},
+    )
 
 @router.get("/debts/pdf")
-def debts_pdf(db: Session = Depends(get_db)):
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    draw_header(c, "List of All Debts")
-    
-    y = 700
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(50, y, "Agent")
-    c.drawString(200, y, "Amount")
-    c.drawString(300, y, "Reason")
-    c.drawString(450, y, "Date")
-    
-    y -= 20
-    c.setFont("Helvetica", 10)
-    
-    debts = db.query(Debt).all()
-    for d in debts:
-        agent = db.query(Agent).filter(Agent.id == d.agent_id).first()
-        name = agent.name if agent else f"ID: {d.agent_id}"
-        c.drawString(50, y, name)
-        c.drawString(200, y, f"${d.amount:,.2f}")
-        c.drawString(300, y, d.reason)
-        c.drawString(450, y, str(d.debt_date))
-        y -= 20
-        if y < 50:
-            c.showPage()
-            y = 750
-
-    c.save()
-    buffer.seek(0)
-    return StreamingResponse(buffer, media_type='application/pdf', headers={
-        "Content-Disposition": "attachment; filename=debts_list.pdf"
-    })
+def debts_pdf(request: Request, db: Session = Depends(get_db)):
+    return report_cache.cached_report(
+        request, db, "debts_pdf", {}, [versions.AGENTS, versions.DEBTS],
+        lambda: report_pdf.render_debts(db),
+        media_type='application/pdf',
+        headers={"Content-Disposition": "attachment; filename=debts_list.pdf"},
+    )
 
 @router.get("/payslip/pdf")
 def generate_payslip(
+    request: Request,
     agent_id: int, 
     type: str, # "monthly", "yearly", "all"
     month: Optional[str] = None, # YYYY-MM
     year: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    agent = db.query(Agent).filter(Agent.id == agent_id).first()
+    agent = db.get(Agent, agent_id)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
 
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    draw_header(c, f"PAYSLIP - {type.upper()}")
-
-    # Agent Info Box
-    c.rect(50, 650, 500, 80)
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(60, 710, f"Agent Name: {agent.name}")
-    c.setFont("Helvetica", 10)
-    c.drawString(60, 690, f"Role: {agent.role}")
-    c.drawString(60, 670, f"Base Salary: ${agent.salary:,.2f}")
-
-    # Logic to fetch payments and debts based on type
-    payments_query = db.query(Payment).filter(Payment.agent_id == agent_id, Payment.status == "Completed")
-    debts_query = db.query(Debt).filter(Debt.agent_id == agent_id)
-
-    title_period = ""
-    if type == "monthly" and month:
-        start_date = datetime.strptime(month, "%Y-%m").date()
-        if start_date.month == 12:
-            end_date = date(start_date.year + 1, 1, 1)
-        else:
-            end_date = date(start_date.year, start_date.month + 1, 1)
-        payments_query = payments_query.filter(Payment.payment_date >= start_date, Payment.payment_date < end_date)
-        debts_query = debts_query.filter(Debt.debt_date >= start_date, Debt.debt_date < end_date)
-        title_period = f"Period: {month}"
-    elif type == "yearly" and year:
-        payments_query = payments_query.filter(func.extract('year', Payment.payment_date) == year)
-        debts_query = debts_query.filter(func.extract('year', Debt.debt_date) == year)
-        title_period = f"Year: {year}"
-    else:
-        title_period = "All Time Record"
-
-    c.drawString(400, 710, title_period)
-
-    payments = payments_query.all()
-    debts = debts_query.all()
-
-    total_paid = sum(p.amount for p in payments)
-    total_debt = sum(d.amount for d in debts)
-
-    y = 600
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(50, y, "Earnings (Payments Received)")
-    y -= 20
-    c.setFont("Helvetica", 10)
-    for p in payments:
-        c.drawString(70, y, f"Date: {p.payment_date} | Amount: ${p.amount:,.2f}")
-        y -= 15
-    
-    y -= 10
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(50, y, "Deductions (Debts Taken)")
-    y -= 20
-    c.setFont("Helvetica", 10)
-    for d in debts:
-        c.drawString(70, y, f"Date: {d.debt_date} | {d.reason}: -${d.amount:,.2f}")
-        y -= 15
-
-    y -= 30
-    c.line(50, y, 550, y)
-    y -= 20
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(50, y, "SUMMARY")
-    y -= 20
-    c.setFont("Helvetica", 12)
-    c.drawString(70, y, f"Total Earnings: ${total_paid:,.2f}")
-    y -= 20
-    c.drawString(70, y, f"Total Deductions: -${total_debt:,.2f}")
-    y -= 20
-    c.setFont("Helvetica-Bold", 13)
-    c.setFillColor(colors.blue)
-    net = total_paid
-    c.drawString(70, y, f"NET PAID: ${net:,.2f}")
-    
-    # Signature area at the bottom
-    y -= 100
-    if y < 100:
-        c.showPage()
-        y = 700
-    
-    c.line(350, y, 550, y)
-    c.setFont("Helvetica", 10)
-    c.setFillColor(colors.black)
-    c.drawCentredString(450, y - 15, "Agent's Signature")
-    c.drawCentredString(450, y - 30, f"{agent.name}")
-    
-    c.save()
-    buffer.seek(0)
-    return StreamingResponse(buffer, media_type='application/pdf', headers={
-        "Content-Disposition": f"attachment; filename=payslip_{agent.name}_{type}.pdf"
+    # Keyed on this agent's own data rather than the global versions: their row, and the
+    # size of their append-only ledger, which grows with every change to one of their
+    # completed payments or debts. Writes for other agents leave the payslip cached.
+    # Payments and debts are only loaded when the cache can't answer.
+    entries = db.query(AgentBalance.entry_count).filter(AgentBalance.agent_id == agent_id).scalar() or 0
+    return report_cache.cached_report(
+        request, db, "payslip_pdf",
+        {"agent_id": agent_id, "type": type, "month": month, "year": year,
+         "agent": [agent.name, agent.role, agent.salary], "ledger_entries": entries},
+        [],
+        lambda: report_pdf.render_payslip(report_data.load_payslip(db, agent_id, type, month, year), type),
+        media_type='application/pdf',
+        headers={"Content-Disposition": f"attachment; filename=payslip_{agent.name}_{type}.pdf"},
+    )
+
+@router.get("/payslips/batch")
+def generate_payslips_batch(
+    type: str, # "monthly", "yearly"
+    month: Optional[str] = None, # YYYY-MM
+    year: Optional[int] = None,
+    agent_ids: Optional[List[int]] = Query(None),
+    role: Optional[str] = None,
+    format: str = "zip", # "zip" (one PDF per agent) or "pdf" (merged)
+    db: Session = Depends(get_db)
+):
+    try:
+        report_data.check_batch_params(type, month, year, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    payslips = report_data.load_payslips(db, type, month, year, agent_ids, role)
+
+    period = month if type == "monthly" else year
+    if format == "pdf":
+        return StreamingResponse(report_pdf.render_payslips_merged(payslips, type), media_type='application/pdf', headers={
+            "Content-Disposition": f"attachment; filename=payslips_{type}_{period}.pdf"
+        })
+    return StreamingResponse(report_pdf.render_payslips_zip(payslips, type), media_type='application/zip', headers={
+        "Content-Disposition": f"attachment; filename=payslips_{type}_{period}.zip"
     })
 
-@router.get("/dashboard")
-def get_dashboard_stats(month: Optional[str] = None, db: Session = Depends(get_db)):
+@router.post("/jobs", response_model=ReportJobOut, status_code=202)
+def submit_report_job(job: ReportJobCreate, db: Session = Depends(get_db)):
     try:
-        # Base Query
-        query = db.query(Payment)
+        new_job = jobs.create_job(db, job.kind, job.params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    jobs.dispatch(new_job.id)
+    return new_job
+
+@router.get("/jobs/{job_id}", response_model=ReportJobOut)
+def get_report_job(job_id: int, db: Session = Depends(get_db)):
+    job = db.get(ReportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/jobs/{job_id}/download")
+def download_report_job(job_id: int, db: Session = Depends(get_db)):
+    job = db.get(ReportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return Response(content=job.result, media_type=job.media_type, headers={
+        "Content-Disposition": f"attachment; filename={job.filename}"
+    })
 
+def dashboard_stats(db: Session, month: Optional[str] = None):
+    try:
         # Apply Month Filter
+        filters = []
+        period = None
         if month:
             # Expected format: YYYY-MM
             try:
@@ -221,37 +129,54 @@ def get_dashboard_stats(month: Optional[str] = None, db: Session = Depends(get_d
                     end_date = date(start_date.year + 1, 1, 1)
                 else:
                     end_date = date(start_date.year, start_date.month + 1, 1)
-                
-                query = query.filter(Payment.payment_date >= start_date, Payment.payment_date < end_date)
+
+                filters = [Payment.payment_date >= start_date, Payment.payment_date < end_date]
+                period = start_date
             except ValueError:
                 pass # Invalid date format, ignore filter
 
-        # Total Agents (Always global)
-        total_agents = db.query(Agent).count()
-
-        # Monthly Payments (Sum of filtered payments)
-        monthly_payments = query.with_entities(func.sum(Payment.amount)).scalar() or 0.0
-
-        # Status Counts (Filtered)
-        pending_count = query.filter(func.lower(Payment.status) == "pending").count()
-        completed_count = query.filter(func.lower(Payment.status) == "completed").count()
-        failed_count = query.filter(func.lower(Payment.status) == "failed").count()
-        cancelled_count = query.filter(func.lower(Payment.status) == "cancelled").count()
+        # One round trip for every aggregate: the agent count (always global) rides
+        # along as a scalar subquery.
+        total_agents = db.query(func.count(Agent.id)).scalar_subquery()
+        if period:
+            # A month is served from the rollup, one row per agent paid that month
+            stats = db.query(
+                total_agents,
+                func.sum(MonthlyAgentSummary.payments_total),
+                func.sum(MonthlyAgentSummary.pending_count),
+                func.sum(MonthlyAgentSummary.completed_count),
+                func.sum(MonthlyAgentSummary.failed_count),
+                func.sum(MonthlyAgentSummary.cancelled_count),
+            ).select_from(MonthlyAgentSummary).filter(
+                MonthlyAgentSummary.year == period.year, MonthlyAgentSummary.month == period.month
+            ).one()
+        else:
+            # All time also has to see undated payments, which have no month bucket
+            status = func.lower(Payment.status)
+            stats = db.query(
+                total_agents,
+                func.sum(Payment.amount),
+                func.count(Payment.id).filter(status == "pending"),
+                func.count(Payment.id).filter(status == "completed"),
+                func.count(Payment.id).filter(status == "failed"),
+                func.count(Payment.id).filter(status == "cancelled"),
+            ).select_from(Payment).one()
+        total_agents, monthly_payments, pending_count, completed_count, failed_count, cancelled_count = stats
 
         # Recent Payments (Filtered)
-        recent_payments = query.order_by(Payment.id.desc()).limit(5).all()
+        recent_payments = db.query(Payment).filter(*filters).order_by(Payment.id.desc()).limit(5).all()
 
         return {
             "total_agents": total_agents,
-            "monthly_payments": monthly_payments,
-            "pending_count": pending_count,
-            "completed_count": completed_count,
-            "failed_count": failed_count,
-            "cancelled_count": cancelled_count,
+            "monthly_payments": monthly_payments or 0.0,
+            "pending_count": pending_count or 0,
+            "completed_count": completed_count or 0,
+            "failed_count": failed_count or 0,
+            "cancelled_count": cancelled_count or 0,
             "recent_payments": recent_payments
         }
-    except Exception as e:
-        print(f"Error fetching dashboard stats: {e}")
+    except Exception:
+        logger.exception("Error fetching dashboard stats")
         return {
             "total_agents": 0,
             "monthly_payments": 0,
@@ -262,3 +187,39 @@ def get_dashboard_stats(month: Optional[str] = None, db: Session = Depends(get_d
             "recent_payments": []
         }
 
+
+@router.get("/dashboard")
+async def get_dashboard_stats(month: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(dashboard_stats, month)
+
+
+async def _dashboard_version() -> str:
+    async with AsyncSessionLocal() as db:
+        current = await db.run_sync(versions.current, *versions.ALL_TABLES)
+    return "-".join(str(current[name]) for name in versions.ALL_TABLES)
+
+
+async def _dashboard_payload(month: Optional[str]) -> str:
+    async with AsyncSessionLocal() as db:
+        stats = await db.run_sync(dashboard_stats, month)
+    # Same JSON as GET /reports/dashboard
+    return fastjson.dumps(jsonable_encoder(stats)).decode()
+
+
+dashboard_broadcaster = live.Broadcaster(_dashboard_version, _dashboard_payload)
+
+
+@router.get("/dashboard/stream")
+async def stream_dashboard_stats(month: Optional[str] = None, last_event_id: Optional[str] = Header(None)):
+    # Pushes the /reports/dashboard payload whenever agents, payments or debts change
+    if month is not None:
+        # Every distinct month is one more stats computation per change: only real months get a stream
+        try:
+            month = f"{datetime.strptime(month, '%Y-%m'):%Y-%m}"
+        except ValueError:
+            raise HTTPException(status_code=400, detail="month must be in YYYY-MM format")
+    return StreamingResponse(
+        dashboard_broadcaster.events(month, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
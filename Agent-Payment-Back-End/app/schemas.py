@@ -1,7 +1,7 @@
 # app/schemas.py
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
-from datetime import date
+from datetime import date, datetime
 
 # ---------- AUTH ----------
 class LoginSchema(BaseModel):
@@ -22,7 +22,33 @@ class AgentOut(AgentCreate):
     id: int
 
     class Config:
-        orm_mode = True
+        from_attributes = True
+
+class AgentPage(BaseModel):
+    items: List[AgentOut]
+    next_cursor: Optional[int] = None
+
+class AgentBalanceOut(BaseModel):
+    agent_id: int
+    paid_total: float  # completed payments
+    debt_total: float
+    balance: float  # paid_total - debt_total
+
+class AgentBalancePage(BaseModel):
+    items: List[AgentBalanceOut]
+    next_cursor: Optional[int] = None
+
+class AgentImportRow(BaseModel):
+    row: int  # line in the CSV file, the header being line 1
+    result: str  # "created" / "duplicate" / "invalid"
+    agent_id: Optional[int] = None
+    detail: Optional[str] = None
+
+class AgentImportOut(BaseModel):
+    created: int
+    duplicate: int
+    invalid: int
+    rows: List[AgentImportRow]
 
 
 # ---------- PAYMENTS ----------
@@ -41,6 +67,30 @@ class PaymentOut(PaymentCreate):
     class Config:
         from_attributes = True
 
+class PaymentPage(BaseModel):
+    items: List[PaymentOut]
+    next_cursor: Optional[int] = None
+
+class PayrollRun(BaseModel):
+    month: str  # YYYY-MM
+    agent_ids: Optional[List[int]] = None  # None pays every agent
+    status: str = "Pending"
+    payment_date: Optional[date] = None  # defaults to the first day of the month
+
+class PayrollResult(BaseModel):
+    agent_id: int
+    result: str  # "created" / "conflict" / "not_found"
+    payment_id: Optional[int] = None
+    amount: Optional[float] = None
+    detail: Optional[str] = None
+
+class PayrollRunOut(BaseModel):
+    month: str
+    created: int
+    conflicts: int
+    not_found: int
+    results: List[PayrollResult]
+
 
 # ---------- DEBTS ----------
 class DebtCreate(BaseModel):
@@ -55,3 +105,26 @@ class DebtOut(DebtCreate):
     class Config:
         from_attributes = True
 
+class DebtPage(BaseModel):
+    items: List[DebtOut]
+    next_cursor: Optional[int] = None
+
+
+
+# ---------- REPORT JOBS ----------
+class ReportJobCreate(BaseModel):
+    kind: str  # "agents_pdf", "debts_pdf", "payslip_pdf", "payslips_batch"
+    params: Dict[str, Any] = {}
+
+class ReportJobOut(BaseModel):
+    id: int
+    kind: str
+    status: str
+    error: Optional[str] = None
+    filename: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
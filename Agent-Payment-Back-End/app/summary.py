@@ -0,0 +1,165 @@
+"""Incremental maintenance of the ``monthly_agent_summary`` rollup.
+
+Every write route that touches a payment or a debt calls ``apply_payment`` /
+``apply_debt`` inside its own transaction: once with ``sign=-1`` for the row as
+it was, once with ``sign=1`` for the row as it is now. Rows without a date (or
+an agent) have no month bucket and are left out of the rollup.
+
+Money totals are kept to the cent: the columns are ``NUMERIC(14, 2)`` and
+every upsert rounds, so the back-and-forth of edits cannot accumulate
+floating point error (SQLite stores the rounded value as a float). ``rebuild``
+reports whatever drift it corrects.
+"""
+from typing import List
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.database import dialect_insert
+from app.models import MonthlyAgentSummary, Payment, Debt
+
+STATUS_COUNTS = {
+    "pending": "pending_count",
+    "completed": "completed_count",
+    "failed": "failed_count",
+    "cancelled": "cancelled_count",
+}
+
+COUNTERS = [
+    "payments_total", "paid_total", "debt_total", "payment_count",
+    "pending_count", "completed_count", "failed_count", "cancelled_count", "debt_count",
+]
+MONEY = {"payments_total", "paid_total", "debt_total"}
+
+
+def _empty_row(agent_id, year, month):
+    row = {"agent_id": agent_id, "year": year, "month": month}
+    row.update({name: 0 for name in COUNTERS})
+    return row
+
+
+def payment_row(payment, sign=1):
+    """Summary increments contributed by ``payment`` (``None`` if it has no bucket)."""
+    if payment.agent_id is None or payment.payment_date is None:
+        return None
+    row = _empty_row(payment.agent_id, payment.payment_date.year, payment.payment_date.month)
+    amount = payment.amount or 0.0
+    row["payments_total"] = sign * amount
+    # Payslips only count payments stored exactly as "Completed"
+    if payment.status == "Completed":
+        row["paid_total"] = sign * amount
+    row["payment_count"] = sign
+    counter = STATUS_COUNTS.get((payment.status or "").lower())
+    if counter:
+        row[counter] = sign
+    return row
+
+
+def debt_row(debt, sign=1):
+    """Summary increments contributed by ``debt`` (``None`` if it has no bucket)."""
+    if debt.agent_id is None or debt.debt_date is None:
+        return None
+    row = _empty_row(debt.agent_id, debt.debt_date.year, debt.debt_date.month)
+    row["debt_total"] = sign * (debt.amount or 0.0)
+    row["debt_count"] = sign
+    return row
+
+
+def _bump(db: Session, rows):
+    rows = [{**row, **{name: round(row[name], 2) for name in MONEY}} for row in rows if row is not None]
+    if not rows:
+        return
+    table = MonthlyAgentSummary.__table__
+    stmt = dialect_insert(db, MonthlyAgentSummary)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.agent_id, table.c.year, table.c.month],
+        set_={
+            name: func.round(table.c[name] + stmt.excluded[name], 2) if name in MONEY else table.c[name] + stmt.excluded[name]
+            for name in COUNTERS
+        },
+    )
+    db.execute(stmt, rows)
+
+
+def apply_payment(db: Session, payment, sign=1):
+    _bump(db, [payment_row(payment, sign)])
+
+
+def apply_payments(db: Session, payments, sign=1):
+    """Fold many payments into the rollup with a single executemany upsert."""
+    _bump(db, [payment_row(p, sign) for p in payments])
+
+
+def apply_debt(db: Session, debt, sign=1):
+    _bump(db, [debt_row(debt, sign)])
+
+
+def _totals(db: Session):
+    columns = [getattr(MonthlyAgentSummary, name) for name in COUNTERS]
+    return {
+        (agent_id, year, month): values
+        for agent_id, year, month, *values in db.query(
+            MonthlyAgentSummary.agent_id, MonthlyAgentSummary.year, MonthlyAgentSummary.month, *columns
+        )
+    }
+
+
+def rebuild(db: Session) -> List[dict]:
+    """Recompute the whole rollup from ``payments`` and ``debts``. Does not commit.
+
+    Returns the drift it corrected: one ``{agent_id, year, month, column,
+    before, after}`` per counter that no longer matched its source rows.
+    """
+    before = _totals(db)
+    db.query(MonthlyAgentSummary).delete()
+
+    status = func.lower(Payment.status)
+    year = func.extract("year", Payment.payment_date)
+    month = func.extract("month", Payment.payment_date)
+    payment_buckets = db.query(
+        Payment.agent_id, year, month,
+        func.sum(Payment.amount),
+        func.coalesce(func.sum(Payment.amount).filter(Payment.status == "Completed"), 0.0),
+        func.count(Payment.id),
+        func.count(Payment.id).filter(status == "pending"),
+        func.count(Payment.id).filter(status == "completed"),
+        func.count(Payment.id).filter(status == "failed"),
+        func.count(Payment.id).filter(status == "cancelled"),
+    ).filter(
+        Payment.agent_id.isnot(None), Payment.payment_date.isnot(None)
+    ).group_by(Payment.agent_id, year, month).all()
+
+    rows = []
+    for agent_id, y, m, total, paid, count, pending, completed, failed, cancelled in payment_buckets:
+        row = _empty_row(agent_id, int(y), int(m))
+        row.update(
+            payments_total=total or 0.0, paid_total=paid, payment_count=count,
+            pending_count=pending, completed_count=completed,
+            failed_count=failed, cancelled_count=cancelled,
+        )
+        rows.append(row)
+    _bump(db, rows)
+
+    year = func.extract("year", Debt.debt_date)
+    month = func.extract("month", Debt.debt_date)
+    debt_buckets = db.query(
+        Debt.agent_id, year, month, func.sum(Debt.amount), func.count(Debt.id)
+    ).filter(
+        Debt.agent_id.isnot(None), Debt.debt_date.isnot(None)
+    ).group_by(Debt.agent_id, year, month).all()
+
+    rows = []
+    for agent_id, y, m, total, count in debt_buckets:
+        row = _empty_row(agent_id, int(y), int(m))
+        row.update(debt_total=total or 0.0, debt_count=count)
+        rows.append(row)
+    _bump(db, rows)
+
+    after = _totals(db)
+    empty = [0] * len(COUNTERS)
+    drift = []
+    for key in sorted(before.keys() | after.keys()):
+        for name, old, new in zip(COUNTERS, before.get(key, empty), after.get(key, empty)):
+            # Money compares to the cent: below that is float storage, not drift
+            if (round(old - new, 2) if name in MONEY else old - new) != 0:
+                agent_id, year, month = key
+                drift.append({"agent_id": agent_id, "year": year, "month": month, "column": name, "before": old, "after": new})
+    return drift
@@ -0,0 +1,62 @@
+"""Per-table change counters.
+
+Write routes call ``bump`` for every table they modify, and the counters are
+incremented in the same transaction as the change itself, so a reader that
+sees the new rows also sees the new version. Caches key on ``current`` to
+know when their copy of the data is stale.
+
+Every writer of a table updates the same ``data_versions`` row, and on
+Postgres that row stays locked until the writer commits, so concurrent
+writers queue on it. ``bump`` therefore only notes the tables; the upsert
+runs as the last statement before the commit (a ``before_commit`` hook), in
+name order so two writers never lock the rows in opposite orders. The lock
+is then held for the commit alone, not for the whole of a payroll run or an
+import.
+"""
+from typing import Dict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.database import dialect_insert
+from app.models import DataVersion
+
+AGENTS = "agents"
+PAYMENTS = "payments"
+DEBTS = "debts"
+ALL_TABLES = (AGENTS, PAYMENTS, DEBTS)
+
+_PENDING = "pending_version_bumps"
+
+
+def bump(db: Session, *names: str):
+    """Increment the version of each table in ``names`` when ``db`` commits."""
+    db.info.setdefault(_PENDING, set()).update(names)
+
+
+def _apply_bumps(session: Session):
+    names = session.info.pop(_PENDING, None)
+    if not names:
+        return
+    table = DataVersion.__table__
+    stmt = dialect_insert(session, DataVersion)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.name],
+        set_={"version": table.c.version + 1},
+    )
+    session.execute(stmt, [{"name": name, "version": 1} for name in sorted(names)])
+
+
+def _discard_bumps(session: Session, previous_transaction):
+    # Rolled back: the writes never happened, so neither do their version bumps.
+    # A savepoint rolling back leaves them: an extra bump only costs a cache miss.
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING, None)
+
+
+event.listen(Session, "before_commit", _apply_bumps)
+event.listen(Session, "after_soft_rollback", _discard_bumps)
+
+
+def current(db: Session, *names: str) -> Dict[str, int]:
+    """``{table: version}`` for ``names`` in one query; tables never written are at 0."""
+    rows = dict(db.query(DataVersion.name, DataVersion.version).filter(DataVersion.name.in_(names)).all())
+    return {name: rows.get(name, 0) for name in names}
@@ -0,0 +1,7 @@
+"""Performance benchmarks, run by hand from the backend directory:
+
+    python -m benchmarks.async_vs_sync --help
+
+They drive the ASGI app in-process against ``DATABASE_URL`` (a throwaway
+SQLite file when unset), so no server has to be running.
+"""
@@ -0,0 +1,75 @@
+"""Onboarding time: one CSV import against one POST /agents/ per agent.
+
+Runs on a throwaway SQLite file unless ``DATABASE_URL`` is set (then ``--wipe``
+is required, since every table is dropped first).
+
+    python -m benchmarks.agent_import --agents 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+_throwaway = "DATABASE_URL" not in os.environ
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from app.auth import create_token  # noqa: E402
+from app.database import Base, async_engine, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from benchmarks.asgi import request  # noqa: E402
+
+BOUNDARY = "benchmark-boundary"
+
+
+def agents_csv(count: int, prefix: str) -> bytes:
+    lines = ["name,role,salary,date_of_birth,email_address,phone_number"]
+    lines += [f"{prefix} {i},Teacher,1000,1990-01-01,{prefix}{i}@school.com,{prefix}-{i:06d}" for i in range(count)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def multipart(field: str, filename: str, content: bytes) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        "Content-Type: text/csv\r\n\r\n"
+    ).encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def main(args):
+    headers = {"Authorization": f"Bearer {create_token({'sub': 'bench', 'role': 'admin'})}"}
+
+    body = multipart("file", "agents.csv", agents_csv(args.agents, "imported"))
+    started = time.perf_counter()
+    response = await request(app, "POST", "/agents/import", body=body, headers={
+        **headers, "Content-Type": f"multipart/form-data; boundary={BOUNDARY}",
+    })
+    imported = time.perf_counter() - started
+    report = json.loads(response.body)
+    print(f"import  {args.agents} agents: {imported:8.2f} s  (created={report['created']}, "
+          f"duplicate={report['duplicate']}, invalid={report['invalid']})")
+
+    # One POST per agent, timed on a sample and extrapolated
+    started = time.perf_counter()
+    for i in range(args.sample):
+        await request(app, "POST", "/agents/", body=json.dumps({
+            "name": f"Posted {i}", "role": "Teacher", "salary": 1000.0,
+            "email_address": f"posted{i}@school.com", "phone_number": f"posted-{i:06d}",
+        }).encode(), headers={**headers, "Content-Type": "application/json"})
+    per_post = (time.perf_counter() - started) / args.sample
+    print(f"POST    {args.agents} agents: {per_post * args.agents:8.2f} s  (estimated from {args.sample} requests)")
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=5000)
+    parser.add_argument("--sample", type=int, default=200, help="POST requests actually sent")
+    parser.add_argument("--wipe", action="store_true", help="allow resetting a DATABASE_URL you provided")
+    args = parser.parse_args()
+    if not _throwaway and not args.wipe:
+        parser.error("DATABASE_URL is set: the benchmark drops every table, pass --wipe to confirm")
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    asyncio.run(main(args))
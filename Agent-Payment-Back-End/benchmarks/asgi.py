@@ -0,0 +1,78 @@
+"""A minimal in-process ASGI client: one request in, status, headers and body out."""
+import asyncio
+from typing import Dict, NamedTuple, Optional
+
+
+class Response(NamedTuple):
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+
+async def request(app, method: str, path: str, query: str = "", body: bytes = b"",
+                  headers: Optional[Dict[str, str]] = None) -> Response:
+    messages = []
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # The request is complete; wait until the app stops listening
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    await app(scope, receive, send)
+
+    start = next(m for m in messages if m["type"] == "http.response.start")
+    return Response(
+        start["status"],
+        {k.decode(): v.decode() for k, v in start["headers"]},
+        b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body"),
+    )
+
+
+async def run_concurrently(send_one, total: int, concurrency: int):
+    """Call ``send_one()`` ``total`` times with at most ``concurrency`` in flight.
+
+    Returns the per-request latencies in seconds and the wall-clock time.
+    """
+    loop = asyncio.get_running_loop()
+    latencies = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            started = loop.time()
+            response = await send_one()
+            latencies.append(loop.time() - started)
+            if response.status >= 400:
+                raise RuntimeError(f"HTTP {response.status}: {response.body[:200]!r}")
+
+    started = loop.time()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, loop.time() - started
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
@@ -0,0 +1,119 @@
+"""Throughput of the async read routes against the same queries on the sync path.
+
+The async routes (agents list, payments list, dashboard) are compared with
+plain ``def`` routes that run the same query functions on a threadpool
+session, at a concurrency above Starlette's thread limit. SQLite numbers
+mostly measure Python overhead; point ``DATABASE_URL`` at Postgres to see
+the effect of not parking a thread per query.
+
+    python -m benchmarks.async_vs_sync --concurrency 200 --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+# More connections than Starlette's 40 threadpool slots: with fewer, blocked
+# sync requests hold every thread while the dependency teardowns that would
+# return connections wait for one, and the sync side stalls until pool_timeout.
+# The budget is shared by both engines: 20 + 30 connections for each of them.
+os.environ.setdefault("DB_POOL_SIZE", "40")
+os.environ.setdefault("DB_MAX_OVERFLOW", "60")
+
+from datetime import date  # noqa: E402
+from typing import List, Optional, Union  # noqa: E402
+from fastapi import Depends, FastAPI  # noqa: E402
+from sqlalchemy import delete, insert  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.auth import create_token  # noqa: E402
+from app.database import Base, SessionLocal, engine, get_db  # noqa: E402
+from app.deps import get_current_user  # noqa: E402
+from app.main import app as async_app  # noqa: E402
+from app.models import Agent, Payment  # noqa: E402
+from app.pagination import PageParams  # noqa: E402
+from app.routers.agents import list_agents  # noqa: E402
+from app.routers.payments import list_payments  # noqa: E402
+from app.routers.reports import dashboard_stats  # noqa: E402
+from app.schemas import AgentOut, AgentPage, PaymentOut, PaymentPage  # noqa: E402
+from app import fastjson, summary  # noqa: E402
+from benchmarks.asgi import percentile, request, run_concurrently  # noqa: E402
+
+ENDPOINTS = [
+    ("/agents/", "limit=50"),
+    ("/payments/", "limit=50"),
+    ("/reports/dashboard", ""),
+    ("/reports/dashboard", "month=2025-06"),
+]
+
+
+def sync_app() -> FastAPI:
+    """The same read endpoints as blocking ``def`` routes on the threadpool."""
+    app = FastAPI()
+
+    @app.get("/agents/", response_model=Union[AgentPage, List[AgentOut]])
+    def agents(name: Optional[str] = None, page: PageParams = Depends(), db: Session = Depends(get_db)):
+        return fastjson.rows_response(list_agents(db, name, page), AgentOut)
+
+    @app.get("/payments/", response_model=Union[PaymentPage, List[PaymentOut]])
+    def payments(page: PageParams = Depends(), db: Session = Depends(get_db), user=Depends(get_current_user)):
+        return fastjson.rows_response(list_payments(db, None, None, None, None, page), PaymentOut)
+
+    @app.get("/reports/dashboard")
+    def dashboard(month: Optional[str] = None, db: Session = Depends(get_db)):
+        return dashboard_stats(db, month)
+
+    return app
+
+
+def seed(agents: int, payments_per_agent: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.execute(delete(Payment))
+        db.execute(delete(Agent))
+        db.execute(insert(Agent), [
+            {"id": i, "name": f"Agent {i}", "role": "Teacher", "salary": 1000.0} for i in range(1, agents + 1)
+        ])
+        statuses = ["Completed", "pending", "failed"]
+        db.execute(insert(Payment), [
+            {"agent_id": a, "amount": 1000.0, "status": statuses[(a + m) % 3],
+             "payment_date": date(2025, m, 1), "period": date(2025, m, 1)}
+            for a in range(1, agents + 1) for m in range(1, payments_per_agent + 1)
+        ])
+        summary.rebuild(db)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def measure(app, path, query, headers, total, concurrency):
+    latencies, elapsed = await run_concurrently(
+        lambda: request(app, "GET", path, query, headers=headers), total, concurrency
+    )
+    return total / elapsed, percentile(latencies, 0.5), percentile(latencies, 0.95)
+
+
+async def main(args):
+    headers = {"Authorization": f"Bearer {create_token({'sub': 'bench', 'role': 'admin'})}"}
+    apps = [("sync", sync_app()), ("async", async_app)]
+    print(f"{'endpoint':40} {'path':6} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for path, query in ENDPOINTS:
+        label = f"{path}?{query}" if query else path
+        for name, app in apps:
+            # Warm up pools and caches before timing
+            await measure(app, path, query, headers, args.concurrency, args.concurrency)
+            rate, p50, p95 = await measure(app, path, query, headers, args.requests, args.concurrency)
+            print(f"{label:40} {name:6} {rate:9.1f} {p50 * 1000:8.2f} {p95 * 1000:8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=500)
+    parser.add_argument("--months", type=int, default=12, help="payments per agent, one per month of 2025")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    seed(args.agents, min(args.months, 12))
+    asyncio.run(main(args))
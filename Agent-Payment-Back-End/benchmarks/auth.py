@@ -0,0 +1,40 @@
+"""Per-request cost of ``get_current_user``: full verification against the token cache.
+
+    python -m benchmarks.auth --iterations 20000
+"""
+import argparse
+import timeit
+
+from app import auth, deps
+from app.deps import get_current_user
+
+
+def main(args):
+    tokens = [auth.create_token({"sub": f"user{i}@school.com", "role": "admin"}) for i in range(args.tokens)]
+
+    def verify_uncached():
+        for token in tokens:
+            auth.decode_token(token)
+
+    def verify_cached():
+        for token in tokens:
+            get_current_user(token)
+
+    deps.token_cache.clear()
+    verify_cached()  # fill the cache
+
+    rounds = max(1, args.iterations // len(tokens))
+    print(f"JWT backend: {auth.JWT_BACKEND}, {len(tokens)} distinct tokens")
+    for label, fn in [("decode every request", verify_uncached), ("get_current_user (cached)", verify_cached)]:
+        best = min(timeit.repeat(fn, number=rounds, repeat=args.repeat))
+        per_call = best / (rounds * len(tokens))
+        print(f"{label:28} {per_call * 1e6:8.2f} us/request  {1 / per_call:12,.0f} requests/s")
+    print(f"cache hits={deps.token_cache.hits} misses={deps.token_cache.misses}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=10, help="distinct tokens in rotation")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,81 @@
+"""Bytes on the wire against server time, with and without gzip.
+
+Sends each endpoint's request once to warm up, then ``--repeat`` times with
+and without ``Accept-Encoding: gzip`` through the ASGI app, and prints the
+body size, the median server time and the transfer time the body would take
+on a ``--mbps`` link (the school networks are slow; 2 Mbit/s by default).
+
+Runs on a throwaway SQLite file unless ``DATABASE_URL`` is set (then ``--wipe``
+is required, since the data is reseeded).
+
+    python -m benchmarks.compression --agents 500
+    COMPRESSION_LEVEL=1 python -m benchmarks.compression
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+_throwaway = "DATABASE_URL" not in os.environ
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from app import compression  # noqa: E402
+from app.auth import create_token  # noqa: E402
+from app.database import async_engine  # noqa: E402
+from app.main import app  # noqa: E402
+from benchmarks.asgi import request  # noqa: E402
+from benchmarks.suite import seed  # noqa: E402
+
+ENDPOINTS = [
+    ("/agents/", "all=true"),
+    ("/payments/", "all=true"),
+    ("/debts/", "all=true"),
+    ("/exports/payments.csv", ""),
+    ("/exports/payments.ndjson", ""),
+]
+
+
+async def measure(path, query, headers, repeat):
+    await request(app, "GET", path, query, headers=headers)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = await request(app, "GET", path, query, headers=headers)
+        timings.append(time.perf_counter() - started)
+    if response.status != 200:
+        raise RuntimeError(f"{path}: HTTP {response.status}")
+    return len(response.body), statistics.median(timings)
+
+
+async def main(args):
+    auth = {"Authorization": f"Bearer {create_token({'sub': 'bench', 'role': 'admin'})}"}
+    bytes_per_second = args.mbps * 1_000_000 / 8
+    print(f"gzip level {compression.COMPRESSION_LEVEL}, link {args.mbps} Mbit/s")
+    print(f"{'endpoint':32} {'identity':>12} {'gzip':>12} {'ratio':>6} {'server +ms':>11} {'total ms (id/gz)':>18}")
+    try:
+        for path, query in ENDPOINTS:
+            plain_size, plain_time = await measure(path, query, auth, args.repeat)
+            packed_size, packed_time = await measure(path, query, {**auth, "Accept-Encoding": "gzip"}, args.repeat)
+            plain_total = plain_time + plain_size / bytes_per_second
+            packed_total = packed_time + packed_size / bytes_per_second
+            print(f"{path + ('?' + query if query else ''):32} {plain_size:12,} {packed_size:12,} "
+                  f"{plain_size / packed_size:6.1f} {(packed_time - plain_time) * 1000:11.1f} "
+                  f"{plain_total * 1000:8.0f} /{packed_total * 1000:8.0f}")
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=500)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--mbps", type=float, default=2.0, help="link speed used for the transfer estimate")
+    parser.add_argument("--wipe", action="store_true", help="allow reseeding a DATABASE_URL you provided")
+    args = parser.parse_args()
+    if not _throwaway and not args.wipe:
+        parser.error("DATABASE_URL is set: the benchmark reseeds every table, pass --wipe to confirm")
+    seed(args.agents, args.years, debts_per_agent=2)
+    asyncio.run(main(args))
@@ -0,0 +1,80 @@
+"""Login throughput under a burst of concurrent sign-ins.
+
+While ``--logins`` requests hit ``POST /login`` at ``--concurrency``, a probe
+keeps requesting ``GET /agents/?limit=1``. bcrypt runs on its own
+``BCRYPT_WORKERS`` threads, so the probe's latency should barely move.
+
+    BCRYPT_ROUNDS=10 python -m benchmarks.login --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import delete  # noqa: E402
+
+from app import auth  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import User  # noqa: E402
+from benchmarks.asgi import percentile, request, run_concurrently  # noqa: E402
+
+EMAIL = "bench@school.com"
+PASSWORD = "bench-password"
+
+
+def seed():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.execute(delete(User).where(User.email == EMAIL))
+        db.add(User(email=EMAIL, password=auth.hash_password(PASSWORD), role="admin"))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def main(args):
+    body = json.dumps({"email": EMAIL, "password": PASSWORD}).encode()
+    headers = {"Content-Type": "application/json"}
+
+    async def login():
+        return await request(app, "POST", "/login", body=body, headers=headers)
+
+    async def probe_until(done: asyncio.Event, latencies):
+        loop = asyncio.get_running_loop()
+        while not done.is_set():
+            started = loop.time()
+            await request(app, "GET", "/agents/", "limit=1")
+            latencies.append(loop.time() - started)
+            await asyncio.sleep(0.01)
+
+    idle = []
+    quiet = asyncio.Event()
+    asyncio.get_running_loop().call_later(0.5, quiet.set)
+    await probe_until(quiet, idle)
+
+    busy = []
+    done = asyncio.Event()
+    probe = asyncio.create_task(probe_until(done, busy))
+    latencies, elapsed = await run_concurrently(login, args.logins, args.concurrency)
+    done.set()
+    await probe
+
+    print(f"bcrypt rounds={auth.BCRYPT_ROUNDS} workers={auth.BCRYPT_WORKERS}")
+    print(f"logins: {args.logins / elapsed:8.1f}/s  p50 {percentile(latencies, 0.5) * 1000:8.1f} ms"
+          f"  p95 {percentile(latencies, 0.95) * 1000:8.1f} ms")
+    print(f"probe GET /agents/ idle p50 {percentile(idle, 0.5) * 1000:6.2f} ms,"
+          f" during burst p50 {percentile(busy, 0.5) * 1000:6.2f} ms p95 {percentile(busy, 0.95) * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    seed()
+    asyncio.run(main(args))
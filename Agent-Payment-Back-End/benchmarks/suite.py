@@ -0,0 +1,259 @@
+"""Latency, throughput and query counts for every router, driven in-process.
+
+Seeds ``DATABASE_URL`` (a throwaway SQLite file when unset) with agents and
+their payments and debts spread over several years, then sends each
+scenario's requests through the ASGI app at a fixed concurrency. Query
+counts come from the metrics middleware's registry, which is updated after
+the body has been sent, so streamed reports count every query they run (the
+``Server-Timing`` header only sees the ones before the first byte).
+
+    python -m benchmarks.suite                          # run and print
+    python -m benchmarks.suite --save benchmarks/baseline.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json
+
+With ``--baseline`` the run exits non-zero when a scenario's p95 latency
+grows by more than ``--tolerance`` or it runs more queries per request than
+the baseline did. Latency baselines only mean something on the machine that
+recorded them; query counts are portable.
+
+It also fails while the baseline is stale: a scenario it has no entry for,
+or a query count that changed in either direction. A change that adds
+scenarios or changes query counts re-records the baseline (``--save``) in
+the same commit.
+
+Seeding wipes every table, so pointing ``DATABASE_URL`` at a real database
+needs ``--wipe``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from typing import Callable, NamedTuple, Optional
+
+_throwaway = "DATABASE_URL" not in os.environ
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+# Enough sync connections for Starlette's 40 threadpool slots (see async_vs_sync);
+# the budget is shared by both engines, 20 + 30 each
+os.environ.setdefault("DB_POOL_SIZE", "40")
+os.environ.setdefault("DB_MAX_OVERFLOW", "60")
+
+from datetime import date  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app import auth, ledger, metrics, report_cache, summary, versions  # noqa: E402
+from app.database import Base, SessionLocal, async_engine, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Agent, Debt, Payment, User  # noqa: E402
+from benchmarks.asgi import percentile, request, run_concurrently  # noqa: E402
+
+BENCH_EMAIL = "bench@school.com"
+BENCH_PASSWORD = "bench-password"
+STATUSES = ["Completed", "Completed", "pending", "failed", "Cancelled"]
+
+
+class Context(NamedTuple):
+    agent_ids: list
+    years: list
+    headers: dict
+
+
+class Scenario(NamedTuple):
+    name: str
+    # (iteration, context) -> (method, path, query, json body or None)
+    build: Callable
+    max_requests: Optional[int] = None  # cap for expensive scenarios
+
+
+def _month(ctx, i):
+    return f"{ctx.years[i % len(ctx.years)]}-{i % 12 + 1:02d}"
+
+
+def _agent(ctx, i):
+    return ctx.agent_ids[i % len(ctx.agent_ids)]
+
+
+SCENARIOS = [
+    Scenario("POST /login", lambda i, ctx: ("POST", "/login", "", {"email": BENCH_EMAIL, "password": BENCH_PASSWORD}), 50),
+    Scenario("GET /agents/", lambda i, ctx: ("GET", "/agents/", "limit=50", None)),
+    Scenario("GET /agents/?name=", lambda i, ctx: ("GET", "/agents/", f"name=Agent {i % 9 + 1}&limit=50", None)),
+    Scenario("GET /agents/?all", lambda i, ctx: ("GET", "/agents/", "all=true", None), 20),
+    Scenario("POST /agents/", lambda i, ctx: ("POST", "/agents/", "", {"name": f"New agent {i}", "role": "Teacher", "salary": 900.0})),
+    Scenario("PUT /agents/{id}", lambda i, ctx: ("PUT", f"/agents/{_agent(ctx, i)}", "", {"name": f"Agent {_agent(ctx, i)}", "role": "Teacher", "salary": 1000.0 + i})),
+    Scenario("GET /payments/", lambda i, ctx: ("GET", "/payments/", "limit=50", None)),
+    Scenario("GET /payments/?agent_id", lambda i, ctx: ("GET", "/payments/", f"agent_id={_agent(ctx, i)}&status=completed", None)),
+    Scenario("GET /payments/{id}", lambda i, ctx: ("GET", f"/payments/{i % 100 + 1}", "", None)),
+    Scenario("POST /payments/", lambda i, ctx: ("POST", "/payments/", "", {
+        "agent_id": _agent(ctx, i), "amount": 1000.0, "status": "Completed",
+        # A month no seeded payment uses, unique per (agent, iteration)
+        "payment_date": date(2100 + (i // len(ctx.agent_ids)) // 12, (i // len(ctx.agent_ids)) % 12 + 1, 1).isoformat(),
+    })),
+    Scenario("GET /debts/", lambda i, ctx: ("GET", "/debts/", "limit=50", None)),
+    Scenario("POST /debts/", lambda i, ctx: ("POST", "/debts/", "", {
+        # Debts are refused in months that already have a completed payment
+        "agent_id": _agent(ctx, i), "amount": 10.0, "reason": "Advance", "debt_date": f"2099-{i % 12 + 1:02d}-15",
+    })),
+    Scenario("GET /reports/dashboard", lambda i, ctx: ("GET", "/reports/dashboard", "", None)),
+    Scenario("GET /reports/dashboard?month", lambda i, ctx: ("GET", "/reports/dashboard", f"month={_month(ctx, i)}", None)),
+    Scenario("GET /reports/agents/pdf", lambda i, ctx: ("GET", "/reports/agents/pdf", "", None), 20),
+    Scenario("GET /reports/debts/pdf", lambda i, ctx: ("GET", "/reports/debts/pdf", "", None), 20),
+    Scenario("GET /reports/payslip/pdf", lambda i, ctx: ("GET", "/reports/payslip/pdf", f"agent_id={_agent(ctx, i)}&type=yearly&year={ctx.years[i % len(ctx.years)]}", None)),
+    Scenario("GET /reports/payslips/batch", lambda i, ctx: ("GET", "/reports/payslips/batch", f"type=monthly&month={_month(ctx, i)}&format=pdf", None), 10),
+    Scenario("GET /exports/payments.csv", lambda i, ctx: ("GET", "/exports/payments.csv", "", None), 10),
+    Scenario("GET /exports/debts.ndjson", lambda i, ctx: ("GET", "/exports/debts.ndjson", "", None), 10),
+    Scenario("GET /admin/pool", lambda i, ctx: ("GET", "/admin/pool", "", None)),
+    Scenario("GET /metrics", lambda i, ctx: ("GET", "/metrics", "", None)),
+]
+
+
+def seed(agents: int, years: int, debts_per_agent: int, first_year: int = 2020) -> Context:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.execute(insert(Agent), [
+            {"id": a, "name": f"Agent {a}", "role": "Teacher" if a % 4 else "Staff", "salary": 1000.0,
+             "email_address": f"agent{a}@school.com"}
+            for a in range(1, agents + 1)
+        ])
+        year_list = list(range(first_year, first_year + years))
+        payments = []
+        for a in range(1, agents + 1):
+            for y in year_list:
+                for m in range(1, 13):
+                    day = date(y, m, 1)
+                    payments.append({"agent_id": a, "amount": 1000.0, "status": STATUSES[(a + m) % len(STATUSES)],
+                                     "payment_date": day, "period": day})
+        db.execute(insert(Payment), payments)
+        db.execute(insert(Debt), [
+            {"agent_id": a, "amount": 25.0, "reason": "Advance",
+             "debt_date": date(year_list[d % years], d % 12 + 1, 10)}
+            for a in range(1, agents + 1) for d in range(debts_per_agent)
+        ])
+        db.add(User(email=BENCH_EMAIL, password=auth.hash_password(BENCH_PASSWORD), role="admin"))
+        summary.rebuild(db)
+        ledger.backfill(db)
+        versions.bump(db, *versions.ALL_TABLES)
+        db.commit()
+        return Context(list(range(1, agents + 1)), year_list, {})
+    finally:
+        db.close()
+
+
+async def run_scenario(scenario: Scenario, ctx: Context, requests: int, concurrency: int) -> dict:
+    total = min(requests, scenario.max_requests or requests)
+    counter = iter(range(total))
+    metrics.registry.clear()
+
+    async def send_one():
+        method, path, query, body = scenario.build(next(counter), ctx)
+        headers = dict(ctx.headers)
+        payload = b""
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        return await request(app, method, path, query, payload, headers)
+
+    latencies, elapsed = await run_concurrently(send_one, total, min(concurrency, total))
+    observed = metrics.registry.snapshot().values()
+    requests_seen = sum(count for _, count, _, _, _ in observed)
+    statements = sum(statements for _, _, _, statements, _ in observed)
+    return {
+        "requests": total,
+        "throughput": round(total / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "queries": round(statements / requests_seen, 2) if requests_seen else None,
+    }
+
+
+async def run(ctx: Context, args) -> dict:
+    results = {}
+    try:
+        for scenario in SCENARIOS:
+            if args.only and not any(pattern in scenario.name for pattern in args.only):
+                continue
+            report_cache.cache.clear()
+            results[scenario.name] = await run_scenario(scenario, ctx, args.requests, args.concurrency)
+            r = results[scenario.name]
+            print(f"{scenario.name:32} {r['requests']:6} {r['throughput']:9.1f} {r['p50_ms']:9.2f} "
+                  f"{r['p95_ms']:9.2f} {r['p99_ms']:9.2f} {r['queries'] if r['queries'] is not None else '-':>8}")
+    finally:
+        await async_engine.dispose()
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """Human-readable ``(regressions, stale)`` of ``results`` against ``baseline``.
+
+    ``stale`` lists what the baseline no longer describes: scenarios it has
+    no entry for and query counts that went down.
+    """
+    problems, stale = [], []
+    recorded = baseline.get("results", {})
+    for name, after in results.items():
+        before = recorded.get(name)
+        if before is None:
+            stale.append(f"{name}: no baseline entry")
+            continue
+        if after["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            problems.append(f"{name}: p95 {before['p95_ms']:.2f} -> {after['p95_ms']:.2f} ms")
+        if before["queries"] is not None and after["queries"] is not None and after["queries"] != before["queries"]:
+            change = f"{name}: queries per request {before['queries']} -> {after['queries']}"
+            (problems if after["queries"] > before["queries"] else stale).append(change)
+    return problems, stale
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=200)
+    parser.add_argument("--years", type=int, default=3, help="years of monthly payments per agent")
+    parser.add_argument("--debts", type=int, default=6, help="debts per agent")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--only", nargs="*", help="run scenarios whose name contains any of these")
+    parser.add_argument("--save", metavar="FILE", help="write the results as a baseline")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 growth (0.25 = 25%%)")
+    parser.add_argument("--wipe", action="store_true", help="allow seeding a DATABASE_URL you provided")
+    args = parser.parse_args()
+
+    if not _throwaway and not args.wipe:
+        parser.error("DATABASE_URL is set: seeding drops every table, pass --wipe to confirm")
+
+    ctx = seed(args.agents, args.years, args.debts)
+    token = auth.create_token({"sub": BENCH_EMAIL, "role": "admin"})
+    ctx = ctx._replace(headers={"Authorization": f"Bearer {token}"})
+
+    print(f"{args.agents} agents, {args.agents * args.years * 12} payments, {args.agents * args.debts} debts; "
+          f"concurrency {args.concurrency}")
+    print(f"{'scenario':32} {'n':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}")
+    results = asyncio.run(run(ctx, args))
+
+    settings = {k: getattr(args, k) for k in ("agents", "years", "debts", "requests", "concurrency")}
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baseline to {args.save}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("settings") != settings:
+            print(f"Warning: baseline was recorded with {baseline.get('settings')}")
+        problems, stale = compare(results, baseline, args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        for entry in stale:
+            print(f"STALE BASELINE {entry}")
+        if stale:
+            print(f"Re-record the baseline with --save {args.baseline}")
+        if problems or stale:
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
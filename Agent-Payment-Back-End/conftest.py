@@ -0,0 +1,182 @@
+import asyncio
+import os
+import tempfile
+import uuid
+
+# In-process tests always run against a throwaway SQLite database, never
+# against whatever DATABASE_URL points to. A file rather than :memory: so
+# streamed responses, which iterate in a worker thread, see the same data.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+# Cheapest bcrypt cost, so tests that hash passwords stay fast
+os.environ["BCRYPT_ROUNDS"] = "4"
+# Tests that need Postgres itself (COPY, partitions, migrations) run against
+# this server, each in a database of its own, and are skipped when it is unset.
+# e.g. postgresql://postgres@localhost:5432/postgres
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+from typing import Dict, NamedTuple, Optional
+
+import pytest
+from sqlalchemy import create_engine, event, make_url, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.database import AsyncSessionLocal, Base, async_engine, engine, SessionLocal
+import app.models  # noqa: F401  (registers the tables on Base.metadata)
+
+# These scripts drive a live server on localhost:8000 and are run by hand.
+collect_ignore = ["test_agent_fields.py", "test_extensions.py", "test_salary.py"]
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+def run_in_new_loop(coro_fn):
+    """``asyncio.run(coro_fn())``, then drop the async engine's pooled connections."""
+    async def main():
+        try:
+            return await coro_fn()
+        finally:
+            # Pooled connections belong to this loop; don't carry them into the next one
+            await async_engine.dispose()
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def pg_engine():
+    """An engine on a new, empty Postgres database, dropped afterwards."""
+    if not TEST_POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    url = make_url(TEST_POSTGRES_URL).set(drivername="postgresql+psycopg")
+    name = f"test_{uuid.uuid4().hex[:12]}"
+    server = create_engine(url, isolation_level="AUTOCOMMIT", poolclass=NullPool)
+    with server.connect() as conn:
+        conn.execute(text(f'CREATE DATABASE "{name}"'))
+    pg = create_engine(url.set(database=name), poolclass=NullPool)
+    try:
+        yield pg
+    finally:
+        pg.dispose()
+        with server.connect() as conn:
+            conn.execute(text(f'DROP DATABASE "{name}" WITH (FORCE)'))
+        server.dispose()
+
+
+@pytest.fixture
+def pg_db(pg_engine):
+    """A session on a new Postgres database holding the models' tables."""
+    Base.metadata.create_all(bind=pg_engine)
+    session = Session(pg_engine)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def run_async(db):
+    """Await ``fn(async_session)`` on a fresh event loop, e.g. to call an async route."""
+    def run(fn):
+        async def call():
+            async with AsyncSessionLocal() as session:
+                return await fn(session)
+        return run_in_new_loop(call)
+    return run
+
+
+class AsgiResponse(NamedTuple):
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+
+class AsgiClient:
+    """Sends one request at a time through an ASGI app in-process (the whole API by default)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def get(self, path: str, query: str = "", headers: Optional[Dict[str, str]] = None, app=None) -> AsgiResponse:
+        return self.request("GET", path, query, headers=headers, app=app)
+
+    def request(self, method: str, path: str, query: str = "", body: bytes = b"",
+                headers: Optional[Dict[str, str]] = None, app=None) -> AsgiResponse:
+        return run_in_new_loop(lambda: self._send(app or self.app, method, path, query, body, headers or {}))
+
+    @staticmethod
+    async def _send(app, method, path, query, body, headers) -> AsgiResponse:
+        messages = []
+        body_sent = False
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # The request is complete; wait until the app stops listening
+            await asyncio.Event().wait()
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": query.encode(),
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+        await app(scope, receive, send)
+
+        start = next(m for m in messages if m["type"] == "http.response.start")
+        return AsgiResponse(
+            start["status"],
+            {k.decode(): v.decode() for k, v in start["headers"]},
+            b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body"),
+        )
+
+
+@pytest.fixture
+def client():
+    """An ``AsgiClient`` for ``app.main.app``."""
+    from app.main import app
+    return AsgiClient(app)
+
+
+class StatementCounter:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def count_statements():
+    counter = StatementCounter()
+    for target in (engine, async_engine.sync_engine):
+        event.listen(target, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        for target in (engine, async_engine.sync_engine):
+            event.remove(target, "before_cursor_execute", counter)
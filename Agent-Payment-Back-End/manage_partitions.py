@@ -0,0 +1,62 @@
+"""Maintain the monthly partitions of payments and debts (Postgres).
+
+    python manage_partitions.py list
+    python manage_partitions.py ensure --months-ahead 3
+    python manage_partitions.py detach --before 2022-01 [--drop]
+
+Run ``ensure`` from cron (the app also runs it at startup) so next month's
+partitions exist before the first payment dated in them.
+"""
+import argparse
+import logging
+import sys
+from datetime import datetime
+from app.database import SessionLocal
+from app import partitions
+
+logger = logging.getLogger("manage_partitions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show the partitions of each table")
+    ensure = commands.add_parser("ensure", help="create missing partitions")
+    ensure.add_argument("--months-ahead", type=int, default=partitions.PARTITION_MONTHS_AHEAD)
+    detach = commands.add_parser("detach", help="detach partitions older than a month")
+    detach.add_argument("--before", required=True, help="YYYY-MM: months before this one are detached")
+    detach.add_argument("--drop", action="store_true", help="drop the detached tables instead of keeping them")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if not any(partitions.is_partitioned(db, table) for table in partitions.PARTITIONED_TABLES):
+            print("payments and debts are not partitioned (run the migrations on Postgres first).")
+            return
+        if args.command == "list":
+            for table in partitions.PARTITIONED_TABLES:
+                names = partitions.list_partitions(db, table)
+                print(f"{table}: {len(names)} partitions")
+                for name in names:
+                    print(f"  {name}")
+        elif args.command == "ensure":
+            created = partitions.ensure_partitions(db, args.months_ahead)
+            db.commit()
+            for table, names in created.items():
+                print(f"{table}: created {', '.join(names) if names else 'nothing'}")
+        else:
+            before = datetime.strptime(args.before, "%Y-%m").date()
+            detached = partitions.detach_partitions(db, before, drop=args.drop)
+            db.commit()
+            print(f"{'Dropped' if args.drop else 'Detached'} {len(detached)} partitions: {', '.join(detached) or '-'}")
+    except Exception:
+        db.rollback()
+        logger.exception("Error maintaining partitions")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    main()
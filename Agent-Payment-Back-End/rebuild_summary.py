@@ -0,0 +1,23 @@
+from app.database import SessionLocal
+from app import summary
+
+def rebuild_summary():
+    db = SessionLocal()
+    try:
+        drift = summary.rebuild(db)
+        db.commit()
+        print("Successfully rebuilt 'monthly_agent_summary' from payments and debts.")
+        if drift:
+            print(f"Corrected {len(drift)} drifted counters:")
+            for d in drift:
+                print(f"  agent {d['agent_id']} {d['year']}-{d['month']:02d} {d['column']}: {d['before']} -> {d['after']}")
+        else:
+            print("No drift: the rollup already matched.")
+    except Exception as e:
+        db.rollback()
+        print(f"Error rebuilding monthly summary: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild_summary()
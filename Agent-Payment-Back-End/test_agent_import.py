@@ -0,0 +1,87 @@
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app import agent_import, versions
+from app.models import Agent
+from app.routers.agents import import_agents
+
+
+def upload(text):
+    return UploadFile(file=io.BytesIO(text.encode("utf-8-sig")), filename="agents.csv")
+
+
+def test_import_reports_every_row(db):
+    db.add(Agent(name="Existing", role="Teacher", email_address="taken@school.com", phone_number="555-0000"))
+    db.commit()
+    csv_text = (
+        "name,role,salary,date_of_birth,email_address,phone_number\n"
+        "Alice,Teacher,1200,1990-04-02,alice@school.com,555-0001\n"
+        "Bob,Driver,,,,\n"
+        ",Teacher,100,,,\n"
+        "Carla,Teacher,lots,,,\n"
+        "Dan,Teacher,900,,alice@school.com,\n"
+        "Eve,Teacher,900,,taken@school.com,\n"
+        "Fay,Teacher,900,,,555-0000\n"
+    )
+
+    report = import_agents(file=upload(csv_text), db=db, user={})
+
+    assert (report["created"], report["duplicate"], report["invalid"]) == (2, 3, 2)
+    assert [(r["row"], r["result"]) for r in report["rows"]] == [
+        (2, "created"), (3, "created"), (4, "invalid"), (5, "invalid"),
+        (6, "duplicate"), (7, "duplicate"), (8, "duplicate"),
+    ]
+    alice = db.get(Agent, report["rows"][0]["agent_id"])
+    assert (alice.name, alice.salary, str(alice.date_of_birth)) == ("Alice", 1200.0, "1990-04-02")
+    assert db.get(Agent, report["rows"][1]["agent_id"]).salary == 0.0
+    assert "earlier in the file" in report["rows"][4]["detail"]
+    assert "already exists" in report["rows"][5]["detail"]
+    assert versions.current(db, versions.AGENTS)[versions.AGENTS] == 1
+
+
+def test_import_statements_do_not_grow_per_row(db, count_statements, monkeypatch):
+    monkeypatch.setattr(agent_import, "IMPORT_BATCH_SIZE", 500)
+    rows = "".join(f"Agent {i},Teacher,1000,,agent{i}@school.com,555-{i:04d}\n" for i in range(1200))
+
+    count_statements.statements.clear()
+    report = import_agents(file=upload("name,role,salary,date_of_birth,email_address,phone_number\n" + rows), db=db, user={})
+
+    assert report["created"] == 1200
+    assert db.query(Agent).count() == 1200
+    # Three batches of: duplicate check, id reservation, executemany insert; then the version bump
+    assert count_statements.count <= 3 * 3 + 2
+
+
+def test_import_rejects_missing_columns(db):
+    with pytest.raises(HTTPException) as raised:
+        import_agents(file=upload("full_name,job\nAlice,Teacher\n"), db=db, user={})
+    assert raised.value.status_code == 400
+    assert "name, role" in raised.value.detail
+
+
+def test_import_copies_into_postgres_with_sequence_ids(pg_db):
+    pg_db.add(Agent(name="Existing", role="Teacher", email_address="taken@school.com"))
+    pg_db.commit()
+    csv_text = (
+        "name,role,salary,date_of_birth,email_address,phone_number\n"
+        "Alice,Teacher,1200,1990-04-02,alice@school.com,555-0001\n"
+        "Bob,Driver,,,,\n"
+        "Eve,Teacher,900,,taken@school.com,\n"
+    )
+
+    report = import_agents(file=upload(csv_text), db=pg_db, user={})
+
+    assert (report["created"], report["duplicate"]) == (2, 1)
+    ids = [r["agent_id"] for r in report["rows"][:2]]
+    assert ids == [2, 3]
+    alice, bob = pg_db.get(Agent, ids[0]), pg_db.get(Agent, ids[1])
+    assert (alice.name, alice.salary, str(alice.date_of_birth), alice.phone_number) == ("Alice", 1200.0, "1990-04-02", "555-0001")
+    assert (bob.name, bob.salary, bob.email_address) == ("Bob", 0.0, None)
+
+    # The ids came from the sequence, so ordinary inserts carry on after them
+    later = Agent(name="Later", role="Teacher")
+    pg_db.add(later)
+    pg_db.commit()
+    assert later.id == 4
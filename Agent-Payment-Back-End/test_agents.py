@@ -0,0 +1,72 @@
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from app import summary, versions
+from app.models import Agent, Debt, MonthlyAgentSummary, Payment
+from app.routers.admin import reset_database
+from app.routers.agents import bulk_delete_agents, delete_agent
+
+ADMIN = {"role": "admin"}
+
+
+def seed(db, count):
+    agents = [Agent(name=f"Agent {i}", role="Teacher", salary=1000.0) for i in range(count)]
+    db.add_all(agents)
+    db.flush()
+    for agent in agents:
+        db.add_all([
+            Payment(agent_id=agent.id, amount=100.0, status="Completed", payment_date=date(2025, 5, 3)),
+            Debt(agent_id=agent.id, amount=10.0, reason="Advance", debt_date=date(2025, 5, 1)),
+        ])
+    db.flush()
+    summary.rebuild(db)
+    db.commit()
+    return [agent.id for agent in agents]
+
+
+def remaining(db, model):
+    return sorted(agent_id for (agent_id,) in db.query(model.agent_id))
+
+
+def test_delete_agent_cascades(db):
+    first, second = seed(db, 2)
+
+    assert delete_agent(first, db=db, user=ADMIN) == {"message": "Agent deleted"}
+
+    assert db.query(Agent.id).all() == [(second,)]
+    assert remaining(db, Payment) == remaining(db, Debt) == remaining(db, MonthlyAgentSummary) == [second]
+    assert versions.current(db, *versions.ALL_TABLES) == dict.fromkeys(versions.ALL_TABLES, 1)
+
+    with pytest.raises(HTTPException) as e:
+        delete_agent(first, db=db, user=ADMIN)
+    assert e.value.status_code == 404
+
+
+def test_bulk_delete_is_one_statement(db, count_statements):
+    ids = seed(db, 5)
+    count_statements.statements.clear()
+
+    result = bulk_delete_agents(ids=[ids[0], ids[2], 999], db=db, user=ADMIN)
+
+    assert result == {"deleted": [ids[0], ids[2]], "not_found": [999]}
+    deletes = [s for s in count_statements.statements if s.lstrip().upper().startswith("DELETE")]
+    assert len(deletes) == 1
+    assert remaining(db, Payment) == remaining(db, Debt) == [ids[1], ids[3], ids[4]]
+
+
+def test_bulk_delete_of_unknown_ids_changes_nothing(db):
+    seed(db, 1)
+    assert bulk_delete_agents(ids=[999], db=db, user=ADMIN) == {"deleted": [], "not_found": [999]}
+    assert versions.current(db, versions.AGENTS) == {versions.AGENTS: 0}
+
+
+def test_reset_database_clears_every_data_table(db):
+    seed(db, 3)
+
+    reset_database(db=db, user=ADMIN)
+
+    for model in (Agent, Payment, Debt, MonthlyAgentSummary):
+        assert db.query(model).count() == 0
+    assert versions.current(db, versions.DEBTS) == {versions.DEBTS: 1}
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+
+import bcrypt
+import pytest
+from fastapi import HTTPException
+
+from app import auth
+from app.models import User
+from app.routers.auth import login
+from app.schemas import LoginSchema
+
+
+def test_login_checks_the_users_table(db, run_async):
+    db.add(User(email="clerk@school.com", password=auth.hash_password("s3cret"), role="accountant"))
+    db.commit()
+
+    response = run_async(lambda s: login(LoginSchema(email="clerk@school.com", password="s3cret"), db=s))
+
+    assert response["user"] == {"email": "clerk@school.com", "role": "accountant", "name": "Accountant"}
+    assert auth.decode_token(response["access_token"])["role"] == "accountant"
+
+
+@pytest.mark.parametrize("email, password", [("clerk@school.com", "wrong"), ("nobody@school.com", "s3cret")])
+def test_login_rejects_bad_credentials(db, run_async, email, password):
+    db.add(User(email="clerk@school.com", password=auth.hash_password("s3cret"), role="accountant"))
+    db.commit()
+
+    with pytest.raises(HTTPException) as raised:
+        run_async(lambda s: login(LoginSchema(email=email, password=password), db=s))
+    assert raised.value.status_code == 401
+
+
+def test_login_upgrades_hash_cost(db, run_async):
+    weaker = bcrypt.hashpw(b"s3cret", bcrypt.gensalt(auth.BCRYPT_ROUNDS + 1)).decode()
+    db.add(User(email="clerk@school.com", password=weaker, role="accountant"))
+    db.commit()
+
+    run_async(lambda s: login(LoginSchema(email="clerk@school.com", password="s3cret"), db=s))
+
+    db.expire_all()
+    stored = db.query(User).one().password
+    assert not auth.needs_rehash(stored)
+    assert auth.verify_password("s3cret", stored)
+
+
+def test_ensure_admin_is_idempotent(db, monkeypatch):
+    monkeypatch.setenv("ADMIN_EMAIL", "boss@school.com")
+    monkeypatch.setenv("ADMIN_PASSWORD", "hunter2")
+
+    auth.ensure_admin(db)
+    auth.ensure_admin(db)
+
+    admin = db.query(User).one()
+    assert (admin.email, admin.role) == ("boss@school.com", "admin")
+    assert auth.verify_password("hunter2", admin.password)
+
+
+def test_verify_password_handles_legacy_values():
+    assert not auth.verify_password("123456", "123456")
+    assert not auth.verify_password("x", "")
+    assert auth.verify_password("a" * 100, auth.hash_password("a" * 72))
+
+
+def test_unknown_user_dummy_hash_is_computed_off_the_event_loop(monkeypatch):
+    threads = []
+    real_hash = auth.hash_password
+
+    def recording_hash(password):
+        threads.append(threading.current_thread().name)
+        return real_hash(password)
+
+    monkeypatch.setattr(auth, "hash_password", recording_hash)
+    auth._dummy_hash.cache_clear()
+    try:
+        assert asyncio.run(auth.verify_password_async("guess", None)) is False
+    finally:
+        auth._dummy_hash.cache_clear()
+    assert len(threads) == 1 and threads[0].startswith("bcrypt")
@@ -0,0 +1,41 @@
+import pytest
+
+from app import database
+from app.routers.admin import pool_status
+
+
+def test_get_db_checks_out_from_timed_pool(db):
+    before = database.pool_stats["sync"].checkouts
+    session_gen = database.get_db()
+    session = next(session_gen)
+    session.connection()
+    status = pool_status(user={})["sync"]
+    assert status["pool_class"] == "TimedQueuePool"
+    assert status["checked_out"] >= 1
+    session_gen.close()
+    assert database.pool_stats["sync"].checkouts > before
+    assert pool_status(user={})["sync"]["timeouts"] == 0
+
+
+def test_async_session_uses_its_own_timed_pool(run_async):
+    before = database.pool_stats["async"].checkouts
+
+    async def touch(session):
+        await session.connection()
+        return pool_status(user={})["async"]
+
+    status = run_async(touch)
+    assert status["pool_class"] == "TimedAsyncQueuePool"
+    assert status["checked_out"] == 1
+    assert database.pool_stats["async"].checkouts == before + 1
+
+
+def test_sync_and_async_pools_share_one_connection_budget():
+    split = database.split_pool_budget(5, 5, 2, 2)
+    assert split == {"sync": (3, 3), "async": (2, 2)}
+    total = sum(size + overflow for size, overflow in split.values())
+    assert total == 10
+
+    assert database.engine.pool.size() + database.async_engine.pool.size() == database.DB_POOL_SIZE
+    with pytest.raises(ValueError):
+        database.split_pool_budget(5, 5, 5, 2)  # nothing left for the sync pool
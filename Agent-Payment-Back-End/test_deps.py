@@ -0,0 +1,68 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from app import auth, deps
+from app.deps import TokenCache, get_current_user
+
+
+@pytest.fixture(autouse=True)
+def empty_token_cache():
+    deps.token_cache.clear()
+
+
+def count_decodes(monkeypatch):
+    calls = []
+    real_decode = auth.decode_token
+
+    def decode(token):
+        calls.append(token)
+        return real_decode(token)
+
+    monkeypatch.setattr(auth, "decode_token", decode)
+    return calls
+
+
+def test_verified_token_is_decoded_once(monkeypatch):
+    calls = count_decodes(monkeypatch)
+    token = auth.create_token({"sub": "admin@school.com", "role": "admin"})
+
+    first = get_current_user(token)
+    first["role"] = "tampered"
+    second = get_current_user(token)
+
+    assert len(calls) == 1
+    assert second["role"] == "admin"
+
+
+def test_invalid_token_is_rejected_every_time(monkeypatch):
+    calls = count_decodes(monkeypatch)
+    forged = jwt.encode({"sub": "x", "role": "admin"}, "not-the-key", algorithm=auth.ALGORITHM)
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as raised:
+            get_current_user(forged)
+        assert raised.value.status_code == 401
+    assert len(calls) == 2
+
+
+def test_cache_respects_token_expiry():
+    cache = TokenCache(max_entries=10, ttl=3600)
+    cache.put("expired", {"sub": "a", "exp": time.time() - 1})
+    cache.put("valid", {"sub": "b", "exp": time.time() + 60})
+
+    assert cache.get("expired") is None
+    assert cache.get("valid")["sub"] == "b"
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TokenCache(max_entries=2, ttl=60)
+    cache.put("a", {"sub": "a"})
+    cache.put("b", {"sub": "b"})
+    cache.get("a")
+    cache.put("c", {"sub": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
@@ -0,0 +1,87 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from app.auth import create_token
+from app.models import Agent, Debt, Payment
+from app.routers import exports
+from app.routers.exports import export_table
+
+
+def seed(db):
+    agents = [Agent(name=f"Agent {i}", role="Teacher", salary=1000.0) for i in range(2)]
+    db.add_all(agents)
+    db.flush()
+    for month in range(1, 6):
+        db.add(Payment(agent_id=agents[month % 2].id, amount=100.0 * month, status="Completed",
+                       payment_date=date(2025, month, 1)))
+    db.add(Debt(agent_id=agents[0].id, amount=25.0, reason="Advance, cash", debt_date=date(2025, 3, 10)))
+    db.commit()
+    return agents
+
+
+def chunks(response):
+    async def collect():
+        return [chunk async for chunk in response.body_iterator]
+    return asyncio.run(collect())
+
+
+def export(db, dataset, fmt, **filters):
+    params = {"agent_id": None, "date_from": None, "date_to": None, **filters}
+    return export_table(dataset=dataset, fmt=fmt, db=db, user={}, **params)
+
+
+def test_payments_csv_with_filters(db):
+    agents = seed(db)
+
+    response = export(db, "payments", "csv", agent_id=agents[1].id, date_from=date(2025, 2, 1), date_to=date(2025, 4, 30))
+
+    text = b"".join(chunks(response)).decode("utf-8-sig")
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert [(r["agent_name"], r["amount"], r["payment_date"]) for r in rows] == [("Agent 1", "300.0", "2025-03-01")]
+    assert response.headers["content-disposition"] == "attachment; filename=payments_2025-02-01_2025-04-30.csv"
+
+
+def test_debts_ndjson(db):
+    seed(db)
+
+    lines = b"".join(chunks(export(db, "debts", "ndjson"))).splitlines()
+
+    assert [json.loads(line) for line in lines] == [
+        {"id": 1, "agent_id": 1, "agent_name": "Agent 0", "amount": 25.0, "reason": "Advance, cash", "debt_date": "2025-03-10"}
+    ]
+
+
+def test_export_is_sent_in_batches(db, monkeypatch):
+    seed(db)
+    monkeypatch.setattr(exports, "EXPORT_BATCH_SIZE", 2)
+
+    csv_chunks = chunks(export(db, "payments", "csv"))
+    ndjson_chunks = chunks(export(db, "payments", "ndjson"))
+
+    assert len(csv_chunks) == 3 and len(ndjson_chunks) == 3
+    assert len(list(csv.reader(io.StringIO(b"".join(csv_chunks).decode("utf-8-sig"))))) == 6
+
+
+def test_unknown_export_and_format(db):
+    with pytest.raises(HTTPException) as raised:
+        export(db, "users", "csv")
+    assert raised.value.status_code == 404
+    with pytest.raises(HTTPException) as raised:
+        export(db, "agents", "xlsx")
+    assert raised.value.status_code == 400
+
+
+def test_export_route_paths(db, client):
+    seed(db)
+    headers = {"Authorization": f"Bearer {create_token({'sub': 'a', 'role': 'admin'})}"}
+
+    response = client.get("/exports/agents.ndjson", headers=headers)
+    assert response.status == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line)["name"] for line in response.body.splitlines()] == ["Agent 0", "Agent 1"]
@@ -0,0 +1,149 @@
+import json
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import jobs
+from app.models import Agent, ReportJob
+
+
+@pytest.fixture
+def agents(db):
+    db.add_all([Agent(name=f"Agent {i}", role="Teacher", salary=1000.0) for i in range(5)])
+    db.commit()
+
+
+def test_run_job_in_process(db, agents):
+    job = jobs.create_job(db, "agents_pdf", {})
+    assert job.status == "queued"
+
+    jobs.run_job(job.id)
+    jobs.run_job(job.id)  # a second dispatch of the same job is a no-op
+
+    db.expire_all()
+    job = db.get(ReportJob, job.id)
+    assert (job.status, job.filename, job.media_type) == ("done", "agents_list.pdf", "application/pdf")
+    assert job.result.startswith(b"%PDF")
+
+
+def test_failed_job_records_error(db, agents):
+    job = jobs.create_job(db, "payslip_pdf", {"agent_id": 999, "type": "all"})
+    jobs.run_job(job.id)
+    db.expire_all()
+    job = db.get(ReportJob, job.id)
+    assert (job.status, job.error) == ("failed", "Agent not found")
+
+
+def test_unknown_kind_rejected(db):
+    with pytest.raises(ValueError):
+        jobs.create_job(db, "nope", {})
+
+
+@pytest.mark.parametrize("kind, params, message", [
+    ("payslip_pdf", {"type": "all"}, "agent_id"),
+    ("payslip_pdf", {"agent_id": 1}, "agent_id and a type"),
+    ("payslip_pdf", {"agent_id": 1, "type": "monthly", "month": "May 2025"}, "YYYY-MM"),
+    ("payslips_batch", {"type": "monthly"}, "type=monthly&month=YYYY-MM"),
+    ("payslips_batch", {"type": "yearly", "year": "2025"}, "type=yearly&year=YYYY"),
+    ("payslips_batch", {"type": "monthly", "month": "2025-05", "format": "tar"}, "format"),
+])
+def test_job_params_checked_up_front(db, client, kind, params, message):
+    with pytest.raises(ValueError, match=message):
+        jobs.create_job(db, kind, params)
+    assert db.query(ReportJob).count() == 0
+
+    response = client.request("POST", "/reports/jobs", body=json.dumps({"kind": kind, "params": params}).encode(),
+                              headers={"Content-Type": "application/json"})
+    assert response.status == 400 and message in json.loads(response.body)["detail"]
+
+
+def test_resume_pending_runs_in_pool(db, agents):
+    queued = jobs.create_job(db, "debts_pdf", {})
+    orphaned = jobs.create_job(db, "agents_pdf", {})
+    orphaned.status = "running"
+    orphaned.started_at = datetime.utcnow() - timedelta(hours=1)
+    orphaned.lease_expires_at = datetime.utcnow() - timedelta(minutes=59)
+    db.commit()
+
+    try:
+        jobs.resume_pending()
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            db.expire_all()
+            statuses = {db.get(ReportJob, queued.id).status, db.get(ReportJob, orphaned.id).status}
+            if statuses == {"done"}:
+                break
+            time.sleep(0.2)
+        assert statuses == {"done"}
+    finally:
+        jobs.shutdown()
+
+
+def test_restart_right_after_a_claim_requeues_the_job(db, agents, monkeypatch):
+    job = jobs.create_job(db, "agents_pdf", {})
+    # The worker claims the job and its server goes down before it renders anything
+    assert jobs._claim(db, job.id)
+    dispatched = []
+    monkeypatch.setattr(jobs, "dispatch", dispatched.append)
+
+    # The new server leaves a live lease alone...
+    jobs.sweep()
+    db.expire_all()
+    assert db.get(ReportJob, job.id).status == "running" and dispatched == []
+
+    # ...and requeues the job once nobody has renewed it
+    later = datetime.utcnow() + timedelta(seconds=jobs.REPORT_JOB_LEASE_SECONDS + 1)
+    assert jobs.requeue_expired(db, now=later) == [job.id]
+    assert jobs.requeue_expired(db, now=later) == []
+    db.expire_all()
+    job = db.get(ReportJob, job.id)
+    assert (job.status, job.started_at, job.lease_expires_at) == ("queued", None, None)
+
+    monkeypatch.setattr(jobs, "REPORT_JOB_LEASE_SECONDS", -1)
+    assert jobs._claim(db, job.id)
+    jobs.sweep()
+    assert dispatched == [job.id]
+
+
+def test_heartbeat_renews_the_lease(db, agents, monkeypatch):
+    monkeypatch.setattr(jobs, "REPORT_JOB_LEASE_SECONDS", 0.3)
+    job = jobs.create_job(db, "agents_pdf", {})
+    jobs._claim(db, job.id)
+    db.expire_all()
+    first = db.get(ReportJob, job.id).lease_expires_at
+
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=jobs._renew_lease, args=(job.id, stop))
+    heartbeat.start()
+    time.sleep(0.25)
+    stop.set()
+    heartbeat.join()
+
+    db.expire_all()
+    assert db.get(ReportJob, job.id).lease_expires_at > first
+
+
+def test_job_fails_when_its_pool_worker_dies(db, agents, monkeypatch):
+    class BrokenPool:
+        def submit(self, fn, *args):
+            future = Future()
+            future.set_exception(BrokenProcessPool("A process in the process pool was terminated abruptly"))
+            return future
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            pass
+
+    broken = BrokenPool()
+    monkeypatch.setattr(jobs, "_pool", broken)
+    job = jobs.create_job(db, "agents_pdf", {})
+
+    jobs.dispatch(job.id)
+
+    db.expire_all()
+    job = db.get(ReportJob, job.id)
+    assert job.status == "failed" and "terminated abruptly" in job.error
+    assert jobs._pool is None
@@ -0,0 +1,110 @@
+import json
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from app import ledger, report_data
+from app.models import Agent, AgentBalance, LedgerEntry
+from app.pagination import PageParams
+from app.routers.agents import delete_agent, get_agent_balance, get_agent_balances
+from app.routers.debts import create_debt, delete_debt
+from app.routers.payments import create_payment, delete_payment, run_payroll, update_payment, update_payment_status
+from app.schemas import DebtCreate, PaymentCreate, PaymentStatusUpdate, PayrollRun
+
+USER = {"role": "admin"}
+
+
+def balances(db):
+    return {b.agent_id: (b.paid_total, b.debt_total, b.entry_count) for b in db.query(AgentBalance)}
+
+
+def test_write_paths_keep_the_balance_and_match_backfill(db):
+    agents = [Agent(name=f"Agent {i}", role="Teacher", salary=1000.0) for i in range(2)]
+    db.add_all(agents)
+    db.commit()
+    first, second = agents[0].id, agents[1].id
+
+    p1 = create_payment(PaymentCreate(agent_id=first, amount=1000.0, status="Pending", payment_date=date(2025, 5, 1)), db=db, user=USER)
+    create_debt(DebtCreate(agent_id=first, amount=150.0, reason="Advance", debt_date=date(2025, 5, 12)), db=db, user=USER)
+    update_payment_status(p1.id, PaymentStatusUpdate(status="Completed"), db=db, user=USER)
+    p2 = create_payment(PaymentCreate(agent_id=first, amount=300.0, status="Completed", payment_date=None), db=db, user=USER)
+    update_payment(p2.id, PaymentCreate(agent_id=second, amount=200.0, status="Completed", payment_date=None), db=db, user=USER)
+    debt = create_debt(DebtCreate(agent_id=second, amount=50.0, reason="Loan", debt_date=None), db=db, user=USER)
+    delete_debt(debt.id, db=db, user=USER)
+    p3 = create_payment(PaymentCreate(agent_id=second, amount=10.0, status="Completed", payment_date=date(2025, 9, 1)), db=db, user=USER)
+    delete_payment(p3.id, db=db, user=USER)
+    run_payroll(PayrollRun(month="2025-07", status="Completed"), db=db, user=USER)
+
+    incremental = balances(db)
+    assert incremental[first][:2] == (850.0 + 1000.0, 150.0)
+    assert incremental[second][:2] == (200.0 + 1000.0, 0.0)
+    # Every entry names its source, reversals included
+    assert db.query(LedgerEntry).filter(LedgerEntry.source_id.is_(None)).count() == 0
+
+    ledger.rebuild(db)
+    assert balances(db) == incremental
+
+    ledger.backfill(db)
+    db.commit()
+    assert {k: v[:2] for k, v in balances(db).items()} == {k: v[:2] for k, v in incremental.items()}
+
+
+def test_balance_endpoints(db, count_statements):
+    agents = [Agent(name=f"Agent {i}", role="Teacher") for i in range(3)]
+    db.add_all(agents)
+    db.commit()
+    create_payment(PaymentCreate(agent_id=agents[0].id, amount=500.0, status="Completed", payment_date=date(2025, 5, 1)), db=db, user=USER)
+    create_debt(DebtCreate(agent_id=agents[0].id, amount=80.0, reason="Advance", debt_date=date(2025, 6, 1)), db=db, user=USER)
+
+    agent_id = agents[0].id
+    count_statements.statements.clear()
+    assert get_agent_balance(agent_id, db=db, user=USER) == {
+        "agent_id": agent_id, "paid_total": 500.0, "debt_total": 80.0, "balance": 420.0,
+    }
+    assert count_statements.count == 1
+    assert get_agent_balance(agents[1].id, db=db, user=USER)["balance"] == 0.0
+    with pytest.raises(HTTPException) as e:
+        get_agent_balance(999, db=db, user=USER)
+    assert e.value.status_code == 404
+
+    page = json.loads(get_agent_balances(ids=[agents[0].id, agents[2].id], page=PageParams(limit=10, after=None, all_rows=False),
+                                         db=db, user=USER).body)
+    assert [(b["agent_id"], b["balance"]) for b in page["items"]] == [(agents[0].id, 420.0), (agents[2].id, 0.0)]
+
+
+def test_balances_walk_every_page(db):
+    agents = [Agent(name=f"Agent {i}", role="Teacher") for i in range(5)]
+    db.add_all(agents)
+    db.commit()
+
+    seen, after = [], None
+    while True:
+        page = json.loads(get_agent_balances(ids=None, page=PageParams(limit=2, after=after, all_rows=False), db=db, user=USER).body)
+        seen.append([b["agent_id"] for b in page["items"]])
+        after = page["next_cursor"]
+        if after is None:
+            break
+    ids = [a.id for a in agents]
+    assert seen == [ids[0:2], ids[2:4], ids[4:]]
+
+
+def test_all_time_payslip_reads_the_ledger(db):
+    agent = Agent(name="Alice", role="Teacher")
+    db.add(agent)
+    db.commit()
+    create_payment(PaymentCreate(agent_id=agent.id, amount=700.0, status="Completed", payment_date=None), db=db, user=USER)
+    create_debt(DebtCreate(agent_id=agent.id, amount=20.0, reason="Advance", debt_date=None), db=db, user=USER)
+
+    data = report_data.load_payslip(db, agent.id, "all")
+    assert (data.total_paid, data.total_debt) == (700.0, 20.0)
+
+
+def test_deleting_an_agent_removes_its_ledger(db):
+    agent = Agent(name="Alice", role="Teacher")
+    db.add(agent)
+    db.commit()
+    create_debt(DebtCreate(agent_id=agent.id, amount=20.0, reason="Advance", debt_date=None), db=db, user=USER)
+
+    delete_agent(agent.id, db=db, user=USER)
+    assert db.query(LedgerEntry).count() == db.query(AgentBalance).count() == 0
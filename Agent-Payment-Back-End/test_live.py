@@ -0,0 +1,138 @@
+import asyncio
+import json
+
+from app import live, versions
+from app.models import Agent, Payment
+from app.routers import reports
+
+
+class FakeData:
+    def __init__(self):
+        self.version = 1
+        self.loads = []
+
+    async def load_version(self):
+        return str(self.version)
+
+    async def load_payload(self, key):
+        self.loads.append(key)
+        return json.dumps({"month": key, "version": self.version})
+
+
+def events(text):
+    return [dict(line.split(": ", 1) for line in block.strip().split("\n")) for block in text if block.startswith("id:")]
+
+
+async def drain(subscription):
+    await asyncio.sleep(0.05)
+    received = []
+    while not subscription.queue.empty():
+        received.append(subscription.queue.get_nowait())
+    return received
+
+
+def test_one_computation_per_change_fans_out_to_every_subscriber():
+    data = FakeData()
+    broadcaster = live.Broadcaster(data.load_version, data.load_payload, poll_seconds=0.01, debounce_seconds=0.02)
+
+    async def main():
+        subscribers = [broadcaster.subscribe("2025-05") for _ in range(3)] + [broadcaster.subscribe(None)]
+        first = [await drain(s) for s in subscribers]
+
+        # A burst of writes inside the debounce window is one update
+        data.version = 2
+        await asyncio.sleep(0.005)
+        data.version = 3
+        second = [await drain(s) for s in subscribers]
+
+        idle = [await drain(s) for s in subscribers]
+        for s in subscribers:
+            broadcaster.unsubscribe(s)
+        return first, second, idle
+
+    first, second, idle = asyncio.run(main())
+
+    assert [[event_id for event_id, _ in received] for received in first] == [["1"]] * 4
+    assert [[event_id for event_id, _ in received] for received in second] == [["3"]] * 4
+    assert json.loads(second[0][0][1]) == {"month": "2025-05", "version": 3}
+    assert idle == [[]] * 4
+    assert sorted(data.loads, key=str) == sorted(["2025-05", None, "2025-05", None], key=str)
+
+
+def test_reconnect_with_last_event_id_skips_what_the_client_has():
+    data = FakeData()
+    broadcaster = live.Broadcaster(data.load_version, data.load_payload, poll_seconds=0.01, debounce_seconds=0)
+
+    async def main():
+        watcher = broadcaster.subscribe(None)
+        await drain(watcher)
+        returning = broadcaster.subscribe(None, last_event_id="1")
+        unchanged = await drain(returning)
+        data.version = 2
+        changed = await drain(returning)
+        for s in (watcher, returning):
+            broadcaster.unsubscribe(s)
+        return unchanged, changed
+
+    unchanged, changed = asyncio.run(main())
+    assert unchanged == []
+    assert [event_id for event_id, _ in changed] == ["2"]
+
+
+def test_event_stream_format_and_heartbeat():
+    data = FakeData()
+    broadcaster = live.Broadcaster(data.load_version, data.load_payload, poll_seconds=0.01, debounce_seconds=0)
+
+    async def main():
+        stream = broadcaster.events("2025-05", heartbeat_seconds=0.05)
+        chunks = [await stream.__anext__() for _ in range(3)]
+        await stream.aclose()
+        return chunks
+
+    chunks = asyncio.run(main())
+
+    assert chunks[0] == f"retry: {live.LIVE_RETRY_MS}\n\n"
+    assert events(chunks) == [{"id": "1", "event": "stats", "data": '{"month": "2025-05", "version": 1}'}]
+    assert chunks[2] == ": keepalive\n\n"
+    assert broadcaster._subscribers == {}
+
+
+def test_close_stops_polling():
+    data = FakeData()
+    broadcaster = live.Broadcaster(data.load_version, data.load_payload, poll_seconds=0.01, debounce_seconds=0)
+
+    async def main():
+        broadcaster.subscribe(None)
+        task = broadcaster._task
+        await asyncio.sleep(0.03)
+        await broadcaster.close()
+        return task
+
+    task = asyncio.run(main())
+    assert task.cancelled() and broadcaster._task is None
+
+
+def test_stream_rejects_malformed_months(client):
+    response = client.get("/reports/dashboard/stream", "month=not-a-month")
+    assert response.status == 400
+    assert reports.dashboard_broadcaster._subscribers == {}
+
+
+def test_dashboard_loaders_follow_writes(db, run_async):
+    agent = Agent(name="Alice", role="Teacher")
+    db.add(agent)
+    db.flush()
+    db.add(Payment(agent_id=agent.id, amount=100.0, status="pending"))
+    db.commit()
+
+    async def load(_session):
+        return await reports._dashboard_version(), json.loads(await reports._dashboard_payload(None))
+
+    before, payload = run_async(load)
+    assert payload["total_agents"] == 1 and payload["pending_count"] == 1
+    assert payload["recent_payments"][0]["amount"] == 100.0
+
+    versions.bump(db, versions.PAYMENTS)
+    db.commit()
+    after, _ = run_async(load)
+    assert before == "0-0-0" and after == "0-1-0"
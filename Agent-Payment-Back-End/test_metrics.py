@@ -0,0 +1,57 @@
+import logging
+
+from app import metrics, report_pdf
+from app.auth import create_token
+from app.models import Agent
+
+
+def test_server_timing_counts_queries_on_async_and_threadpool_routes(db, client):
+    db.add(Agent(name="Alice", role="Teacher"))
+    db.commit()
+    token = create_token({"sub": "admin@school.com", "role": "admin"})
+
+    listed = client.get("/agents/", "limit=10")
+    missing = client.get("/payments/999", headers={"Authorization": f"Bearer {token}"})
+
+    assert listed.status == 200 and missing.status == 404
+    # The list reads data_versions (for its ETag) and then the agents
+    assert 'desc="2 queries"' in listed.headers["server-timing"]
+    assert 'desc="1 queries"' in missing.headers["server-timing"]
+    assert listed.headers["server-timing"].startswith("app;dur=")
+
+
+def test_metrics_endpoint_exports_route_histograms(db, client):
+    metrics.registry.clear()
+    client.get("/agents/", "limit=10")
+    client.get("/agents/", "limit=10")
+    client.get("/does-not-exist")
+
+    text = client.get("/metrics").body.decode()
+
+    assert 'http_request_duration_seconds_count{method="GET",route="/agents/",status="200"} 2' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/agents/",status="200",le="+Inf"} 2' in text
+    assert 'http_request_db_statements_total{method="GET",route="/agents/",status="200"} 4' in text
+    assert 'route="unmatched",status="404"' in text
+    assert 'db_pool_checkouts_total{engine="async"}' in text
+
+
+def test_slow_queries_are_logged(db, monkeypatch, caplog):
+    monkeypatch.setattr(metrics, "SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="app.sql"):
+        db.query(Agent).all()
+    assert any("Slow query" in r.getMessage() and "FROM agents" in r.getMessage() for r in caplog.records)
+
+
+def test_streamed_queries_reach_the_registry_after_the_body(db, client, monkeypatch):
+    monkeypatch.setattr(report_pdf, "BATCH_SIZE", 10)
+    db.add_all([Agent(name=f"Agent {i}", role="Teacher", salary=1000.0) for i in range(45)])
+    db.commit()
+    metrics.registry.clear()
+
+    response = client.get("/reports/agents/pdf")
+
+    # The header went out after the version lookup, before the rows were read...
+    assert 'desc="1 queries"' in response.headers["server-timing"]
+    # ...the registry saw the report's query too (yield_per batches are fetches of one statement)
+    (_, count, _, statements, _), = metrics.registry.snapshot().values()
+    assert count == 1 and statements == 2
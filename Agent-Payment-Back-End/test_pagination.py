@@ -0,0 +1,135 @@
+import json
+from datetime import date
+
+from starlette.requests import Request
+
+from app import fastjson, versions
+from app.main import app
+from app.models import Agent, Debt, Payment
+from app.pagination import PageParams
+from app.routers.agents import get_agents
+from app.routers.debts import get_debts
+from app.routers.payments import get_payments
+
+
+def request(path="/", if_none_match=None, query=b""):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query, "headers": headers})
+
+
+def body(response):
+    return json.loads(response.body)
+
+
+def seed(db):
+    agents = [Agent(name=name, role="Teacher") for name in ["Alice", "alan", "Bob", "Carla"]]
+    db.add_all(agents)
+    db.flush()
+    for month in range(1, 7):
+        db.add(Payment(agent_id=agents[month % 2].id, amount=100.0 * month,
+                       status="Completed" if month % 3 else "pending", payment_date=date(2025, month, 1)))
+    db.commit()
+    return agents
+
+
+def test_payments_walk_pages(db, run_async):
+    seed(db)
+    seen, after = [], None
+    while True:
+        page = body(run_async(lambda s: get_payments(request(), page=PageParams(limit=4, after=after, all_rows=False), db=s, user={})))
+        seen += [p["amount"] for p in page["items"]]
+        after = page["next_cursor"]
+        if after is None:
+            break
+    assert seen == [100.0, 200.0, 300.0, 400.0, 500.0, 600.0]
+
+
+def test_payments_filters(db, run_async):
+    agents = seed(db)
+    page = body(run_async(lambda s: get_payments(request(), agent_id=agents[1].id, status="COMPLETED", date_from=date(2025, 2, 1),
+                                                 date_to=date(2025, 5, 31), page=PageParams(limit=10, after=None, all_rows=False),
+                                                 db=s, user={})))
+    assert page["items"] == [{"agent_id": agents[1].id, "amount": 500.0, "payment_date": "2025-05-01",
+                              "status": "Completed", "id": 5}]
+    assert page["next_cursor"] is None
+
+
+def test_agents_name_prefix_and_all_flag(db, run_async):
+    seed(db)
+    page = body(run_async(lambda s: get_agents(request(), name="al", page=PageParams(limit=1, after=None, all_rows=False), db=s)))
+    assert [a["name"] for a in page["items"]] == ["Alice"]
+    assert page["next_cursor"] is not None
+    everyone = body(run_async(lambda s: get_agents(request(), name=None, page=PageParams(limit=1, after=None, all_rows=True), db=s)))
+    assert [a["name"] for a in everyone] == ["Alice", "alan", "Bob", "Carla"]
+
+
+def test_undated_payment_listed_as_today(db, run_async):
+    agent = Agent(name="Alice", role="Teacher")
+    db.add(agent)
+    db.flush()
+    db.add(Payment(agent_id=agent.id, amount=10.0, status="Completed", payment_date=None))
+    db.commit()
+
+    everything = body(run_async(lambda s: get_payments(request(), page=PageParams(limit=10, after=None, all_rows=True), db=s, user={})))
+
+    assert everything[0]["payment_date"] == date.today().isoformat()
+
+
+def test_debts_list_matches_schema_fields(db):
+    agents = seed(db)
+    db.add(Debt(agent_id=agents[0].id, amount=25.0, reason="Advance", debt_date=date(2025, 3, 10)))
+    db.commit()
+
+    page = body(get_debts(request(), page=PageParams(limit=10, after=None, all_rows=False), db=db))
+
+    assert page == {"items": [{"agent_id": agents[0].id, "amount": 25.0, "reason": "Advance",
+                               "debt_date": "2025-03-10", "id": 1}], "next_cursor": None}
+
+
+def test_fast_path_keeps_openapi_schema():
+    paths = app.openapi()["paths"]
+    for path, page_schema, item_schema in [("/agents/", "AgentPage", "AgentOut"),
+                                            ("/payments/", "PaymentPage", "PaymentOut"),
+                                            ("/debts/", "DebtPage", "DebtOut")]:
+        schema = paths[path]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+        refs = json.dumps(schema)
+        assert f"#/components/schemas/{page_schema}" in refs and f"#/components/schemas/{item_schema}" in refs
+
+
+def test_stdlib_encoder_matches_orjson(monkeypatch):
+    content = {"items": [{"id": 1, "when": date(2025, 1, 2), "name": "Élodie", "amount": 1.5, "none": None}]}
+    fast = fastjson.dumps(content)
+    monkeypatch.setattr(fastjson, "orjson", None)
+    assert json.loads(fastjson.dumps(content)) == json.loads(fast)
+
+
+def test_unchanged_list_is_304_without_the_query(db, count_statements):
+    seed(db)
+    first = get_debts(request(), page=PageParams(limit=10, after=None, all_rows=False), db=db)
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+
+    count_statements.statements.clear()
+    again = get_debts(request(if_none_match=etag), page=PageParams(limit=10, after=None, all_rows=False), db=db)
+    assert again.status_code == 304 and again.headers["etag"] == etag
+    assert count_statements.count == 1  # the data_versions lookup
+
+    versions.bump(db, versions.DEBTS)
+    db.commit()
+    changed = get_debts(request(if_none_match=etag), page=PageParams(limit=10, after=None, all_rows=False), db=db)
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+
+
+def test_etag_depends_on_query_and_table(db, run_async):
+    seed(db)
+    page = PageParams(limit=10, after=None, all_rows=False)
+    agents = run_async(lambda s: get_agents(request("/agents/"), name=None, page=page, db=s))
+    filtered = run_async(lambda s: get_agents(request("/agents/", query=b"name=al"), name="al", page=page, db=s))
+    payments = run_async(lambda s: get_payments(request("/payments/"), page=page, db=s, user={}))
+    assert len({agents.headers["etag"], filtered.headers["etag"], payments.headers["etag"]}) == 3
+
+    # Payments only follow the payments table
+    versions.bump(db, versions.AGENTS)
+    db.commit()
+    revalidated = run_async(lambda s: get_payments(request("/payments/", payments.headers["etag"]), page=page, db=s, user={}))
+    assert revalidated.status_code == 304
@@ -0,0 +1,211 @@
+import os
+import sys
+from datetime import date
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import manage_partitions
+from app import partitions
+from app.database import Base
+from app.models import PAYMENT_PERIOD_INDEX, Agent, Debt, Payment
+from app.periods import add_months
+from app.routers.admin import reset_database
+from app.routers.payments import create_payment, update_payment, update_payment_status
+from app.schemas import PaymentCreate, PaymentStatusUpdate
+
+BEFORE_PARTITIONING = "5f0c3b7e9a21"
+# Added by the migrations after partitioning
+LATER_TABLES = {"ledger_entries", "agent_balances"}
+LATER_COLUMNS = {"report_jobs": ["lease_expires_at"]}
+
+
+def migrate(engine, action, revision):
+    config = Config()
+    config.set_main_option("script_location", os.path.join(os.path.dirname(__file__), "alembic"))
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        action(config, revision)
+
+
+def create_unpartitioned(engine):
+    """The schema as it was just before the partitioning migration."""
+    Base.metadata.create_all(bind=engine, tables=[t for t in Base.metadata.sorted_tables if t.name not in LATER_TABLES])
+    with engine.begin() as connection:
+        for table, columns in LATER_COLUMNS.items():
+            for column in columns:
+                connection.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+    migrate(engine, command.stamp, BEFORE_PARTITIONING)
+
+
+def located(db, table, row_id):
+    return db.execute(text(f"SELECT tableoid::regclass::text FROM {table} WHERE id = :id"), {"id": row_id}).scalar()
+
+
+@pytest.fixture
+def pg_partitioned(pg_engine):
+    """A session on a Postgres database migrated to head, payments and debts partitioned."""
+    create_unpartitioned(pg_engine)
+    migrate(pg_engine, command.upgrade, "head")
+    session = Session(pg_engine)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_partition_names_round_trip():
+    assert partitions.partition_name("payments", date(2025, 5, 17)) == "payments_2025_05"
+    assert partitions.partition_month("payments_2025_05") == date(2025, 5, 1)
+    assert partitions.partition_month("debts_default") is None
+
+
+def test_add_months_crosses_years():
+    assert add_months(date(2025, 11, 30), 2) == date(2026, 1, 1)
+    assert add_months(date(2025, 1, 15), -1) == date(2024, 12, 1)
+    assert [add_months(date(2025, 12, 1), n).month for n in range(3)] == [12, 1, 2]
+
+
+def test_local_unique_index_keeps_the_duplicate_payment_name():
+    # routers.payments recognises the duplicate-payment error by this prefix
+    (prefix, unique, _), = partitions.LOCAL_INDEXES["payments"]
+    assert prefix == PAYMENT_PERIOD_INDEX and unique
+
+
+def test_maintenance_is_a_no_op_off_postgres(db):
+    assert not partitions.is_partitioned(db, "payments")
+    assert partitions.ensure_partitions(db) == {}
+    assert partitions.detach_partitions(db, date(2030, 1, 1)) == []
+
+
+def test_manage_partitions_exits_non_zero_on_errors(db, monkeypatch, caplog):
+    def broken(db, table):
+        raise RuntimeError("connection lost")
+    monkeypatch.setattr(partitions, "is_partitioned", broken)
+    monkeypatch.setattr(sys, "argv", ["manage_partitions.py", "list"])
+
+    with pytest.raises(SystemExit) as exc:
+        manage_partitions.main()
+    assert exc.value.code == 1
+    assert "Error maintaining partitions" in caplog.text and "connection lost" in caplog.text
+
+
+def test_migration_partitions_existing_rows_and_downgrades(pg_engine):
+    create_unpartitioned(pg_engine)
+    with Session(pg_engine) as db:
+        agent = Agent(name="Alice", role="Teacher")
+        db.add(agent)
+        db.flush()
+        db.add_all([
+            Payment(agent_id=agent.id, amount=10.0, status="Paid", payment_date=date(2025, 5, 3)),
+            Payment(agent_id=agent.id, amount=20.0, status="Paid", payment_date=date(2025, 6, 3)),
+            Payment(agent_id=agent.id, amount=30.0, status="pending", payment_date=None),
+            Debt(agent_id=agent.id, amount=5.0, debt_date=date(2025, 5, 9)),
+        ])
+        db.commit()
+
+    migrate(pg_engine, command.upgrade, "head")
+    with Session(pg_engine) as db:
+        assert partitions.is_partitioned(db, "payments") and partitions.is_partitioned(db, "debts")
+        assert partitions.list_partitions(db, "payments") == ["payments_2025_05", "payments_2025_06", "payments_default"]
+        assert partitions.list_partitions(db, "debts") == ["debts_2025_05", "debts_default"]
+        assert db.execute(text("SELECT count(*) FROM payments_default")).scalar() == 1
+        assert db.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = 'payments_2025_05' AND indexname LIKE 'uq%'")).scalar() \
+            == f"{PAYMENT_PERIOD_INDEX}_2025_05"
+        # The id sequence moved with the table; a month without a partition lands in the default
+        later = Payment(agent_id=1, amount=40.0, status="pending", payment_date=date(2025, 7, 20))
+        db.add(later)
+        db.commit()
+        assert later.id == 4 and located(db, "payments", later.id) == "payments_default"
+
+    migrate(pg_engine, command.downgrade, BEFORE_PARTITIONING)
+    with Session(pg_engine) as db:
+        assert not partitions.is_partitioned(db, "payments") and not partitions.is_partitioned(db, "debts")
+        assert db.execute(text("SELECT count(*) FROM payments")).scalar() == 4
+        assert db.execute(text("SELECT count(*) FROM debts")).scalar() == 1
+        assert db.execute(text("SELECT count(*) FROM pg_constraint WHERE conrelid = 'payments'::regclass AND contype = 'p'")).scalar() == 1
+        assert db.execute(text("SELECT to_regclass(:name)"), {"name": PAYMENT_PERIOD_INDEX}).scalar() == PAYMENT_PERIOD_INDEX
+
+    # ...and back up again
+    migrate(pg_engine, command.upgrade, "head")
+    with Session(pg_engine) as db:
+        assert db.execute(text("SELECT count(*) FROM payments")).scalar() == 4
+        assert partitions.list_partitions(db, "payments") == ["payments_2025_05", "payments_2025_06", "payments_2025_07", "payments_default"]
+
+
+def test_ensure_partitions_moves_months_out_of_the_default(pg_partitioned):
+    db = pg_partitioned
+    agent = Agent(name="Alice", role="Teacher")
+    db.add(agent)
+    db.flush()
+    far = Payment(agent_id=agent.id, amount=10.0, status="pending", payment_date=date(2031, 1, 15))
+    db.add_all([far, Payment(agent_id=agent.id, amount=10.0, status="pending", payment_date=None)])
+    db.commit()
+    assert located(db, "payments", far.id) == "payments_default"
+
+    created = partitions.ensure_partitions(db, months_ahead=1, today=date(2025, 5, 20))
+    # Other workers wait until this transaction ends
+    with Session(db.get_bind()) as other:
+        assert other.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": partitions.PARTITION_LOCK_KEY}).scalar() is False
+    db.commit()
+
+    assert created == {
+        "payments": ["payments_2025_05", "payments_2025_06", "payments_2031_01"],
+        "debts": ["debts_2025_05", "debts_2025_06"],
+    }
+    assert located(db, "payments", far.id) == "payments_2031_01"
+    assert db.execute(text("SELECT count(*) FROM payments_default")).scalar() == 1
+    assert partitions.ensure_partitions(db, months_ahead=1, today=date(2025, 5, 20)) == {"payments": [], "debts": []}
+
+    assert partitions.detach_partitions(db, date(2025, 6, 1)) == ["payments_2025_05", "debts_2025_05"]
+    db.commit()
+    assert "payments_2025_05" not in partitions.list_partitions(db, "payments")
+
+
+def test_cross_month_update_hits_the_partition_unique_index(pg_partitioned):
+    db = pg_partitioned
+    agent = Agent(name="Alice", role="Teacher", salary=1000.0)
+    db.add(agent)
+    db.commit()
+    partitions.ensure_partitions(db, months_ahead=1, today=date(2025, 5, 1))
+    db.commit()
+
+    create_payment(PaymentCreate(agent_id=agent.id, amount=10.0, status="pending", payment_date=date(2025, 5, 1)), db=db, user={})
+    cancelled = create_payment(PaymentCreate(agent_id=agent.id, amount=10.0, status="Cancelled", payment_date=date(2025, 6, 1)), db=db, user={})
+    assert located(db, "payments", cancelled.id) == "payments_2025_06"
+
+    # The UPDATE moves the row into May's partition...
+    moved = update_payment(cancelled.id, PaymentCreate(agent_id=agent.id, amount=10.0, status="Cancelled", payment_date=date(2025, 5, 2)), db=db, user={})
+    assert located(db, "payments", moved.id) == "payments_2025_05"
+    assert moved.period == date(2025, 5, 1)
+
+    # ...where May's own unique index refuses a second live payment
+    with pytest.raises(HTTPException) as exc:
+        update_payment_status(moved.id, PaymentStatusUpdate(status="Pending"), db=db, user={})
+    assert exc.value.status_code == 400
+    assert db.get(Payment, moved.id).status == "Cancelled"
+
+
+def test_reset_after_detach_empties_the_archives(pg_partitioned):
+    db = pg_partitioned
+    agent = Agent(name="Alice", role="Teacher")
+    db.add(agent)
+    db.flush()
+    db.add_all([
+        Payment(agent_id=agent.id, amount=10.0, status="Paid", payment_date=date(2025, 5, 3)),
+        Payment(agent_id=agent.id, amount=20.0, status="Paid", payment_date=date(2025, 6, 3)),
+    ])
+    db.commit()
+    partitions.ensure_partitions(db, months_ahead=1, today=date(2025, 5, 1))
+    assert partitions.detach_partitions(db, date(2025, 6, 1)) == ["payments_2025_05", "debts_2025_05"]
+    db.commit()
+
+    reset_database(db=db, user={})
+
+    assert db.execute(text("SELECT count(*) FROM payments")).scalar() == 0
+    assert db.execute(text("SELECT count(*) FROM payments_2025_05")).scalar() == 0
+    assert db.query(Agent).count() == 0
@@ -0,0 +1,100 @@
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.models import Agent, Debt, MonthlyAgentSummary, Payment
+from app.routers.payments import _violates_period_index, create_payment, run_payroll, update_payment, update_payment_status
+from app.schemas import PaymentCreate, PaymentStatusUpdate, PayrollRun
+
+
+@pytest.fixture
+def agent(db):
+    agent = Agent(name="Agent", role="Teacher", salary=1000.0)
+    db.add(agent)
+    db.commit()
+    return agent
+
+
+def test_period_follows_payment_date(db, agent):
+    payment = create_payment(PaymentCreate(agent_id=agent.id, amount=10.0, status="pending", payment_date=date(2025, 12, 31)), db=db, user={})
+    assert payment.period == date(2025, 12, 1)
+
+
+def test_duplicate_month_rejected(db, agent):
+    create_payment(PaymentCreate(agent_id=agent.id, amount=10.0, status="pending", payment_date=date(2025, 5, 1)), db=db, user={})
+    with pytest.raises(HTTPException) as exc:
+        create_payment(PaymentCreate(agent_id=agent.id, amount=10.0, status="pending", payment_date=date(2025, 5, 31)), db=db, user={})
+    assert exc.value.status_code == 400
+
+
+def test_index_guards_writes_the_lookup_does_not_cover(db, agent):
+    create_payment(PaymentCreate(agent_id=agent.id, amount=10.0, status="pending", payment_date=date(2025, 5, 1)), db=db, user={})
+    cancelled = create_payment(PaymentCreate(agent_id=agent.id, amount=10.0, status="Cancelled", payment_date=date(2025, 6, 1)), db=db, user={})
+
+    # Moving the cancelled payment into May and reviving it would be a second live payment
+    moved = update_payment(cancelled.id, PaymentCreate(agent_id=agent.id, amount=10.0, status="Cancelled", payment_date=date(2025, 5, 2)), db=db, user={})
+    with pytest.raises(HTTPException) as exc:
+        update_payment_status(moved.id, PaymentStatusUpdate(status="Pending"), db=db, user={})
+    assert exc.value.status_code == 400
+    assert db.get(Payment, moved.id).status == "Cancelled"
+
+
+def test_editing_a_legacy_duplicate_keeps_its_period(db, agent):
+    create_payment(PaymentCreate(agent_id=agent.id, amount=10.0, status="pending", payment_date=date(2025, 5, 1)), db=db, user={})
+    # A duplicate from before the unique index: the migration left it without a period
+    legacy_id = db.execute(insert(Payment).values(
+        agent_id=agent.id, amount=10.0, status="pending", payment_date=date(2025, 5, 20), period=None
+    )).inserted_primary_key[0]
+    db.commit()
+
+    edited = update_payment(legacy_id, PaymentCreate(agent_id=agent.id, amount=25.0, status="pending", payment_date=date(2025, 5, 20)), db=db, user={})
+    assert (edited.amount, edited.period) == (25.0, None)
+
+
+def test_duplicate_detected_by_postgres_constraint_name():
+    class Diag:
+        def __init__(self, constraint_name):
+            self.constraint_name = constraint_name
+
+    class Orig(Exception):
+        def __init__(self, constraint_name):
+            super().__init__("duplicate key value violates unique constraint")
+            self.diag = Diag(constraint_name)
+
+    assert _violates_period_index(IntegrityError("INSERT", {}, Orig("uq_payments_agent_period_active_2025_05")))
+    assert not _violates_period_index(IntegrityError("INSERT", {}, Orig("agents_phone_number_key")))
+
+
+def test_payroll_run(db, count_statements):
+    agents = [Agent(name=f"Agent {i}", role="Teacher", salary=1000.0 + i) for i in range(50)]
+    db.add_all(agents)
+    db.flush()
+    db.add(Payment(agent_id=agents[0].id, amount=5.0, status="Completed", payment_date=date(2025, 5, 3)))
+    db.add(Payment(agent_id=agents[1].id, amount=5.0, status="Cancelled", payment_date=date(2025, 5, 3)))
+    db.add(Debt(agent_id=agents[2].id, amount=300.0, reason="Advance", debt_date=date(2025, 5, 9)))
+    db.add(Debt(agent_id=agents[3].id, amount=5000.0, reason="Loan", debt_date=date(2025, 5, 9)))
+    db.commit()
+    count_statements.statements.clear()
+
+    out = run_payroll(PayrollRun(month="2025-05"), db=db, user={})
+
+    assert count_statements.count <= 8
+    assert (out["created"], out["conflicts"], out["not_found"]) == (49, 1, 0)
+    by_agent = {r["agent_id"]: r for r in out["results"]}
+    assert by_agent[agents[0].id]["result"] == "conflict"
+    assert by_agent[agents[1].id]["amount"] == 1001.0
+    assert by_agent[agents[2].id]["amount"] == 702.0
+    assert by_agent[agents[3].id]["amount"] == 0.0
+    created = db.get(Payment, by_agent[agents[4].id]["payment_id"])
+    assert (created.status, created.payment_date, created.period) == ("Pending", date(2025, 5, 1), date(2025, 5, 1))
+    assert db.get(MonthlyAgentSummary, (agents[4].id, 2025, 5)).pending_count == 1
+
+
+def test_payroll_run_selected_agents(db, agent):
+    out = run_payroll(PayrollRun(month="2025-05", agent_ids=[agent.id, 999]), db=db, user={})
+    assert [r["result"] for r in out["results"]] == ["created", "not_found"]
+    again = run_payroll(PayrollRun(month="2025-05", agent_ids=[agent.id]), db=db, user={})
+    assert again["results"][0]["result"] == "conflict"
@@ -0,0 +1,272 @@
+import asyncio
+import io
+import re
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert
+from starlette.requests import Request
+
+from app import report_cache, report_data, report_pdf, summary, versions
+from app.database import engine
+from app.models import Agent, Debt, Payment
+from app.routers.payments import create_payment, delete_payment
+from app.routers.reports import agents_pdf, generate_payslip, get_dashboard_stats
+from app.schemas import PaymentCreate
+
+
+def seed(db):
+    agents = [Agent(name=f"Agent {i}", role="Teacher", salary=1000.0) for i in range(3)]
+    db.add_all(agents)
+    db.flush()
+    db.add_all([
+        Payment(agent_id=agents[0].id, amount=100.0, status="pending", payment_date=date(2025, 5, 3)),
+        Payment(agent_id=agents[1].id, amount=200.0, status="Completed", payment_date=date(2025, 5, 10)),
+        Payment(agent_id=agents[2].id, amount=300.0, status="Failed", payment_date=date(2025, 5, 20)),
+        Payment(agent_id=agents[0].id, amount=400.0, status="Cancelled", payment_date=date(2025, 6, 1)),
+        Payment(agent_id=agents[1].id, amount=500.0, status="Completed", payment_date=date(2025, 6, 2)),
+    ])
+    summary.rebuild(db)
+    db.commit()
+
+
+def test_dashboard_all_time(db, run_async, count_statements):
+    seed(db)
+    count_statements.statements.clear()
+
+    stats = run_async(lambda s: get_dashboard_stats(month=None, db=s))
+
+    assert count_statements.count == 2
+    assert stats["total_agents"] == 3
+    assert stats["monthly_payments"] == 1500.0
+    assert (stats["pending_count"], stats["completed_count"], stats["failed_count"], stats["cancelled_count"]) == (1, 2, 1, 1)
+    assert [p.amount for p in stats["recent_payments"]] == [500.0, 400.0, 300.0, 200.0, 100.0]
+
+
+def test_dashboard_month_filter(db, run_async, count_statements):
+    seed(db)
+    count_statements.statements.clear()
+
+    stats = run_async(lambda s: get_dashboard_stats(month="2025-05", db=s))
+
+    assert count_statements.count == 2
+    assert stats["total_agents"] == 3
+    assert stats["monthly_payments"] == 600.0
+    assert (stats["pending_count"], stats["completed_count"], stats["failed_count"], stats["cancelled_count"]) == (1, 1, 1, 0)
+    assert len(stats["recent_payments"]) == 3
+
+
+def test_dashboard_empty_month(db, run_async):
+    seed(db)
+
+    stats = run_async(lambda s: get_dashboard_stats(month="2030-01", db=s))
+
+    assert stats["monthly_payments"] == 0.0
+    assert stats["pending_count"] == 0
+    assert stats["recent_payments"] == []
+
+
+def add_debts(db, count):
+    agents = [Agent(name=f"Debtor {i}", role="Teacher") for i in range(count)]
+    db.add_all(agents)
+    db.flush()
+    db.add_all([Debt(agent_id=a.id, amount=10.0, reason="Advance", debt_date=date(2025, 5, 1)) for a in agents])
+    db.commit()
+    # A debt whose agent row is gone (left over from before deletes cascaded)
+    # still prints, labelled by id. SQLite only skips the foreign key check
+    # with enforcement switched off, outside a transaction.
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        try:
+            conn.execute(insert(Debt), {"agent_id": 9999, "amount": 1.0, "reason": "Orphan", "debt_date": date(2025, 5, 1)})
+            conn.commit()
+        finally:
+            conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+
+
+def test_debts_pdf_statement_count_is_constant(db, count_statements):
+    add_debts(db, 3)
+    count_statements.statements.clear()
+    b"".join(report_pdf.render_debts(db))
+    small = count_statements.count
+
+    add_debts(db, 60)
+    count_statements.statements.clear()
+    b"".join(report_pdf.render_debts(db))
+    assert count_statements.count == small == 1
+
+
+def test_debts_with_agent_names(db):
+    add_debts(db, 2)
+    rows = report_data.debts_with_agent_names(db).all()
+    assert [report_data.agent_label(d.agent_id, name) for d, name in rows] == ["Debtor 0", "Debtor 1", "ID: 9999"]
+    assert report_data.agent_name_map(db, [1, 2, 9999]) == {1: "Debtor 0", 2: "Debtor 1"}
+
+
+def make_request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+@pytest.fixture(autouse=True)
+def empty_report_cache():
+    report_cache.cache.clear()
+
+
+def body(response):
+    if hasattr(response, "body_iterator"):
+        async def collect():
+            return b"".join([chunk async for chunk in response.body_iterator])
+        return asyncio.run(collect())
+    return response.body
+
+
+def test_payslip_statement_count_is_constant(db, count_statements):
+    seed(db)
+    count_statements.statements.clear()
+    report_data.load_payslip(db, 2, "yearly", year=2025)
+    assert count_statements.count == 4
+
+    data = report_data.load_payslip(db, 2, "yearly", year=2025)
+    assert (data.total_paid, data.title_period) == (700.0, "Year: 2025")
+    assert report_data.load_payslip(db, 2, "monthly", month="2025-06").total_paid == 500.0
+
+
+def check_pdf(pdf):
+    assert pdf.startswith(b"%PDF-1.4") and pdf.endswith(b"%%EOF\n")
+    startxref = int(pdf.rsplit(b"startxref\n", 1)[1].split(b"\n")[0])
+    xref = pdf[startxref:].split(b"trailer")[0].split(b"\n")[3:-1]
+    for number, entry in enumerate(xref, start=1):
+        offset = int(entry[:10])
+        assert pdf[offset:].startswith(f"{number} 0 obj".encode())
+    return int(re.search(rb"/Type /Pages /Kids \[[^\]]*\] /Count (\d+)", pdf).group(1))
+
+
+def test_agents_pdf_streams_page_by_page(db):
+    db.add_all([Agent(name=f"Agent ({i})", role="Teacher", salary=1000.0) for i in range(100)])
+    db.commit()
+
+    chunks = list(report_pdf.render_agents(db))
+    pdf = b"".join(chunks)
+
+    pages = check_pdf(pdf)
+    assert pages == 3
+    # header, one chunk per finished page, then the tail with the xref table
+    assert len(chunks) == pages + 1
+    assert b"/BaseFont /Helvetica-Bold" in pdf
+
+
+def test_payslip_pdf(db):
+    seed(db)
+    response = generate_payslip(make_request(), agent_id=2, type="monthly", month="2025-05", db=db)
+    assert check_pdf(body(response)) == 1
+    assert response.headers["content-disposition"] == "attachment; filename=payslip_Agent 1_monthly.pdf"
+    with pytest.raises(HTTPException):
+        generate_payslip(make_request(), agent_id=99, type="all", db=db)
+
+
+def test_batch_payslips(db, count_statements):
+    seed(db)
+    count_statements.statements.clear()
+    payslips = report_data.load_payslips(db, "monthly", month="2025-05")
+    assert count_statements.count == 4
+    assert [(p.agent.name, p.total_paid) for p in payslips] == [("Agent 0", 0.0), ("Agent 1", 200.0), ("Agent 2", 0.0)]
+
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(report_pdf.render_payslips_zip(payslips, "monthly", workers=2))))
+    names = archive.namelist()
+    assert names == [f"payslip_{i}_Agent_{i - 1}_monthly_2025-05.pdf" for i in (1, 2, 3)]
+    single = b"".join(report_pdf.render_payslip(report_data.load_payslip(db, 2, "monthly", "2025-05"), "monthly"))
+    assert check_pdf(archive.read(names[1])) == 1
+    assert archive.read(names[1]) == single
+
+    merged = b"".join(report_pdf.render_payslips_merged(payslips, "monthly"))
+    assert check_pdf(merged) == 3
+
+
+def test_payslip_pool_follows_workers_and_recovers_from_a_dead_worker(monkeypatch):
+    class BrokenPool:
+        shut_down = False
+
+        def map(self, *args, **kwargs):
+            raise BrokenProcessPool("a worker died")
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            self.shut_down = True
+
+    broken = BrokenPool()
+    monkeypatch.setattr(report_pdf, "_pool", broken)
+    monkeypatch.setattr(report_pdf, "_pool_workers", 2)
+    with pytest.raises(BrokenProcessPool):
+        b"".join(report_pdf.render_payslips_zip([object(), object()], "monthly", workers=2))
+    assert report_pdf._pool is None and broken.shut_down
+
+    try:
+        pool = report_pdf._payslip_pool(2)
+        assert report_pdf._payslip_pool(2) is pool
+        resized = report_pdf._payslip_pool(3)
+        assert resized is not pool and resized._max_workers == 3
+    finally:
+        report_pdf.shutdown()
+    assert report_pdf._pool is None
+
+
+def test_report_cache_and_etag(db, count_statements):
+    seed(db)
+    first = agents_pdf(make_request(), db=db)
+    pdf = body(first)
+    etag = first.headers["etag"]
+
+    count_statements.statements.clear()
+    hit = agents_pdf(make_request(), db=db)
+    assert body(hit) == pdf
+    assert count_statements.count == 1  # only the version lookup
+
+    assert agents_pdf(make_request(etag), db=db).status_code == 304
+    assert agents_pdf(make_request(f'"other", W/{etag}'), db=db).status_code == 304
+
+    # Payments don't feed the agents list; agent writes do
+    payment = db.query(Payment).first()
+    delete_payment(payment.id, db=db, user={})
+    assert agents_pdf(make_request(etag), db=db).status_code == 304
+    versions.bump(db, versions.AGENTS)
+    db.commit()
+    assert agents_pdf(make_request(etag), db=db).status_code == 200
+
+
+def test_payslip_cache_follows_only_the_agents_own_data(db):
+    seed(db)
+    etag = generate_payslip(make_request(), agent_id=2, type="monthly", month="2025-05", db=db).headers["etag"]
+
+    def revalidate():
+        return generate_payslip(make_request(etag), agent_id=2, type="monthly", month="2025-05", db=db).status_code
+
+    # Another agent's payment, and any global version bump, leave the closed month cached
+    create_payment(PaymentCreate(agent_id=1, amount=50.0, status="Completed", payment_date=date(2025, 7, 1)), db=db, user={})
+    versions.bump(db, *versions.ALL_TABLES)
+    db.commit()
+    assert revalidate() == 304
+
+    # A completed payment of this agent's changes it, whatever month it is dated in
+    create_payment(PaymentCreate(agent_id=2, amount=50.0, status="Completed", payment_date=date(2025, 7, 1)), db=db, user={})
+    assert revalidate() == 200
+    etag = generate_payslip(make_request(), agent_id=2, type="monthly", month="2025-05", db=db).headers["etag"]
+
+    # So does editing the agent the payslip is printed for
+    db.get(Agent, 2).name = "Renamed"
+    db.commit()
+    assert revalidate() == 200
+
+
+def test_report_cache_eviction():
+    cache = report_cache.ReportCache(max_bytes=10, max_entry_bytes=6)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    assert cache.get("a") == b"12345"
+    cache.put("c", b"123")
+    assert cache.get("b") is None and cache.get("a") is not None
+    assert list(cache.tee("big", [b"1234", b"567"])) == [b"1234", b"567"]
+    assert cache.get("big") is None
+    assert cache.size <= 10
@@ -0,0 +1,67 @@
+from datetime import date
+
+from app import summary
+from app.models import Agent, MonthlyAgentSummary
+from app.routers.debts import create_debt, delete_debt
+from app.routers.payments import create_payment, update_payment, update_payment_status, delete_payment
+from app.schemas import DebtCreate, PaymentCreate, PaymentStatusUpdate
+
+
+def snapshot(db):
+    rows = db.query(MonthlyAgentSummary).order_by(
+        MonthlyAgentSummary.agent_id, MonthlyAgentSummary.year, MonthlyAgentSummary.month
+    ).all()
+    columns = ["agent_id", "year", "month"] + summary.COUNTERS
+    # Buckets that were emptied by deletes are kept at zero by the incremental path
+    return [
+        tuple(getattr(r, c) for c in columns) for r in rows
+        if any(getattr(r, c) for c in summary.COUNTERS)
+    ]
+
+
+def test_write_paths_match_rebuild(db):
+    agent = Agent(name="Agent", role="Teacher", salary=1000.0)
+    db.add(agent)
+    db.commit()
+    user = {"role": "admin"}
+
+    p1 = create_payment(PaymentCreate(agent_id=agent.id, amount=1000.0, status="Pending", payment_date=date(2025, 5, 1)), db=db, user=user)
+    p2 = create_payment(PaymentCreate(agent_id=agent.id, amount=900.0, status="Pending", payment_date=date(2025, 6, 1)), db=db, user=user)
+    create_debt(DebtCreate(agent_id=agent.id, amount=150.0, reason="Advance", debt_date=date(2025, 5, 12)), db=db, user=user)
+    debt = create_debt(DebtCreate(agent_id=agent.id, amount=50.0, reason="Loan", debt_date=date(2025, 7, 2)), db=db, user=user)
+    update_payment_status(p1.id, PaymentStatusUpdate(status="Completed"), db=db, user=user)
+    update_payment(p2.id, PaymentCreate(agent_id=agent.id, amount=800.0, status="Failed", payment_date=date(2025, 8, 1)), db=db, user=user)
+    delete_debt(debt.id, db=db, user=user)
+    p3 = create_payment(PaymentCreate(agent_id=agent.id, amount=10.0, status="Pending", payment_date=date(2025, 9, 1)), db=db, user=user)
+    delete_payment(p3.id, db=db, user=user)
+
+    incremental = snapshot(db)
+    may = db.get(MonthlyAgentSummary, (agent.id, 2025, 5))
+    assert (may.payments_total, may.paid_total, may.debt_total, may.completed_count) == (850.0, 850.0, 150.0, 1)
+
+    summary.rebuild(db)
+    db.commit()
+    assert snapshot(db) == incremental
+
+
+def test_money_totals_do_not_drift_and_rebuild_reports_drift(db):
+    agent = Agent(name="Agent", role="Teacher", salary=1000.0)
+    db.add(agent)
+    db.commit()
+    user = {"role": "admin"}
+
+    payment = create_payment(PaymentCreate(agent_id=agent.id, amount=0.1, status="Pending", payment_date=date(2025, 5, 1)), db=db, user=user)
+    # Each edit takes the old amount out and puts the new one in
+    for amount in [0.2, 0.3, 0.7, 1.1, 0.1] * 20:
+        update_payment(payment.id, PaymentCreate(agent_id=agent.id, amount=amount, status="Pending", payment_date=date(2025, 5, 1)), db=db, user=user)
+    db.expire_all()
+    assert db.get(MonthlyAgentSummary, (agent.id, 2025, 5)).payments_total == 0.1
+    assert summary.rebuild(db) == []
+
+    bucket = db.get(MonthlyAgentSummary, (agent.id, 2025, 5))
+    bucket.payments_total = 0.35
+    bucket.pending_count = 2
+    db.commit()
+    drift = summary.rebuild(db)
+    db.commit()
+    assert [(d["column"], d["before"], d["after"]) for d in drift] == [("payments_total", 0.35, 0.1), ("pending_count", 2, 1)]
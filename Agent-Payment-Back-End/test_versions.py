@@ -0,0 +1,44 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app import versions
+from app.database import Base
+from app.models import Agent
+
+
+def test_bump_runs_last_before_the_commit(db, count_statements):
+    versions.bump(db, versions.PAYMENTS, versions.AGENTS)
+    db.add(Agent(name="Alice", role="Teacher"))
+    db.flush()
+    assert not any("data_versions" in s for s in count_statements.statements)
+
+    db.commit()
+    assert "data_versions" in count_statements.statements[-1]
+    assert versions.current(db, *versions.ALL_TABLES) == {"agents": 1, "payments": 1, "debts": 0}
+
+
+def test_rolled_back_writes_do_not_bump(db):
+    db.add(Agent(name="Alice", role="Teacher"))
+    db.flush()
+    versions.bump(db, versions.AGENTS)
+    db.rollback()
+    db.commit()
+    assert versions.current(db, versions.AGENTS) == {"agents": 0}
+
+
+def test_concurrent_writers_only_queue_for_the_commit(pg_engine):
+    Base.metadata.create_all(bind=pg_engine)
+    with Session(pg_engine) as slow, Session(pg_engine) as fast:
+        # A long write (a payroll run, an import) is still in progress...
+        slow.add(Agent(name="Slow", role="Teacher"))
+        versions.bump(slow, versions.AGENTS)
+        slow.flush()
+
+        # ...and another writer of the same table does not wait for it
+        fast.execute(text("SET LOCAL lock_timeout = '1s'"))
+        fast.add(Agent(name="Fast", role="Teacher"))
+        versions.bump(fast, versions.AGENTS)
+        fast.commit()
+
+        slow.commit()
+        assert versions.current(slow, versions.AGENTS) == {"agents": 2}
@@ -78,6 +78,7 @@ const translations = {
     loading_dashboard: "Loading dashboard",
     payment_list: "Payment List",
     no_payments_found: "No payments found",
+    load_more: "Load more",
     management_reports: "Management Reports",
     general_reports: "General Reports",
     general_reports_desc: "Generate global lists for system data.",
@@ -184,6 +185,7 @@ const translations = {
     loading_dashboard: "Chargement du tableau de bord",
     payment_list: "Liste des Paiements",
     no_payments_found: "Aucun paiement trouvé",
+    load_more: "Charger plus",
     management_reports: "Rapports de Gestion",
     general_reports: "Rapports Généraux",
     general_reports_desc: "Générer des listes globales pour les données du système.",
@@ -0,0 +1,30 @@
+import { useState } from "react";
+
+// One list endpoint page at a time: the first page on reload(), the next one
+// (after next_cursor) appended on loadMore().
+export default function usePagedList(fetchPage) {
+  const [items, setItems] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  async function reload() {
+    const res = await fetchPage();
+    setItems(res.data.items);
+    setNextCursor(res.data.next_cursor);
+    return res;
+  }
+
+  async function loadMore() {
+    if (nextCursor === null) return;
+    setLoadingMore(true);
+    try {
+      const res = await fetchPage({ after: nextCursor });
+      setItems((prev) => [...prev, ...res.data.items]);
+      setNextCursor(res.data.next_cursor);
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
+  return { items, hasMore: nextCursor !== null, loadingMore, reload, loadMore };
+}
@@ -2,10 +2,11 @@ import { useEffect, useState } from "react";
 import { getAgents, createAgent, deleteAgent, updateAgent } from "../services/agents.js";
 import { FaEdit, FaTrash } from "react-icons/fa";
 import { useUI } from "../context/UIContext";
+import usePagedList from "../hooks/usePagedList.js";
 
 export default function Agents() {
   const { t, language, showToast } = useUI();
-  const [agents, setAgents] = useState([]);
+  const { items: agents, hasMore, loadingMore, reload, loadMore } = usePagedList(getAgents);
   const [form, setForm] = useState({ 
     name: "", 
     role: "Teacher", 
@@ -17,7 +18,7 @@ export default function Agents() {
   const [editingId, setEditingId] = useState(null);
 
   function loadAgents() {
-    getAgents().then((res) => setAgents(res.data)).catch(err => {
+    reload().catch(err => {
         console.error("Error loading agents:", err);
         showToast("load_error", "error");
     });
@@ -294,6 +295,11 @@ export default function Agents() {
           </tbody>
         </table>
       </div>
+      {hasMore && (
+        <div style={{ display: "flex", justifyContent: "center", marginTop: "15px" }}>
+          <button className="btn" onClick={loadMore} disabled={loadingMore}>{t("load_more")}</button>
+        </div>
+      )}
     </>
   );
 }
@@ -1,5 +1,5 @@
 import { useEffect, useState } from "react";
-import { getDashboardStats } from "../services/reports.js";
+import { getDashboardStats, streamDashboardStats } from "../services/reports.js";
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, Cell } from 'recharts';
 import { FaCalendarAlt, FaFilter } from "react-icons/fa";
 import { useUI } from "../context/UIContext";
@@ -44,13 +44,13 @@ export default function Dashboard() {
   const monthOptions = getMonthsSince2024();
 
   useEffect(() => {
+    const params = {};
+    if (timeRange === "month") {
+        params.month = selectedMonth;
+    }
+
     async function loadStats() {
       try {
-        const params = {};
-        if (timeRange === "month") {
-            params.month = selectedMonth;
-        }
-
         const res = await getDashboardStats(params);
         setStats(res.data);
       } catch (err) {
@@ -59,7 +59,23 @@ export default function Dashboard() {
         setLoading(false);
       }
     }
-    loadStats();
+
+    if (typeof EventSource === "undefined") {
+      loadStats();
+      return undefined;
+    }
+
+    // The first event carries the current stats; later ones arrive only when data changes.
+    // EventSource reconnects by itself after a dropped connection.
+    const source = streamDashboardStats(params);
+    source.addEventListener("stats", (event) => {
+      setStats(JSON.parse(event.data));
+      setLoading(false);
+    });
+    source.onerror = () => {
+      console.warn("Dashboard stream interrupted, reconnecting...");
+    };
+    return () => source.close();
   }, [timeRange, selectedMonth]);
 
   if (loading) return <div style={{ color: "var(--text-color)" }}>{t("loading_dashboard")}...</div>;
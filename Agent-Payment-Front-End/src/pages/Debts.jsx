@@ -1,11 +1,14 @@
 import { useEffect, useState } from "react";
-import { getDebts, createDebt, deleteDebt } from "../services/debts";
-import { getAgents } from "../services/agents";
+import { getDebts, getMonthDebts, createDebt, deleteDebt } from "../services/debts";
+import { getAllAgents } from "../services/agents";
 import { useUI } from "../context/UIContext";
+import usePagedList from "../hooks/usePagedList.js";
 
 export default function Debts() {
   const { t, theme, showToast } = useUI();
-  const [debts, setDebts] = useState([]);
+  const { items: debts, hasMore, loadingMore, reload, loadMore } = usePagedList(getDebts);
+  // This month's debts, for the 80% limit: the list above is only the loaded pages
+  const [monthDebts, setMonthDebts] = useState([]);
   const [agents, setAgents] = useState([]);
   const [loading, setLoading] = useState(true);
   
@@ -23,12 +26,13 @@ export default function Debts() {
   async function loadData() {
     try {
       setLoading(true);
-      const [debtsRes, agentsRes] = await Promise.all([
-        getDebts(),
-        getAgents()
+      const [, agentsRes, monthDebtsRes] = await Promise.all([
+        reload(),
+        getAllAgents(),
+        getMonthDebts(new Date().toISOString().slice(0, 7))
       ]);
-      setDebts(debtsRes.data);
       setAgents(agentsRes.data);
+      setMonthDebts(monthDebtsRes.data);
     } catch (err) {
       console.error("Error loading data:", err);
       showToast("load_error", "error");
@@ -51,7 +55,7 @@ export default function Debts() {
       const currentMonth = new Date().toISOString().slice(0, 7);
       
       // Calculate existing debts for this month
-      const existingMonthlyDebts = debts
+      const existingMonthlyDebts = monthDebts
         .filter(d => d.agent_id === agentId && d.debt_date.startsWith(currentMonth))
         .reduce((sum, d) => sum + d.amount, 0);
 
@@ -102,7 +106,7 @@ export default function Debts() {
   const currentMonth = new Date().toISOString().slice(0, 7);
   
   // Calculate cumulative rest to receive for the current month
-  const monthlyDebtsForAgent = debts
+  const monthlyDebtsForAgent = monthDebts
     .filter(d => d.agent_id === selectedAgentId && d.debt_date.startsWith(currentMonth))
     .reduce((sum, d) => sum + d.amount, 0);
 
@@ -236,6 +240,11 @@ export default function Debts() {
           </tbody>
         </table>
       </div>
+      {hasMore && (
+        <div style={{ display: "flex", justifyContent: "center", marginTop: "15px" }}>
+          <button className="btn" onClick={loadMore} disabled={loadingMore}>{t("load_more")}</button>
+        </div>
+      )}
     </>
   );
 }
@@ -1,15 +1,15 @@
 import { useEffect, useState } from "react";
 import { getPayments, createPayment, updatePaymentStatus } from "../services/payments.js";
-import { getAgents } from "../services/agents.js";
-import { getDebts } from "../services/debts.js";
+import { getAllAgents } from "../services/agents.js";
+import { getMonthDebts } from "../services/debts.js";
 import { FaCheck, FaTimes } from "react-icons/fa";
 import { useUI } from "../context/UIContext";
+import usePagedList from "../hooks/usePagedList.js";
 
 export default function Payments() {
   const { t, theme, showToast } = useUI();
-  const [payments, setPayments] = useState([]);
+  const { items: payments, hasMore, loadingMore, reload, loadMore } = usePagedList(getPayments);
   const [agents, setAgents] = useState([]);
-  const [allDebts, setAllDebts] = useState([]);
   const [loading, setLoading] = useState(true);
   
   // Fixed form - defaults to pending, no status selection
@@ -38,17 +38,14 @@ export default function Payments() {
     try {
       setLoading(true);
       
-      // Load payments, agents, and debts in parallel
-      const [paymentsRes, agentsRes, debtsRes] = await Promise.allSettled([
-        getPayments(),
-        getAgents(),
-        getDebts()
+      // Load the first page of payments and the agents in parallel
+      const [paymentsRes, agentsRes] = await Promise.allSettled([
+        reload(),
+        getAllAgents()
       ]);
 
       // Handle payments response
-      if (paymentsRes.status === "fulfilled") {
-        setPayments(paymentsRes.value.data);
-      } else {
+      if (paymentsRes.status === "rejected") {
         console.error("Failed to load payments:", paymentsRes.reason);
         if (paymentsRes.reason.response?.status === 401) {
           showToast("Session expired. Redirecting to login...", "error");
@@ -64,13 +61,6 @@ export default function Payments() {
         console.error("Failed to load agents:", agentsRes.reason);
       }
 
-      // Handle debts response
-      if (debtsRes.status === "fulfilled") {
-        setAllDebts(debtsRes.value.data);
-      } else {
-        console.error("Failed to load debts:", debtsRes.reason);
-      }
-
     } catch (err) {
       console.error("Error loading data:", err);
       showToast("load_error", "error");
@@ -177,22 +167,24 @@ export default function Payments() {
             id="agent_id"
             name="agent_id"
             value={form.agent_id}
-            onChange={(e) => {
-                const agentId = parseInt(e.target.value);
+            onChange={async (e) => {
+                const value = e.target.value;
+                const agentId = parseInt(value);
                 const agent = agents.find(a => a.id === agentId);
-                const selectedMonth = form.payment_date;
-                const agentDebtsInMonth = allDebts.filter(d => 
-                    d.agent_id === agentId && 
-                    d.debt_date.startsWith(selectedMonth)
-                );
-                const totalMonthDebt = agentDebtsInMonth.reduce((sum, debt) => sum + parseFloat(debt.amount), 0);
-                const finalAmount = agent ? Math.max(0, agent.salary - totalMonthDebt) : "";
+                setForm((prev) => ({ ...prev, agent_id: value, amount: "" }));
+                if (!agent) return;
 
-                setForm({ 
-                    ...form, 
-                    agent_id: e.target.value,
-                    amount: finalAmount
-                });
+                let totalMonthDebt = 0;
+                try {
+                    // Only this agent's debts for the selected month
+                    const res = await getMonthDebts(form.payment_date, { agent_id: agentId });
+                    totalMonthDebt = res.data.reduce((sum, debt) => sum + parseFloat(debt.amount), 0);
+                } catch (err) {
+                    console.error("Failed to load debts:", err);
+                }
+                const finalAmount = Math.max(0, agent.salary - totalMonthDebt);
+
+                setForm((prev) => prev.agent_id === value ? { ...prev, amount: finalAmount } : prev);
             }}
             required
             style={{ width: "100%" }}
@@ -329,6 +321,11 @@ export default function Payments() {
             </table>
           </div>
         )}
+        {hasMore && (
+          <div style={{ display: "flex", justifyContent: "center", marginTop: "15px" }}>
+            <button className="btn" onClick={loadMore} disabled={loadingMore}>{t("load_more")}</button>
+          </div>
+        )}
       </div>
     </>
   );
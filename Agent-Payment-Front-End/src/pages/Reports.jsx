@@ -1,5 +1,5 @@
 import { useEffect, useState } from "react";
-import { getAgents } from "../services/agents.js";
+import { getAllAgents } from "../services/agents.js";
 import { downloadAgentList, downloadDebtList, downloadPayslip } from "../services/reports.js";
 import { useUI } from "../context/UIContext";
 
@@ -20,7 +20,7 @@ export default function Reports() {
 
   async function loadAgents() {
     try {
-      const res = await getAgents();
+      const res = await getAllAgents();
       setAgents(res.data);
     } catch (err) {
       console.error("Error loading agents:", err);
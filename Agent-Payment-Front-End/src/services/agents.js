@@ -1,6 +1,9 @@
 import api from "./api.js";
 
-export const getAgents = () => api.get("/agents/");
+// One page: { items, next_cursor }
+export const getAgents = (params = {}) => api.get("/agents/", { params });
+// Every agent, for the agent pickers and name lookups
+export const getAllAgents = () => api.get("/agents/", { params: { all: true } });
 export const createAgent = (data) => api.post("/agents/", data);
 export const deleteAgent = (id) => api.delete(`/agents/${id}`);
 export const updateAgent = (id, data) => api.put(`/agents/${id}`, data);
@@ -1,5 +1,14 @@
 import API from "./api.js";
 
-export const getDebts = () => API.get("/debts/");
+// One page: { items, next_cursor }
+export const getDebts = (params = {}) => API.get("/debts/", { params });
+// Every debt dated in `month` ("YYYY-MM"), optionally narrowed by more filters (agent_id)
+export const getMonthDebts = (month, params = {}) => {
+  const [year, m] = month.split("-").map(Number);
+  const lastDay = new Date(year, m, 0).getDate();
+  return API.get("/debts/", {
+    params: { ...params, all: true, date_from: `${month}-01`, date_to: `${month}-${lastDay}` }
+  });
+};
 export const createDebt = (data) => API.post("/debts/", data);
 export const deleteDebt = (id) => API.delete(`/debts/${id}`);
@@ -1,6 +1,7 @@
 import api from "./api.js";
 
-export const getPayments = () => api.get("/payments/");
+// One page: { items, next_cursor }
+export const getPayments = (params = {}) => api.get("/payments/", { params });
 
 export const createPayment = (data) => {
   // Ensure data has all required fields
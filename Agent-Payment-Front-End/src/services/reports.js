@@ -13,3 +13,9 @@ export const downloadPayslip = (params) => API.get("/reports/payslip/pdf", {
 });
 
 export const getDashboardStats = (params) => API.get("/reports/dashboard", { params });
+
+// Live dashboard: the server pushes a fresh stats payload after each change (Server-Sent Events)
+export const streamDashboardStats = (params) => {
+    const query = new URLSearchParams(params).toString();
+    return new EventSource(`${API.defaults.baseURL}/reports/dashboard/stream${query ? `?${query}` : ""}`);
+};